@@ -1,14 +1,21 @@
 """Agent module for workflow orchestrator."""
 
 from core.agent.base import Agent, RetryPolicy
+from core.agent.retry import RetryBudget
 from core.agent.context import Context, TypedContextData, StateType
+from core.agent.cache import TTLCache
+from core.agent.blobs import BlobHandle, BlobStore
+from core.agent.sharedmem import SharedMemoryTransport, SharedValue
 from core.agent.state import (
     Priority,
     AgentStatus,
     StateStatus,
+    ExecutionMode,
+    SchedulingPolicy,
     StateResult,
     StateFunction,
     StateMetadata,
+    StateSpec,
     PrioritizedState
 )
 from core.agent.dependencies import (
@@ -17,21 +24,49 @@ from core.agent.dependencies import (
     DependencyConfig
 )
 from core.agent.checkpoint import AgentCheckpoint
+from core.agent.queue import StateQueue
+from core.agent.timers import TimerWheel
+from core.agent.versioned import CommitConflictError, Snapshot, VersionedStore
+from core.agent.map import MapState, MapStateError
+from core.agent.memo import CachePolicy, ResultCache, UncacheableError
+from core.agent.hedging import HedgePolicy
+from core.agent.template import AgentTemplate
 
 __all__ = [
     # Core classes
     "Agent",
+    "AgentTemplate",
     "Context",
     "RetryPolicy",
+    "RetryBudget",
     
     # State types
     "Priority",
     "AgentStatus",
     "StateStatus",
+    "ExecutionMode",
+    "SchedulingPolicy",
     "StateResult",
     "StateFunction",
     "StateMetadata",
+    "StateSpec",
     "PrioritizedState",
+    "StateQueue",
+    "TimerWheel",
+    "VersionedStore",
+    "Snapshot",
+    "CommitConflictError",
+    "MapState",
+    "MapStateError",
+    "CachePolicy",
+    "ResultCache",
+    "UncacheableError",
+    "TTLCache",
+    "BlobStore",
+    "BlobHandle",
+    "SharedMemoryTransport",
+    "SharedValue",
+    "HedgePolicy",
     
     # Context types
     "TypedContextData",
@@ -1,15 +1,14 @@
 """Core Agent implementation from paste-4.txt."""
 
 import asyncio
-from collections import defaultdict
+from collections import ChainMap, defaultdict, deque
 from enum import Enum, Flag, auto, IntEnum
 from typing import (
-    Callable, Dict, Optional, Union, List, Tuple, Set, Any,
+    Callable, Dict, Optional, Union, List, Tuple, Set, Any, Iterable, Mapping,
     TypeVar, Generic, Protocol, runtime_checkable
 )
 from dataclasses import dataclass, field, asdict, replace
 import contextlib
-import heapq
 import time
 import uuid
 from copy import deepcopy
@@ -17,14 +16,34 @@ import random
 
 from core.agent.state import (
     Priority, AgentStatus, StateStatus, StateResult,
-    StateFunction, StateMetadata, PrioritizedState
+    StateFunction, StateMetadata, PrioritizedState, ExecutionMode,
+    SchedulingPolicy, StateSpec
 )
 from core.agent.dependencies import (
-    DependencyType, DependencyLifecycle, DependencyConfig
+    DependencyType, DependencyLifecycle, DependencyConfig, DependencyGroup,
+    DYNAMIC_DEPENDENCY_TYPES, GROUPED_DEPENDENCY_TYPES, TIMED_LIFECYCLES
 )
-from core.agent.context import Context
-from core.agent.checkpoint import AgentCheckpoint
-from core.resources.requirements import ResourceRequirements
+from core.agent.context import Context, TypeLockIndex
+from core.agent.cache import TTLCache
+from core.agent.blobs import BlobHandle, BlobStore
+from core.agent.checkpoint import AgentCheckpoint, LazyTrackedDict, TrackedDict
+from core.agent.sharedmem import SharedMemoryTransport
+from core.agent.queue import StateQueue
+from core.agent.runtime import (
+    StateIndex, StateSetField, deep_sizeof, gc_paused
+)
+from core.agent.map import MapState
+from core.agent.retry import RetryBudget
+from core.agent.timers import TimerWheel
+from core.agent.versioned import CommitConflictError, Snapshot, VersionedStore
+from core.agent.hedging import HedgePolicy, HedgeStats
+from core.agent.memo import (
+    CachePolicy, ResultCache, UncacheableError, cache_key, function_fingerprint
+)
+from core.agent.executors import (
+    ProcessStateExecutor, ThreadStateExecutor, is_async_callable
+)
+from core.resources.requirements import ResourceRequirements, ResourceType
 from core.resources.pool import ResourcePool
 
 
@@ -45,9 +64,10 @@ class RetryPolicy:
         self.exponential_base = exponential_base
         self.jitter = jitter
 
-    async def wait(self, attempt: int) -> None:
+    def delay(self, attempt: int) -> float:
+        """Backoff before the retry following ``attempt``."""
         if attempt >= self.max_retries:
-            return
+            return 0.0
 
         delay = min(
             self.initial_delay * (self.exponential_base ** attempt),
@@ -57,35 +77,175 @@ class RetryPolicy:
         if self.jitter:
             delay *= (0.5 + random.random())
 
-        await asyncio.sleep(delay)
+        return delay
+
+    async def wait(self, attempt: int) -> None:
+        await asyncio.sleep(self.delay(attempt))
 
 
 class Agent:
     """Advanced agent with scheduling, dependencies, resources, and checkpointing."""
 
+    # Number of ready-to-started latency samples kept for reporting
+    _LATENCY_SAMPLES = 1024
+
+    # Weight of the latest run in a state's duration estimate
+    _DURATION_SMOOTHING = 0.3
+
+    # Bitsets over _state_index; assigning any iterable of names works
+    completed_states = StateSetField()
+    completed_once = StateSetField()
+    _running_states = StateSetField()
+    _executed_states = StateSetField()
+
     def __init__(
         self,
         name: str,
         max_concurrent: int = 10,
         state_timeout: Optional[float] = 60.0,
         resource_pool: Optional[ResourcePool] = None,
-        retry_policy: Optional[RetryPolicy] = None
+        retry_policy: Optional[RetryPolicy] = None,
+        max_threads: Optional[int] = None,
+        result_cache: Optional[ResultCache] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        scheduling: SchedulingPolicy = SchedulingPolicy.PRIORITY,
+        aging_interval: Optional[float] = None,
+        context_cache: Optional[TTLCache] = None,
+        snapshot_isolation: bool = False,
+        max_conflict_retries: int = 3,
+        blob_store: Optional[BlobStore] = None,
+        shared_memory_threshold: Optional[int] = 1024 * 1024
     ):
+        """
+        ``scheduling`` picks the order ready states start in; see
+        ``set_deadline`` for where deadlines come from. With an
+        ``aging_interval`` (seconds), a queued state gains one priority level
+        per interval it waits, so low-priority states cannot starve.
+        ``context_cache`` backs ``Context.set_cached`` / ``get_cached`` for
+        every state of the agent; pass one cache to several agents to share
+        entries between them. With ``snapshot_isolation`` each state reads
+        shared_state as it was when the state started and its writes are
+        committed together when it completes (discarded if it fails or is
+        cancelled, except keys marked ``Context.commit_on_failure``). The
+        first of two concurrent states to commit wins: a state that read or
+        wrote a key committed since it started is run again on a fresh
+        snapshot, which spends one of its attempts, up to
+        ``max_conflict_retries`` times in a row; past either limit it fails
+        with CommitConflictError. A re-run repeats the state's side effects,
+        so only enable isolation for agents whose states are idempotent.
+        Without isolation (the default) states read and write shared_state
+        directly.
+        With a ``blob_store``, variables above its threshold are spilled to
+        it and shared_state (and so checkpoints) holds their handles. Blobs
+        neither shared_state nor a checkpoint refers to are deleted when a
+        run ends, or as soon as the writes of an isolated state are
+        discarded; see ``release_checkpoints``.
+        Process-mode states exchange values of at least
+        ``shared_memory_threshold`` bytes with their workers through shared
+        memory, released when the run ends; None pickles everything.
+        """
         self.name = name
         self.states: Dict[str, StateFunction] = {}
         self.state_metadata: Dict[str, StateMetadata] = {}
-        self.priority_queue: List[PrioritizedState] = []
-        self.shared_state: Dict[str, Any] = {}
+        self._state_index = StateIndex()
+
+        # Scheduling order, workflow deadline (wall time) and the duration
+        # estimates deadlines are derived from
+        self.scheduling = SchedulingPolicy(scheduling)
+        self.aging_interval = aging_interval
+        self.deadline: Optional[float] = None
+        self._duration_estimates: Dict[str, float] = {}
+        self._critical_paths: Dict[str, float] = {}
+
+        self.priority_queue = StateQueue(key=self._queue_key)
+        self._parked: Dict[str, PrioritizedState] = {}
+        self._shared_state = TrackedDict()
+        # Versions of shared_state, read through per-state snapshots, and
+        # the (snapshot, commit) versions of each state's last completion
+        self.snapshot_isolation = snapshot_isolation
+        self.max_conflict_retries = max_conflict_retries
+        self._store = VersionedStore(self._shared_state)
+        # Consecutive conflicting commits per state, while it is re-run
+        self._conflict_retries: Dict[str, int] = {}
+        self._state_versions: Dict[str, Tuple[int, int]] = {}
+
+        # Spill store for large variables; the owner id counts this agent's
+        # references to its blobs
+        self.blob_store = blob_store
+        self._blob_owner = uuid.uuid4().hex
+        # Shared-memory segments of large values sent to process workers
+        self.shared_memory_threshold = shared_memory_threshold
+        self._shared_memory = (
+            SharedMemoryTransport(shared_memory_threshold)
+            if shared_memory_threshold is not None else None
+        )
+        # Typed/validated variable locks, shared by every state's Context
+        self._type_locks = TypeLockIndex()
         self._semaphore = asyncio.Semaphore(max_concurrent)
         self.state_timeout = state_timeout
         self.resource_pool = resource_pool or ResourcePool()
         self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        # Completion events, created only for states someone waits on
         self._state_events: Dict[str, asyncio.Event] = {}
         self._running_states: Set[str] = set()
         self._session_start: Optional[float] = None
         self._cleanup_tasks: Set[asyncio.Task] = set()
         self._executed_states: Set[str] = set()
 
+        # Event-driven dispatch
+        self.max_concurrent = max_concurrent
+        self._wakeup = asyncio.Event()
+        self._state_tasks: Dict[str, asyncio.Task] = {}
+        # Contexts of states between dispatch and cleanup; cancellation is
+        # requested through them and only hard-cancels states still in here
+        self._state_contexts: Dict[str, Context] = {}
+        self._dispatch_error: Optional[BaseException] = None
+        self._ready_at: Dict[str, float] = {}
+        self._scheduling_latency: deque = deque(maxlen=self._LATENCY_SAMPLES)
+
+        # Retries waiting out their backoff, periodic re-runs and dependency
+        # expiries, keyed by (kind, state_name[, dep_name])
+        self._timers = TimerWheel()
+
+        # Steady-state memory: shared_state key prefixes that expire a time
+        # after their last write, and how often (seconds) compact() runs
+        # while the agent is running
+        self._key_ttls: Dict[str, float] = {}
+        self.compaction_interval: Optional[float] = None
+
+        # Dependency indexes, maintained by add_state: the dependents of each
+        # state, the number of unmet groups per state and the dependencies
+        # that need evaluating at readiness time
+        self._dependents: Dict[
+            str, List[Tuple[str, DependencyConfig, Optional[DependencyGroup]]]
+        ] = {}
+        self._unmet_groups: Dict[str, int] = {}
+        self._timed_dependencies: Dict[
+            str, Tuple[Tuple[str, DependencyConfig, Optional[DependencyGroup]], ...]
+        ] = {}
+        self._dynamic_dependencies: Dict[
+            str, Tuple[Tuple[str, DependencyConfig], ...]
+        ] = {}
+        self._conditional_states: Set[str] = set()
+
+        # Out-of-loop executors, created when first needed
+        self.max_threads = max_threads or max_concurrent
+        self._thread_executor: Optional[ThreadStateExecutor] = None
+        self._process_executor: Optional[ProcessStateExecutor] = None
+
+        # Memoized results of states added with a cache policy
+        self.result_cache = result_cache or ResultCache()
+        self._fingerprints: Dict[str, str] = {}
+
+        # Entries set through Context.set_cached, shared by states and runs
+        self.context_cache = (
+            context_cache if context_cache is not None else TTLCache()
+        )
+
+        # Duration history and counters of states added with a hedge policy
+        self._hedge_stats: Dict[str, HedgeStats] = {}
+
         # Checkpoint and pause support
         self.status = AgentStatus.IDLE
         self._pause_event = asyncio.Event()
@@ -93,6 +253,30 @@ class Agent:
         self.completed_states: Set[str] = set()
         self.completed_once: Set[str] = set()
 
+        # Delta checkpoints: every checkpoint_full_every-th checkpoint is a
+        # full base, the ones in between only record changes
+        self.checkpoint_full_every = 10
+        self._checkpoint_base_id: Optional[str] = None
+        self._checkpoint_sequence = 0
+        self._checkpoint_signatures: Dict[str, Tuple] = {}
+        self._checkpoint_queue_signature: Optional[Tuple] = None
+
+    @property
+    def shared_state(self) -> Dict[str, Any]:
+        """Variables shared by all states; assignments are change-tracked."""
+        return self._shared_state
+
+    @shared_state.setter
+    def shared_state(self, value: Dict[str, Any]) -> None:
+        if not isinstance(value, LazyTrackedDict):
+            value = TrackedDict(value)
+        value.take_changes()
+        self._shared_state = value
+        self._store = VersionedStore(value)
+        self._type_locks.clear()
+        # Changes to the replaced mapping are unknown: start a new base
+        self._checkpoint_base_id = None
+
     def add_state(
         self,
         name: str,
@@ -105,71 +289,756 @@ class Agent:
         ]]] = None,
         resources: Optional[ResourceRequirements] = None,
         max_retries: int = 3,
-        retry_policy: Optional[RetryPolicy] = None
+        retry_policy: Optional[RetryPolicy] = None,
+        execution_mode: Optional[ExecutionMode] = None,
+        shared_keys: Optional[List[str]] = None,
+        cache: Optional[CachePolicy] = None,
+        hedge: Optional[HedgePolicy] = None
     ) -> None:
-        """Add a state with enhanced configuration."""
+        """
+        Add a state with enhanced configuration.
+
+        ``execution_mode`` overrides ``resources.execution_mode``. For
+        ``ExecutionMode.PROCESS`` states, ``shared_keys`` selects the slice of
+        shared_state sent to the worker (all of it when omitted). Synchronous
+        functions are run on the agent's thread pool.
+
+        With a ``cache`` policy, a run whose function and declared inputs
+        match a stored entry in ``result_cache`` replays the stored result,
+        variable writes and outputs instead of calling the function.
+
+        A ``hedge`` policy is for idempotent states only: a slow attempt gets
+        a concurrent second attempt and the writes of the first to succeed
+        are kept.
+        """
+        metadata = self._build_metadata(StateSpec(
+            name, func, dependencies, resources, max_retries, retry_policy,
+            execution_mode, shared_keys, cache, hedge
+        ))
+        self._register_state(name, func)
+        self._critical_paths.clear()
+
+        if name in self.state_metadata:
+            self._remove_dependency_index(name)
+        self.state_metadata[name] = metadata
+        self._index_dependencies(name, metadata)
+
+        if metadata.execution_mode == ExecutionMode.PROCESS:
+            self._get_process_executor()
+
+        if not dependencies:
+            self._add_to_queue(name, metadata)
+
+    @gc_paused()
+    def add_states(self, states: Iterable[Union[StateSpec, Mapping[str, Any]]]) -> None:
+        """
+        Add many states at once.
+
+        Each item is a ``StateSpec`` or a mapping of ``add_state`` arguments.
+        The whole batch is validated before anything is added: duplicate
+        names, dependencies on states that are neither in the batch nor
+        already defined, and malformed dependency specs are all reported in
+        one ``ValueError``. Dependency indexes are then built in a single
+        pass and the states without dependencies are heapified into the
+        queue together, instead of being pushed one by one.
+        """
+        specs = [
+            spec if isinstance(spec, StateSpec) else StateSpec(**spec)
+            for spec in states
+        ]
+
+        errors = []
+        names = set()
+        for spec in specs:
+            if spec.name in names:
+                errors.append(f"state '{spec.name}' is defined more than once")
+            names.add(spec.name)
+
+        for spec in specs:
+            for dep_name, dep_config in (spec.dependencies or {}).items():
+                if dep_name not in names and dep_name not in self.states:
+                    errors.append(
+                        f"state '{spec.name}' depends on unknown state '{dep_name}'"
+                    )
+                if self._dependency_config(dep_config) is None:
+                    errors.append(
+                        f"state '{spec.name}' has an invalid dependency spec "
+                        f"for '{dep_name}': {dep_config!r}"
+                    )
+
+        metadatas = []
+        for spec in specs:
+            try:
+                metadatas.append(self._build_metadata(spec))
+            except ValueError as e:
+                errors.append(f"state '{spec.name}': {e}")
+
+        if errors:
+            raise ValueError(
+                f"Cannot add {len(specs)} states to agent {self.name}:\n  " +
+                "\n  ".join(errors)
+            )
+
+        self._critical_paths.clear()
+        initial = []
+        now = time.time()
+        for spec, metadata in zip(specs, metadatas):
+            name = spec.name
+            self._register_state(name, spec.func)
+            if name in self.state_metadata:
+                self._remove_dependency_index(name)
+            self.state_metadata[name] = metadata
+            self._index_dependencies(name, metadata)
+
+            if metadata.dependencies:
+                continue
+            if name in self._parked or name in self.priority_queue:
+                self._add_to_queue(name, metadata)
+            else:
+                initial.append(PrioritizedState(
+                    -metadata.resources.priority,
+                    now,
+                    name,
+                    metadata,
+                    self._state_deadline(name, now)
+                ))
+
+        if any(
+            metadata.execution_mode == ExecutionMode.PROCESS
+            for metadata in metadatas
+        ):
+            self._get_process_executor()
+
+        if initial:
+            self.priority_queue.extend(initial)
+            self._wakeup.set()
+
+    def _register_state(self, name: str, func: StateFunction) -> None:
+        """Record a state's function and drop what was derived from an old one."""
         self.states[name] = func
-        self._state_events[name] = asyncio.Event()
+        self._state_index.id(name)
+        self._state_events.pop(name, None)
+        self._fingerprints.pop(name, None)
+        self._hedge_stats.pop(name, None)
+
+    def _build_metadata(self, spec: StateSpec) -> StateMetadata:
+        """Metadata of a state, with its dependency specs normalized."""
+        resources = spec.resources or ResourceRequirements()
+        execution_mode = spec.execution_mode or resources.execution_mode
+        if execution_mode == ExecutionMode.PROCESS:
+            ProcessStateExecutor.validate(spec.func)
+        elif not is_async_callable(spec.func):
+            execution_mode = ExecutionMode.THREAD
 
         metadata = StateMetadata(
             status=StateStatus.PENDING,
-            max_retries=max_retries,
-            resources=resources or ResourceRequirements()
+            max_retries=spec.max_retries,
+            resources=resources,
+            execution_mode=execution_mode,
+            shared_keys=(
+                tuple(spec.shared_keys) if spec.shared_keys is not None else None
+            ),
+            cache=spec.cache,
+            hedge=spec.hedge
         )
 
-        if dependencies:
-            for dep_name, dep_config in dependencies.items():
-                if isinstance(dep_config, DependencyType):
-                    metadata.dependencies[dep_name] = DependencyConfig(
-                        type=dep_config
-                    )
-                elif isinstance(dep_config, tuple):
-                    if len(dep_config) == 2:
-                        dep_type, lifecycle = dep_config
-                        metadata.dependencies[dep_name] = DependencyConfig(
-                            type=dep_type,
-                            lifecycle=lifecycle
-                        )
-                    elif len(dep_config) == 3:
-                        dep_type, lifecycle, condition = dep_config
-                        metadata.dependencies[dep_name] = DependencyConfig(
-                            type=dep_type,
-                            lifecycle=lifecycle,
-                            condition=condition
+        if spec.dependencies:
+            for dep_name, dep_config in spec.dependencies.items():
+                config = self._dependency_config(dep_config)
+                if config is not None:
+                    metadata.dependencies[dep_name] = config
+
+        metadata.retry_policy = spec.retry_policy or self.retry_policy
+        return metadata
+
+    @staticmethod
+    def _dependency_config(dep_config: Any) -> Optional[DependencyConfig]:
+        """Normalize one of the dependency spec forms; None if malformed."""
+        if isinstance(dep_config, DependencyType):
+            return DependencyConfig(type=dep_config)
+        if isinstance(dep_config, DependencyConfig):
+            return dep_config
+        if isinstance(dep_config, tuple):
+            if len(dep_config) == 2:
+                dep_type, lifecycle = dep_config
+                return DependencyConfig(type=dep_type, lifecycle=lifecycle)
+            if len(dep_config) == 3:
+                dep_type, lifecycle, condition = dep_config
+                return DependencyConfig(
+                    type=dep_type,
+                    lifecycle=lifecycle,
+                    condition=condition
+                )
+        return None
+
+    def _get_thread_executor(self) -> ThreadStateExecutor:
+        """Thread pool for synchronous state functions."""
+        if self._thread_executor is None:
+            self._thread_executor = ThreadStateExecutor(
+                max_workers=self.max_threads,
+                name=self.name
+            )
+        return self._thread_executor
+
+    def get_executor_stats(self) -> Dict[str, Dict[str, float]]:
+        """Statistics of the worker pools this agent has started."""
+        stats = {}
+        if self._thread_executor is not None:
+            stats["thread"] = self._thread_executor.stats()
+        return stats
+
+    def _get_process_executor(self) -> ProcessStateExecutor:
+        """Process pool sized by the CPU units of the resource pool."""
+        if self._process_executor is None:
+            self._process_executor = ProcessStateExecutor(
+                max_workers=int(self.resource_pool.resources[ResourceType.CPU]),
+                transport=self._shared_memory
+            )
+            self._process_executor.warm()
+        return self._process_executor
+
+    async def _execute_state(
+        self,
+        state_name: str,
+        metadata: StateMetadata,
+        context: Context
+    ) -> StateResult:
+        """Run a state, through the result cache when it has a cache policy."""
+        if metadata.cache is not None:
+            return await self._execute_cached(state_name, metadata, context)
+        return await self._invoke_state(state_name, metadata, context)
+
+    async def _invoke_state(
+        self,
+        state_name: str,
+        metadata: StateMetadata,
+        context: Context
+    ) -> StateResult:
+        """Call a state function, hedged when it has a hedge policy."""
+        if metadata.hedge is not None:
+            return await self._execute_hedged(state_name, metadata, context)
+        return await self._call_state(state_name, metadata, context)
+
+    def _hedge_context(self, context: Context) -> Context:
+        """Context for one hedged attempt, writing to its own overlay."""
+        return Context(ChainMap({}, context.shared_state), cache=self.context_cache)
+
+    async def _execute_hedged(
+        self,
+        state_name: str,
+        metadata: StateMetadata,
+        context: Context
+    ) -> StateResult:
+        """
+        Run a state and, if it outlives its latency percentile, a second
+        attempt alongside it. Each attempt writes to its own overlay of
+        shared_state; only the winner's writes reach ``context``.
+        """
+        policy = metadata.hedge
+        stats = self._hedge_stats.get(state_name)
+        if stats is None:
+            stats = self._hedge_stats[state_name] = HedgeStats(policy.history)
+        stats.calls += 1
+
+        async def attempt(attempt_context: Context, timed: bool) -> StateResult:
+            if not timed:
+                return await self._call_state(state_name, metadata, attempt_context)
+            start = stats.clock()
+            try:
+                result = await self._call_state(state_name, metadata, attempt_context)
+            except asyncio.CancelledError:
+                # Lost to its hedge (or timed out): it would have taken longer
+                stats.record(stats.clock() - start, censored=True)
+                raise
+            stats.record(stats.clock() - start)
+            return result
+
+        delay = stats.hedge_delay(policy)
+        if delay is None:
+            return await attempt(context, True)
+
+        contexts = [self._hedge_context(context)]
+        tasks = [asyncio.create_task(attempt(contexts[0], True))]
+        hedge_key = f"{state_name}:hedge"
+        hedged = False
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and await self.resource_pool.try_acquire(
+                hedge_key, metadata.resources
+            ):
+                hedged = True
+                stats.hedged += 1
+                contexts.append(self._hedge_context(context))
+                tasks.append(asyncio.create_task(attempt(contexts[1], False)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for index, task in enumerate(tasks):
+                    if task in done and task.exception() is None:
+                        if index:
+                            stats.hedge_wins += 1
+                        winner = contexts[index]
+                        overlay = winner.shared_state.maps[0]
+                        context.merge_writes(
+                            {
+                                key: overlay[key]
+                                for key in winner.get_written_keys()
+                                if key in overlay
+                            },
+                            winner._state_data
                         )
-                elif isinstance(dep_config, DependencyConfig):
-                    metadata.dependencies[dep_name] = dep_config
+                        return task.result()
 
-        metadata.retry_policy = retry_policy or self.retry_policy
-        self.state_metadata[name] = metadata
+            # Every attempt failed: surface the primary's error
+            raise tasks[0].exception()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if hedged:
+                await self.resource_pool.release(hedge_key)
+
+    def get_hedge_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hedging counters and hedge rate per hedged state."""
+        return {
+            state_name: stats.to_dict()
+            for state_name, stats in self._hedge_stats.items()
+        }
+
+    async def _call_state(
+        self,
+        state_name: str,
+        metadata: StateMetadata,
+        context: Context
+    ) -> StateResult:
+        """Call a state function according to its execution mode."""
+        func = self.states[state_name]
+
+        if metadata.execution_mode == ExecutionMode.PROCESS:
+            return await self._get_process_executor().run(
+                func, context, metadata.shared_keys
+            )
 
+        if metadata.execution_mode == ExecutionMode.THREAD:
+            return await self._get_thread_executor().run(func, context)
+
+        return await func(context)
+
+    async def _execute_cached(
+        self,
+        state_name: str,
+        metadata: StateMetadata,
+        context: Context
+    ) -> StateResult:
+        """Replay a memoized result, or execute the state and store it."""
+        policy = metadata.cache
+        func = self.states[state_name]
+        fingerprint = self._fingerprints.get(state_name)
+        if fingerprint is None:
+            fingerprint = function_fingerprint(func)
+            self._fingerprints[state_name] = fingerprint
+
+        try:
+            key = cache_key(
+                state_name, fingerprint, func, context.shared_state, policy.inputs
+            )
+        except UncacheableError:
+            return await self._invoke_state(state_name, metadata, context)
+        cache = self.result_cache
+        disk = cache.directory is not None
+
+        cached = await asyncio.to_thread(cache.get, key) if disk else cache.get(key)
+        if cached is not None:
+            result, writes, state_data = cached
+            context.merge_writes(writes, state_data)
+            return result
+
+        written_before = context.get_written_keys()
+        result = await self._invoke_state(state_name, metadata, context)
+
+        # Transitions to other agents cannot be replayed
+        if isinstance(result, list) and any(isinstance(r, tuple) for r in result):
+            return result
+
+        shared_state = context.shared_state
+        writes = {
+            k: shared_state[k]
+            for k in context.get_written_keys() - written_before
+            if k in shared_state
+        }
+        entry = (result, writes, dict(context._state_data))
+        if disk:
+            await asyncio.to_thread(cache.put, key, entry, policy.ttl)
+        else:
+            cache.put(key, entry, policy.ttl)
+        return result
+
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Hit/miss counters of the result cache."""
+        return self.result_cache.stats()
+
+    def get_context_cache_stats(self) -> Dict[str, float]:
+        """Hit/miss counters of the cache behind ``Context.set_cached``."""
+        return self.context_cache.stats()
+
+    def get_shared_state_stats(self) -> Dict[str, int]:
+        """Version counters and retained history of shared_state."""
+        return self._store.stats()
+
+    def get_state_versions(self, state_name: str) -> Optional[Tuple[int, int]]:
+        """
+        shared_state versions a state last completed against: the version it
+        read and the version its writes created (the same when it wrote
+        nothing). None before its first isolated completion.
+        """
+        return self._state_versions.get(state_name)
+
+    def get_shared_memory_stats(self) -> Dict[str, int]:
+        """
+        Shared-memory segments held for process workers and the values and
+        bytes exchanged through them, across runs.
+        """
+        if self._shared_memory is None:
+            return {}
+        return self._shared_memory.stats()
+
+    def close(self) -> None:
+        """Release the agent's worker pools."""
+        if self._thread_executor is not None:
+            self._thread_executor.shutdown(wait=False)
+            self._thread_executor = None
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False)
+            self._process_executor = None
+
+    def add_map_state(
+        self,
+        name: str,
+        func: Callable[[Any, Context], Any],
+        items: Union[str, Callable[[Context], Any]],
+        reducer: Optional[Callable[[Any, Any], Any]] = None,
+        initial: Any = None,
+        output: Optional[str] = None,
+        concurrency: int = 10,
+        allow_failures: bool = False,
+        dependencies: Optional[Dict[str, Any]] = None,
+        resources: Optional[ResourceRequirements] = None,
+        max_retries: int = 3,
+        retry_policy: Optional[RetryPolicy] = None
+    ) -> MapState:
+        """
+        Add a state that maps ``func(item, context)`` over a collection.
+
+        ``items`` names a context variable holding an iterable or async
+        iterator, or is a callable returning one. Results are folded into
+        ``reducer(accumulator, result)`` as they finish and the final
+        accumulator is stored in the ``output`` variable. The whole map runs
+        as one state under ``resources``; ``concurrency`` bounds the items in
+        flight. See MapState for partial retry of failed items.
+        """
+        map_state = MapState(
+            name,
+            func,
+            items,
+            reducer=reducer,
+            initial=initial,
+            output=output,
+            concurrency=concurrency,
+            allow_failures=allow_failures,
+            executor=self._get_thread_executor
+        )
+
+        self.add_state(
+            name,
+            map_state,
+            dependencies=dependencies,
+            resources=resources,
+            max_retries=max_retries,
+            retry_policy=retry_policy
+        )
+        return map_state
+
+    def _index_dependencies(
+        self,
+        name: str,
+        metadata: StateMetadata,
+        satisfied: Set[str] = frozenset()
+    ) -> None:
+        """Compile a state's dependencies into groups and dependents entries."""
+        dependencies = metadata.dependencies
         if not dependencies:
-            self._add_to_queue(name, metadata)
+            self._unmet_groups[name] = 0
+            self._timed_dependencies[name] = ()
+            self._dynamic_dependencies[name] = ()
+            self._conditional_states.discard(name)
+            return
+
+        groups: Dict[DependencyType, DependencyGroup] = {}
+        for dep_config in dependencies.values():
+            if dep_config.type in GROUPED_DEPENDENCY_TYPES:
+                group = groups.get(dep_config.type)
+                if group is None:
+                    group = groups[dep_config.type] = DependencyGroup(dep_config.type, 0)
+                group.size += 1
+
+        unmet = 0
+        for group in groups.values():
+            if not group.is_met():
+                unmet += 1
+        self._unmet_groups[name] = unmet
+
+        # Nothing can be satisfied yet while no state has completed
+        completed = self.completed_states if (satisfied or self.completed_states) else ()
+        dependents = self._dependents
+        timed = []
+        dynamic = []
+        for dep_name, dep_config in dependencies.items():
+            group = groups.get(dep_config.type)
+            entries = dependents.get(dep_name)
+            if entries is None:
+                dependents[dep_name] = [(name, dep_config, group)]
+            else:
+                entries.append((name, dep_config, group))
+
+            if group is not None:
+                if dep_config.lifecycle in TIMED_LIFECYCLES:
+                    timed.append((dep_name, dep_config, group))
+                if dep_name in satisfied or dep_name in completed:
+                    self._mark_satisfied(name, dep_name, group)
+            elif dep_config.type in DYNAMIC_DEPENDENCY_TYPES:
+                dynamic.append((dep_name, dep_config))
+
+        self._timed_dependencies[name] = tuple(timed)
+        self._dynamic_dependencies[name] = tuple(dynamic)
+        if any(dep_config.type == DependencyType.CONDITIONAL for _, dep_config in dynamic):
+            self._conditional_states.add(name)
+        else:
+            self._conditional_states.discard(name)
+
+    def _remove_dependency_index(self, name: str) -> None:
+        """Drop the index entries of a state that is being redefined."""
+        for dep_name in self.state_metadata[name].dependencies:
+            entries = self._dependents.get(dep_name)
+            if entries:
+                entries[:] = [entry for entry in entries if entry[0] != name]
+
+    def _rebuild_dependency_index(self) -> None:
+        """Rebuild all indexes from each state's satisfied dependencies."""
+        self._dependents.clear()
+        for name, metadata in self.state_metadata.items():
+            satisfied = set(metadata.satisfied_dependencies)
+            metadata.satisfied_dependencies.clear()
+            self._index_dependencies(name, metadata, satisfied)
+
+    def _mark_satisfied(
+        self,
+        state_name: str,
+        dep_name: str,
+        group: DependencyGroup
+    ) -> None:
+        """Record a satisfied dependency and update its group counter."""
+        metadata = self.state_metadata[state_name]
+        if dep_name in metadata.satisfied_dependencies:
+            return
+
+        metadata.satisfied_dependencies.add(dep_name)
+        was_met = group.is_met()
+        group.satisfied += 1
+        if not was_met and group.is_met():
+            self._unmet_groups[state_name] -= 1
+        elif was_met and not group.is_met():
+            self._unmet_groups[state_name] += 1
+
+    def _mark_unsatisfied(
+        self,
+        state_name: str,
+        dep_name: str,
+        group: Optional[DependencyGroup]
+    ) -> None:
+        """Withdraw a satisfied dependency and update its group counter."""
+        metadata = self.state_metadata[state_name]
+        if dep_name not in metadata.satisfied_dependencies:
+            return
+
+        metadata.satisfied_dependencies.discard(dep_name)
+        if group is None:
+            return
+
+        was_met = group.is_met()
+        group.satisfied -= 1
+        if not was_met and group.is_met():
+            self._unmet_groups[state_name] -= 1
+        elif was_met and not group.is_met():
+            self._unmet_groups[state_name] += 1
+
+    def create_checkpoint(self, full: bool = False) -> AgentCheckpoint:
+        """
+        Create a checkpoint of current agent state.
+
+        Unless ``full`` is set, or a new base is due, the checkpoint is a
+        delta holding only the shared_state keys and state metadata changed
+        since the previous checkpoint. Every checkpoint of a chain must be
+        kept to restore it (see AgentCheckpoint.from_chain). With a
+        ``blob_store``, the checkpoint keeps the blobs it refers to until
+        ``release_checkpoints`` is called for it.
+        """
+        changed_keys, deleted_keys = self._shared_state.take_changes()
+        signatures = {
+            name: self._metadata_signature(metadata)
+            for name, metadata in self.state_metadata.items()
+        }
+        pending = self._pending_entries()
+        queue_signature = tuple(
+            (entry.priority, entry.timestamp, entry.state_name)
+            for entry in pending
+        )
+
+        if (full or self._checkpoint_base_id is None or
+                self._checkpoint_sequence + 1 >= self.checkpoint_full_every):
+            checkpoint = AgentCheckpoint.create_from_agent(self)
+            self._checkpoint_base_id = checkpoint.checkpoint_id
+            self._checkpoint_sequence = 0
+        else:
+            self._checkpoint_sequence += 1
+            checkpoint = AgentCheckpoint.create_delta_from_agent(
+                self,
+                base_id=self._checkpoint_base_id,
+                sequence=self._checkpoint_sequence,
+                changed_keys=changed_keys,
+                deleted_keys=deleted_keys,
+                changed_states=[
+                    name for name, signature in signatures.items()
+                    if self._checkpoint_signatures.get(name) != signature
+                ],
+                priority_queue=(
+                    pending
+                    if queue_signature != self._checkpoint_queue_signature
+                    else None
+                )
+            )
+
+        self._checkpoint_signatures = signatures
+        self._checkpoint_queue_signature = queue_signature
+        if self.blob_store is not None:
+            self.blob_store.retain(
+                checkpoint.checkpoint_id,
+                (
+                    value.digest for value in checkpoint.shared_state.values()
+                    if type(value) is BlobHandle
+                )
+            )
+        return checkpoint
+
+    def release_checkpoints(self, checkpoint_ids: Iterable[str]) -> int:
+        """
+        Drop the blob references of checkpoints that were pruned, deleting
+        blobs nothing else refers to. Release a whole chain at once: its
+        deltas need the blobs of the checkpoints before them. Returns the
+        number of blobs deleted.
+        """
+        if self.blob_store is None:
+            return 0
+        return sum(
+            self.blob_store.release(checkpoint_id)
+            for checkpoint_id in checkpoint_ids
+        )
 
-    def create_checkpoint(self) -> AgentCheckpoint:
-        """Create a checkpoint of current agent state."""
-        return AgentCheckpoint.create_from_agent(self)
+    @staticmethod
+    def _metadata_signature(metadata: StateMetadata) -> Tuple:
+        """The runtime fields of a state restored from checkpoints."""
+        return (
+            metadata.status,
+            metadata.attempts,
+            metadata.last_execution,
+            metadata.last_success,
+            frozenset(metadata.satisfied_dependencies),
+            tuple(
+                (dep_name, dep_config.expiry)
+                for dep_name, dep_config in metadata.dependencies.items()
+            )
+        )
 
     async def restore_from_checkpoint(self, checkpoint: AgentCheckpoint) -> None:
-        """Restore agent state from checkpoint."""
+        """Restore agent state from a full (or materialized) checkpoint."""
+        if checkpoint.is_delta:
+            raise ValueError(
+                "Cannot restore from a delta checkpoint; apply it to its base "
+                "with AgentCheckpoint.from_chain"
+            )
         if checkpoint.agent_name != self.name:
             raise ValueError(f"Checkpoint is for agent '{checkpoint.agent_name}', not '{self.name}'")
 
         self.status = checkpoint.agent_status
-        self.priority_queue = deepcopy(checkpoint.priority_queue)
-        self.state_metadata = deepcopy(checkpoint.state_metadata)
-        self._running_states = set(checkpoint.running_states)
+
+        # Runtime fields are copied onto the registered metadata so that the
+        # compiled dependency indexes keep pointing at live objects
+        for name, saved in checkpoint.state_metadata.items():
+            metadata = self.state_metadata.get(name)
+            if metadata is None:
+                self.state_metadata[name] = deepcopy(saved)
+                continue
+
+            metadata.status = saved.status
+            metadata.attempts = saved.attempts
+            metadata.last_execution = saved.last_execution
+            metadata.last_success = saved.last_success
+            metadata.satisfied_dependencies = set(saved.satisfied_dependencies)
+            for dep_name, saved_config in saved.dependencies.items():
+                dep_config = metadata.dependencies.get(dep_name)
+                if dep_config is not None:
+                    dep_config.expiry = saved_config.expiry
+
+        self.priority_queue = StateQueue(
+            (
+                PrioritizedState(
+                    entry.priority,
+                    entry.timestamp,
+                    entry.state_name,
+                    self.state_metadata[entry.state_name],
+                    self._state_deadline(entry.state_name, entry.timestamp)
+                )
+                for entry in checkpoint.priority_queue
+            ),
+            key=self._queue_key
+        )
+        self._parked.clear()
+        self._timers.clear()
+        self._running_states = set()
         self.completed_states = set(checkpoint.completed_states)
         self.completed_once = set(checkpoint.completed_once)
-        self.shared_state = deepcopy(checkpoint.shared_state)
+        if isinstance(checkpoint.shared_state, LazyTrackedDict):
+            # Entries stay undecoded until a state reads them
+            self.shared_state = checkpoint.shared_state.lazy_copy()
+        else:
+            self.shared_state = deepcopy(checkpoint.shared_state)
         self._session_start = checkpoint.session_start
 
-        # Recreate events
-        self._state_events = {
-            name: asyncio.Event() for name in self.states
-        }
-        for state in self.completed_states:
-            self._state_events[state].set()
+        # Events are recreated from completed_states on demand
+        self._state_events = {}
+
+        self._rebuild_dependency_index()
+
+        # Timers are not checkpointed: re-arm expiries and periodic runs
+        # from the restored metadata
+        for name, metadata in self.state_metadata.items():
+            for dep_name, dep_config, _ in self._timed_dependencies.get(name, ()):
+                if dep_name in metadata.satisfied_dependencies:
+                    self._arm_expiry(name, dep_name, dep_config)
+            if name in self.completed_states:
+                self._schedule_periodic_execution(name, metadata)
+
+        # States that were mid-execution when the checkpoint was taken
+        # start over
+        for state_name in checkpoint.running_states:
+            metadata = self.state_metadata.get(state_name)
+            if metadata is not None and state_name not in self.completed_states:
+                metadata.status = StateStatus.PENDING
+                self._add_to_queue(state_name, metadata)
 
         # Set pause event based on status
         if self.status == AgentStatus.PAUSED:
@@ -177,12 +1046,17 @@ class Agent:
         else:
             self._pause_event.set()
 
-    async def pause(self) -> AgentCheckpoint:
-        """Pause agent execution and return checkpoint."""
+    async def pause(self, checkpoint: bool = True) -> Optional[AgentCheckpoint]:
+        """
+        Pause agent execution and return checkpoint. A caller that persists
+        checkpoints itself passes ``checkpoint=False``: every checkpoint
+        taken advances the delta chain and must be stored.
+        """
         if self.status == AgentStatus.RUNNING:
             self.status = AgentStatus.PAUSED
             self._pause_event.clear()
-            return self.create_checkpoint()
+            if checkpoint:
+                return self.create_checkpoint()
         return None
 
     async def resume(self) -> None:
@@ -190,6 +1064,7 @@ class Agent:
         if self.status == AgentStatus.PAUSED:
             self.status = AgentStatus.RUNNING
             self._pause_event.set()
+            self._wakeup.set()
 
     async def run(
         self,
@@ -201,22 +1076,35 @@ class Agent:
             self._session_start = time.time()
 
         self.status = AgentStatus.RUNNING
+        self._dispatch_error = None
+        if self.compaction_interval and ("compact",) not in self._timers:
+            self._arm_compaction()
 
         try:
             async with asyncio.timeout(timeout) if timeout else contextlib.nullcontext():
-                while self.priority_queue or self._running_states:
+                while (self.priority_queue or self._state_tasks or
+                       self._has_scheduled_runs()):
                     # Check for pause
                     await self._pause_event.wait()
 
-                    ready_states = await self._get_ready_states()
+                    self._wakeup.clear()
+                    self._raise_dispatch_error()
+                    self._fire_timers()
+
+                    for state_name in await self._get_ready_states():
+                        self._dispatch(state_name)
+
+                    # Anything left is parked and nothing in flight can
+                    # change a dependency, so no further state can start
+                    if (not self._state_tasks and not self.priority_queue and
+                            not self._has_scheduled_runs()):
+                        break
 
-                    if not ready_states:
-                        await asyncio.sleep(0.1)
-                        continue
+                    # Sleep until a state completes, is enqueued, a timer is
+                    # due or we resume
+                    await self._wait_for_wakeup()
 
-                    await asyncio.gather(*[
-                        self.run_state(state) for state in ready_states
-                    ])
+                self._raise_dispatch_error()
 
             self.status = AgentStatus.COMPLETED
 
@@ -225,6 +1113,20 @@ class Agent:
             raise
 
         finally:
+            # States still in flight here were orphaned by a failure,
+            # timeout or cancellation of run() itself
+            pending = list(self._state_tasks.values())
+            for task in pending:
+                task.cancel()
+            if pending:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    async with asyncio.timeout(cleanup_timeout):
+                        await asyncio.gather(*pending, return_exceptions=True)
+
+            if self._shared_memory is not None:
+                self._shared_memory.release()
+            self._release_blobs()
+
             if self._cleanup_tasks:
                 try:
                     async with asyncio.timeout(cleanup_timeout):
@@ -232,25 +1134,132 @@ class Agent:
                 except asyncio.TimeoutError:
                     pass
 
+    def _held_blobs(self) -> Optional[Set[str]]:
+        """Digests of the blobs in shared_state; None if unknown."""
+        shared_state = self._shared_state
+        # Undecoded checkpoint entries may hold handles
+        if isinstance(shared_state, LazyTrackedDict):
+            return None
+        return {
+            value.digest for value in dict.values(shared_state)
+            if type(value) is BlobHandle
+        }
+
+    def _release_blobs(self) -> None:
+        """Drop this agent's references to blobs no longer in shared_state."""
+        if self.blob_store is None:
+            return
+        held = self._held_blobs()
+        if held is not None:
+            self.blob_store.release(self._blob_owner, held)
+
+    def _discard_blobs(self, values: Iterable[Any]) -> None:
+        """Drop this agent's references to the blobs of discarded writes."""
+        if self.blob_store is None:
+            return
+        digests = {value.digest for value in values if type(value) is BlobHandle}
+        if not digests:
+            return
+        held = self._held_blobs()
+        if held is not None:
+            self.blob_store.discard(self._blob_owner, digests - held)
+
+    def state_event(self, state_name: str) -> asyncio.Event:
+        """Event that is set while a state is completed (or once cancelled)."""
+        event = self._state_events.get(state_name)
+        if event is None:
+            event = self._state_events[state_name] = asyncio.Event()
+            if state_name in self.completed_states:
+                event.set()
+        return event
+
+    def _set_state_event(self, state_name: str, value: bool) -> None:
+        event = self._state_events.get(state_name)
+        if event is not None:
+            event.set() if value else event.clear()
+
+    def _dispatch(self, state_name: str) -> None:
+        """Start a ready state as an independent task."""
+        task = asyncio.create_task(self.run_state(state_name))
+        self._state_tasks[state_name] = task
+        task.add_done_callback(
+            lambda t, name=state_name: self._on_state_done(name, t)
+        )
+
+    def _on_state_done(self, state_name: str, task: asyncio.Task) -> None:
+        """Record the outcome of a dispatched state and wake the dispatcher."""
+        if self._state_tasks.get(state_name) is task:
+            del self._state_tasks[state_name]
+            # A state re-enqueued by its own task was parked until it ended
+            self._unpark(state_name)
+
+        if not task.cancelled():
+            error = task.exception()
+            if error is not None and self._dispatch_error is None:
+                self._dispatch_error = error
+
+        self._wakeup.set()
+
+    def _raise_dispatch_error(self) -> None:
+        """Re-raise the first failure of a dispatched state in run()."""
+        if self._dispatch_error is not None:
+            error, self._dispatch_error = self._dispatch_error, None
+            raise error
+
+    def get_scheduling_stats(self) -> Dict[str, float]:
+        """Ready-to-started latency (seconds) over the recent samples."""
+        samples = sorted(self._scheduling_latency)
+        if not samples:
+            return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+        return {
+            "count": len(samples),
+            "avg": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "max": samples[-1],
+        }
+
     async def _get_ready_states(self) -> List[str]:
-        """Get states ready for execution."""
+        """Get states ready for execution, up to the free dispatch slots."""
         ready_states = []
+        now = time.monotonic()
 
         while (self.priority_queue and
-               len(ready_states) < self._semaphore._value):
-            state = heapq.heappop(self.priority_queue)
+               len(ready_states) < self.max_concurrent - len(self._state_tasks)):
+            state = self.priority_queue.pop()
 
-            if await self._can_run(state.state_name):
+            if (state.state_name not in self._state_tasks and
+                    await self._can_run(state.state_name)):
                 ready_states.append(state.state_name)
+                self._ready_at[state.state_name] = now
             else:
-                self._add_to_queue(
-                    state.state_name,
-                    state.metadata,
-                    priority_boost=-1
-                )
+                # Blocked states wait outside the heap until one of their
+                # dependencies (or the state itself) finishes
+                self._parked[state.state_name] = state
 
         return ready_states
 
+    def _unpark(self, state_name: str) -> None:
+        """Move a parked state back into the priority queue."""
+        state = self._parked.pop(state_name, None)
+        if state is not None:
+            self.priority_queue.push(state)
+            self._wakeup.set()
+
+    def _unpark_dependents(self, state_name: str) -> None:
+        """Give parked states affected by a finished state another look."""
+        if not self._parked:
+            return
+
+        self._unpark(state_name)
+        for dependent_name, _, _ in self._dependents.get(state_name, ()):
+            self._unpark(dependent_name)
+
+        # Conditions may read anything on the agent
+        for parked_name in self._conditional_states.intersection(self._parked):
+            self._unpark(parked_name)
+
     def _add_to_queue(
         self,
         state_name: str,
@@ -258,18 +1267,159 @@ class Agent:
         priority_boost: int = 0
     ) -> None:
         """Add state to priority queue with optional boost."""
-        if any(state.state_name == state_name for state in self.priority_queue):
-            return  # Prevent duplicate additions
+        priority = -(metadata.resources.priority + priority_boost)
+
+        if state_name in self._parked:
+            self._unpark(state_name)
+
+        queued = self.priority_queue.get(state_name)
+        if queued is not None:
+            # Already queued: only ever raise its priority, in place
+            if priority < queued.priority:
+                self.priority_queue.update(state_name, priority=priority)
+            return
 
-        heapq.heappush(
-            self.priority_queue,
+        now = time.time()
+        self.priority_queue.push(
             PrioritizedState(
-                -(metadata.resources.priority + priority_boost),
-                time.time(),
+                priority,
+                now,
                 state_name,
-                metadata
+                metadata,
+                self._state_deadline(state_name, now)
             )
         )
+        self._wakeup.set()
+
+    # ---------------------------------------------------------- scheduling --
+
+    def _queue_key(self, entry: PrioritizedState) -> Tuple[float, ...]:
+        """
+        Heap order of a queued state.
+
+        Aging is folded into a fixed key: a state that has waited one
+        ``aging_interval`` longer than another ranks one priority level
+        higher, which is the order ``timestamp + priority * interval`` gives.
+        Under deadline scheduling, states without a deadline use that aged
+        time as theirs (or go last without aging).
+        """
+        aged = None
+        if self.aging_interval:
+            aged = entry.timestamp + entry.priority * self.aging_interval
+
+        if self.scheduling == SchedulingPolicy.DEADLINE:
+            if entry.deadline is not None:
+                due = entry.deadline
+            else:
+                due = aged if aged is not None else float("inf")
+            return (due, entry.priority, entry.timestamp)
+
+        if aged is not None:
+            return (aged, entry.priority, entry.timestamp)
+        return (entry.priority, entry.timestamp)
+
+    def _state_deadline(self, state_name: str, enqueued_at: float) -> Optional[float]:
+        """
+        Latest time a state should start, or None if it has no deadline.
+
+        A workflow deadline leaves the state its start time minus the
+        estimated critical path from the state to the end of the workflow;
+        a state with a timeout is due within that timeout of being queued.
+        The earlier of the two applies.
+        """
+        if self.scheduling != SchedulingPolicy.DEADLINE:
+            return None
+
+        deadlines = []
+        if self.deadline is not None:
+            deadlines.append(self.deadline - self._critical_path(state_name))
+        timeout = self.state_metadata[state_name].resources.timeout
+        if timeout:
+            deadlines.append(enqueued_at + timeout)
+        return min(deadlines) if deadlines else None
+
+    def _duration_estimate(self, state_name: str) -> float:
+        """Smoothed observed duration, else the state's timeout, else 0."""
+        estimate = self._duration_estimates.get(state_name)
+        if estimate is None:
+            metadata = self.state_metadata.get(state_name)
+            estimate = (metadata.resources.timeout if metadata else None) or 0.0
+        return estimate
+
+    def _critical_path(self, state_name: str) -> float:
+        """Estimated duration of the longest chain of states from a state."""
+        paths = self._critical_paths
+        if state_name in paths:
+            return paths[state_name]
+
+        # Iterative post-order walk over the dependents; a state on the
+        # current chain counts as 0 so dependency cycles terminate
+        on_chain = {state_name}
+        stack = [(state_name, iter(self._dependents.get(state_name, ())), 0.0)]
+        while stack:
+            name, dependents, downstream = stack[-1]
+            for dependent_name, _, _ in dependents:
+                if dependent_name not in self.state_metadata:
+                    continue
+                if dependent_name in paths or dependent_name in on_chain:
+                    downstream = max(downstream, paths.get(dependent_name, 0.0))
+                    continue
+                stack[-1] = (name, dependents, downstream)
+                on_chain.add(dependent_name)
+                stack.append((
+                    dependent_name,
+                    iter(self._dependents.get(dependent_name, ())),
+                    0.0
+                ))
+                break
+            else:
+                stack.pop()
+                on_chain.discard(name)
+                paths[name] = self._duration_estimate(name) + downstream
+                if stack:
+                    parent, parent_dependents, parent_downstream = stack[-1]
+                    stack[-1] = (
+                        parent,
+                        parent_dependents,
+                        max(parent_downstream, paths[name])
+                    )
+        return paths[state_name]
+
+    def _record_duration(self, state_name: str, duration: float) -> None:
+        """Fold a completed run into the state's duration estimate."""
+        previous = self._duration_estimates.get(state_name)
+        if previous is not None:
+            alpha = self._DURATION_SMOOTHING
+            duration = alpha * duration + (1 - alpha) * previous
+        self._duration_estimates[state_name] = duration
+        self._critical_paths.clear()
+
+    def set_deadline(self, deadline: Optional[float]) -> None:
+        """
+        Set the wall-clock time (``time.time()``) the workflow should finish
+        by, or None to clear it. Only used by deadline scheduling; queued
+        states are re-keyed to the new deadline.
+        """
+        self.deadline = deadline
+        if self.scheduling != SchedulingPolicy.DEADLINE:
+            return
+
+        self._critical_paths.clear()
+        self.priority_queue = StateQueue(
+            (
+                replace(
+                    entry,
+                    deadline=self._state_deadline(entry.state_name, entry.timestamp)
+                )
+                for entry in self.priority_queue
+            ),
+            key=self._queue_key
+        )
+        for state_name, entry in self._parked.items():
+            self._parked[state_name] = replace(
+                entry,
+                deadline=self._state_deadline(state_name, entry.timestamp)
+            )
 
     async def run_state(self, state_name: str) -> None:
         """Run a state with pause support, error handling and resource management."""
@@ -279,8 +1429,19 @@ class Agent:
         metadata = self.state_metadata[state_name]
         metadata.status = StateStatus.RUNNING
         self._running_states.add(state_name)
-        context = Context(self.shared_state)
+        snapshot = self._store.snapshot() if self.snapshot_isolation else None
+        context = Context(
+            self.shared_state if snapshot is None else ChainMap({}, snapshot),
+            cache=self.context_cache,
+            type_locks=self._type_locks,
+            blob_store=self.blob_store,
+            blob_owner=self._blob_owner
+        )
+        self._state_contexts[state_name] = context
         start_time = time.time()
+        requeue = False
+        retry_delay: Optional[float] = None
+        committed = snapshot is None
 
         try:
             # Check for pause before resource acquisition
@@ -291,26 +1452,76 @@ class Agent:
                 metadata.resources,
                 timeout=metadata.resources.timeout
             ):
-                self._add_to_queue(state_name, metadata)
+                requeue = True
                 return
 
             async with self._semaphore:
-                while metadata.attempts < metadata.max_retries:
-                    # Check for pause before each attempt
+                ready_at = self._ready_at.pop(state_name, None)
+                if ready_at is not None:
+                    self._scheduling_latency.append(time.monotonic() - ready_at)
+
+                # One attempt per dispatch: a failed attempt is re-enqueued
+                # after its backoff, without holding the slot or resources
+                if metadata.attempts < metadata.max_retries:
+                    # Check for pause before the attempt
                     await self._pause_event.wait()
                     metadata.attempts += 1
+                    self.retry_budget.record_attempt()
 
                     try:
+                        attempt_start = time.monotonic()
                         async with asyncio.timeout(
                             metadata.resources.timeout or self.state_timeout
                         ):
-                            result = await self.states[state_name](context)
+                            result = await self._execute_state(
+                                state_name, metadata, context
+                            )
 
+                    except Exception as e:
+                        metadata.status = (
+                            StateStatus.TIMEOUT
+                            if isinstance(e, asyncio.TimeoutError)
+                            else StateStatus.FAILED
+                        )
+                        if snapshot is not None:
+                            self._commit_failure_writes(context)
+                        if (metadata.attempts >= metadata.max_retries or
+                                not self.retry_budget.try_acquire()):
+                            raise
+                        retry_delay = metadata.retry_policy.delay(metadata.attempts)
+
+                    else:
+                        if context.is_cancelled():
+                            # Stopped early on request: not a completion
+                            return
+
+                        if snapshot is not None:
+                            try:
+                                self._commit_writes(state_name, context, snapshot)
+                            except CommitConflictError:
+                                # Another state committed first what this one
+                                # read or wrote: run it again on a fresh
+                                # snapshot while it has attempts left
+                                conflicts = (
+                                    self._conflict_retries.get(state_name, 0) + 1
+                                )
+                                if (metadata.attempts >= metadata.max_retries or
+                                        conflicts > self.max_conflict_retries):
+                                    self._conflict_retries.pop(state_name, None)
+                                    raise
+                                self._conflict_retries[state_name] = conflicts
+                                requeue = True
+                                return
+                            self._conflict_retries.pop(state_name, None)
+                            committed = True
+                        self._record_duration(
+                            state_name, time.monotonic() - attempt_start
+                        )
                         metadata.status = StateStatus.COMPLETED
                         metadata.last_execution = time.time()
                         metadata.last_success = time.time()
-                        self._state_events[state_name].set()
                         self.completed_states.add(state_name)
+                        self._set_state_event(state_name, True)
 
                         await self._resolve_dependencies(state_name)
 
@@ -324,19 +1535,6 @@ class Agent:
                                 await asyncio.gather(*transition_tasks)
                             else:
                                 await self._handle_transition(result)
-                        break
-
-                    except asyncio.TimeoutError:
-                        metadata.status = StateStatus.TIMEOUT
-                        if metadata.attempts >= metadata.max_retries:
-                            raise
-                        await metadata.retry_policy.wait(metadata.attempts)
-
-                    except Exception as e:
-                        metadata.status = StateStatus.FAILED
-                        if metadata.attempts >= metadata.max_retries:
-                            raise
-                        await metadata.retry_policy.wait(metadata.attempts)
 
         except Exception as e:
             metadata.status = StateStatus.FAILED
@@ -348,30 +1546,289 @@ class Agent:
             raise
 
         finally:
-            self._executed_states.add(state_name)
+            if self._state_contexts.get(state_name) is context:
+                del self._state_contexts[state_name]
+            self._ready_at.pop(state_name, None)
+            if not requeue and retry_delay is None:
+                self._executed_states.add(state_name)
             await self.resource_pool.release(state_name)
             self._running_states.discard(state_name)
+            if snapshot is not None:
+                snapshot.release()
+                if not committed:
+                    self._discard_blobs(context.shared_state.maps[0].values())
+            if self._key_ttls and committed:
+                self._arm_key_expiries(context.get_written_keys())
             context.clear_state()
+            self._unpark_dependents(state_name)
+
+            if requeue:
+                metadata.status = StateStatus.PENDING
+                self._add_to_queue(state_name, metadata)
+            elif retry_delay is not None:
+                self._schedule_retry(state_name, retry_delay)
 
             if (metadata.status == StateStatus.COMPLETED and
                 any(d.lifecycle == DependencyLifecycle.PERIODIC
                     for d in metadata.dependencies.values())):
                 self._schedule_periodic_execution(state_name, metadata)
 
+    def _commit_writes(
+        self,
+        state_name: str,
+        context: Context,
+        snapshot: Snapshot
+    ) -> None:
+        """Commit the writes of a completed state as one shared_state version."""
+        overlay = context.shared_state.maps[0]
+        version = self._store.commit(
+            {
+                key: overlay[key]
+                for key in context.get_written_keys() if key in overlay
+            },
+            snapshot=snapshot
+        )
+        self._state_versions[state_name] = (snapshot.version, version)
+
+    def _commit_failure_writes(self, context: Context) -> None:
+        """
+        Commit the writes a failed state marked ``commit_on_failure``. They
+        are the state's own progress, so they are not validated against
+        concurrent commits.
+        """
+        overlay = context.shared_state.maps[0]
+        writes = {
+            key: overlay[key]
+            for key in context.get_failure_keys() if key in overlay
+        }
+        if writes:
+            self._store.commit(writes)
+
+    def _schedule_retry(self, state_name: str, delay: float) -> None:
+        """Re-enqueue a failed state once its backoff has elapsed."""
+        self._timers.schedule(
+            ("retry", state_name), time.monotonic() + delay, "retry"
+        )
+        self._wakeup.set()
+
+    def _has_scheduled_runs(self) -> bool:
+        """Whether a timer will enqueue a state (expiries only block them)."""
+        return bool(self._timers.count("retry") or self._timers.count("periodic"))
+
+    def _fire_timers(self) -> None:
+        """Act on due timers: release retries, re-arm periodic states, lapse
+        expired dependencies and shared_state keys, and compact."""
+        # Expiries first, so that a periodic state re-armed in the same batch
+        # sees which of its dependencies have lapsed
+        for key in sorted(
+            self._timers.expired(time.monotonic()),
+            key=lambda key: key[0] != "expiry"
+        ):
+            kind = key[0]
+            if kind == "shared":
+                self._expire_shared_key(key[1])
+                continue
+            if kind == "compact":
+                self.compact()
+                self._arm_compaction()
+                continue
+
+            state_name = key[1]
+            metadata = self.state_metadata.get(state_name)
+            if metadata is None:
+                continue
+
+            if kind == "retry":
+                metadata.status = StateStatus.PENDING
+                self._add_to_queue(state_name, metadata)
+            elif kind == "periodic":
+                self._rearm_periodic(state_name, metadata)
+            else:
+                self._expire_dependency(state_name, key[2])
+
+    async def _wait_for_wakeup(self) -> None:
+        """Sleep until woken, or until the next timer is due."""
+        next_due = self._timers.next_due()
+        if next_due is None:
+            await self._wakeup.wait()
+            return
+
+        timeout = max(0.0, next_due - time.monotonic())
+        with contextlib.suppress(asyncio.TimeoutError):
+            async with asyncio.timeout(timeout):
+                await self._wakeup.wait()
+
+    # -------------------------------------------------------------- memory --
+
+    def expire_shared_keys(self, prefix: str, ttl: Optional[float]) -> None:
+        """
+        Remove shared_state keys starting with ``prefix`` once ``ttl``
+        seconds pass without a state writing them; a ttl of None removes the
+        policy. The longest ttl of the matching prefixes applies. Only writes
+        made through a state's Context are seen.
+        """
+        if ttl is None:
+            self._key_ttls.pop(prefix, None)
+        else:
+            self._key_ttls[prefix] = ttl
+
+    def _arm_key_expiries(self, keys: Iterable[str]) -> None:
+        """(Re)start the expiry timers of freshly written shared_state keys."""
+        now = time.monotonic()
+        for key in keys:
+            ttl = max(
+                (ttl for prefix, ttl in self._key_ttls.items() if key.startswith(prefix)),
+                default=None
+            )
+            if ttl is not None:
+                self._timers.schedule(("shared", key), now + ttl, "shared")
+
+    def _expire_shared_key(self, key: str) -> None:
+        """Drop an expired shared_state key with its type-lock metadata."""
+        self._store.commit({}, (
+            key, Context._META_TYPED + key, Context._META_VALIDATED + key
+        ))
+        self._type_locks.forget(key)
+
+    def _arm_compaction(self) -> None:
+        self._timers.schedule(
+            ("compact",), time.monotonic() + self.compaction_interval, "compact"
+        )
+
+    def compact(self) -> None:
+        """
+        Drop bookkeeping that outlived its state and tighten the completion
+        bitsets.
+
+        Names that are no longer states (e.g. restored from an older
+        checkpoint) are dropped from the completion sets, which are then
+        re-indexed over the defined states; per-state estimates, statistics,
+        events and checkpoint signatures of undefined states are discarded,
+        as are type locks of removed variables, idle resource pool events
+        and expired context cache entries. Runs every
+        ``compaction_interval`` seconds while the agent runs, if set.
+        """
+        live = self.state_metadata
+        running = set(self._running_states)
+        sets = {
+            name: [
+                state for state in getattr(self, name)
+                if state in live or state in running
+            ]
+            for name in (
+                "completed_states", "completed_once",
+                "_running_states", "_executed_states"
+            )
+        }
+        self._state_index = StateIndex(live)
+        for name, states in sets.items():
+            setattr(self, name, states)
+
+        for mapping in (
+            self._duration_estimates, self._hedge_stats, self._fingerprints,
+            self._state_events, self._checkpoint_signatures, self._state_versions
+        ):
+            for name in [name for name in mapping if name not in live]:
+                del mapping[name]
+        for name in [name for name in self._ready_at if name not in self._state_tasks]:
+            del self._ready_at[name]
+        for name in [name for name, entries in self._dependents.items() if not entries]:
+            del self._dependents[name]
+        self._critical_paths.clear()
+        for prefix, types in (
+            (Context._META_TYPED, self._type_locks.typed),
+            (Context._META_VALIDATED, self._type_locks.validated)
+        ):
+            for key in [key for key in types if prefix + key not in self.shared_state]:
+                del types[key]
+
+        self.resource_pool.compact()
+        self.context_cache.purge_expired()
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by each of the agent's structures, plus
+        ``total``.
+
+        Objects reachable from several structures are counted once, under
+        the first listed (state metadata comes before the queue and indexes
+        that reference it). ``shared_memory`` is the size of the segments
+        held for process workers. State functions, executors and the event
+        loop are not counted.
+        """
+        structures = {
+            "state_metadata": (self.state_metadata,),
+            "dependency_index": (
+                self._dependents, self._unmet_groups, self._timed_dependencies,
+                self._dynamic_dependencies, self._conditional_states
+            ),
+            "queue": (self.priority_queue, self._parked),
+            "timers": (self._timers,),
+            "completion_sets": (
+                self._state_index, self.completed_states, self.completed_once,
+                self._running_states, self._executed_states
+            ),
+            "shared_state": (
+                self._shared_state, self._store, self._key_ttls, self._type_locks
+            ),
+            "contexts": (self._state_contexts,),
+            "result_cache": (self.result_cache, self._fingerprints),
+            "context_cache": (self.context_cache,),
+            "statistics": (
+                self._scheduling_latency, self._duration_estimates,
+                self._critical_paths, self._hedge_stats, self.retry_budget,
+                self._ready_at, self._state_versions
+            ),
+            "checkpoints": (self._checkpoint_signatures,),
+            "state_events": (self._state_events,),
+            "resource_pool": (self.resource_pool,),
+        }
+
+        seen: Set[int] = set()
+        report = {
+            name: sum(deep_sizeof(obj, seen) for obj in objects)
+            for name, objects in structures.items()
+        }
+        report["shared_memory"] = (
+            self._shared_memory.stats()["bytes"]
+            if self._shared_memory is not None else 0
+        )
+        report["total"] = sum(report.values())
+        return report
+
+    def _pending_entries(self) -> List[PrioritizedState]:
+        """Every state waiting to run: queued, parked or backing off."""
+        entries = self.priority_queue.entries() + list(self._parked.values())
+        now = time.time()
+        for _, state_name in self._timers.keys("retry"):
+            metadata = self.state_metadata[state_name]
+            entries.append(PrioritizedState(
+                -metadata.resources.priority,
+                now,
+                state_name,
+                metadata,
+                self._state_deadline(state_name, now)
+            ))
+        return entries
+
+    def get_retry_stats(self) -> Dict[str, float]:
+        """Retry budget usage and the number of retries waiting on backoff."""
+        stats = self.retry_budget.stats()
+        stats["delayed"] = self._timers.count("retry")
+        return stats
+
     async def _handle_failure(self, state_name: str, error: Exception) -> None:
         """Handle state execution failures."""
         metadata = self.state_metadata[state_name]
 
         # Reset dependent states that require this state
-        for dep_name, dep_metadata in self.state_metadata.items():
-            for dep in dep_metadata.dependencies.values():
-                if (dep.type in {DependencyType.REQUIRED, DependencyType.SEQUENTIAL} and
-                    state_name in dep_metadata.dependencies):
-                    dep_metadata.status = StateStatus.PENDING
-                    dep_metadata.satisfied_dependencies.discard(state_name)
+        for dependent_name, dep_config, group in self._dependents.get(state_name, ()):
+            if dep_config.type in {DependencyType.REQUIRED, DependencyType.SEQUENTIAL}:
+                self.state_metadata[dependent_name].status = StateStatus.PENDING
+                self._mark_unsatisfied(dependent_name, state_name, group)
 
         # Clear any cached results
-        self._state_events[state_name].clear()
+        self._set_state_event(state_name, False)
         self.completed_states.discard(state_name)
 
         # Add compensation task to queue if defined
@@ -388,7 +1845,7 @@ class Agent:
         state_name: str,
         metadata: StateMetadata
     ) -> None:
-        """Schedule periodic re-execution of states."""
+        """Re-arm a state once the shortest of its periodic intervals elapses."""
         min_interval = float('inf')
 
         # Find minimum interval from periodic dependencies
@@ -398,12 +1855,58 @@ class Agent:
                 min_interval = min(min_interval, dep.interval)
 
         if min_interval < float('inf'):
-            # Schedule re-execution after interval
-            self._add_to_queue(
-                state_name,
-                metadata,
-                priority_boost=-int(min_interval)  # Lower priority for periodic tasks
+            elapsed = time.time() - (metadata.last_execution or time.time())
+            self._timers.schedule(
+                ("periodic", state_name),
+                time.monotonic() + max(0.0, min_interval - elapsed),
+                "periodic"
             )
+            self._wakeup.set()
+
+    def _rearm_periodic(self, state_name: str, metadata: StateMetadata) -> None:
+        """Queue a periodic state to run again, with the periodic dependencies
+        that have lapsed since its last run, so they are re-satisfied."""
+        if metadata.status == StateStatus.CANCELLED:
+            return
+
+        for dep_name, dep_config, _ in self._timed_dependencies.get(state_name, ()):
+            if (dep_config.lifecycle == DependencyLifecycle.PERIODIC and
+                    dep_name not in metadata.satisfied_dependencies):
+                dep_metadata = self.state_metadata.get(dep_name)
+                if (dep_metadata is not None and
+                        dep_metadata.status != StateStatus.CANCELLED and
+                        dep_name not in self._state_tasks):
+                    self._rearm(dep_name, dep_metadata)
+
+        self._rearm(state_name, metadata)
+
+    def _rearm(self, state_name: str, metadata: StateMetadata) -> None:
+        """Queue a finished state for a fresh run with its full retry allowance."""
+        self._executed_states.discard(state_name)
+        metadata.attempts = 0
+        metadata.status = StateStatus.PENDING
+        self._add_to_queue(state_name, metadata)
+
+    def _arm_expiry(
+        self,
+        state_name: str,
+        dep_name: str,
+        dep_config: DependencyConfig
+    ) -> None:
+        """Schedule the lapse of a satisfied dependency at its expiry time."""
+        if dep_config.expiry is None:
+            return
+        self._timers.schedule(
+            ("expiry", state_name, dep_name),
+            time.monotonic() + (dep_config.expiry - time.time()),
+            "expiry"
+        )
+
+    def _expire_dependency(self, state_name: str, dep_name: str) -> None:
+        """Withdraw a TEMPORARY or PERIODIC dependency whose expiry has fired."""
+        for timed_name, _, group in self._timed_dependencies.get(state_name, ()):
+            if timed_name == dep_name:
+                self._mark_unsatisfied(state_name, dep_name, group)
 
     async def _handle_transition(
         self,
@@ -434,131 +1937,134 @@ class Agent:
         """Resolve dependencies with lifecycle management."""
         current_time = time.time()
 
-        for dependent_name, dependent_metadata in self.state_metadata.items():
-            for dep_name, dep_config in dependent_metadata.dependencies.items():
-                if dep_name != state_name:
-                    continue
-
-                # Handle different lifecycle types
-                if dep_config.lifecycle == DependencyLifecycle.TEMPORARY:
-                    if not dep_config.expiry:
-                        dep_config.expiry = current_time + (dep_config.timeout or 3600)
-
-                elif dep_config.lifecycle == DependencyLifecycle.PERIODIC:
-                    if dep_config.interval:
-                        dep_config.expiry = current_time + dep_config.interval
-
-                # Mark dependency as satisfied if appropriate
-                if dep_config.type in {
-                    DependencyType.REQUIRED,
-                    DependencyType.SEQUENTIAL
-                }:
-                    dependent_metadata.satisfied_dependencies.add(state_name)
-
-                    # Add to queue if ready to run
-                    if await self._can_run(dependent_name):
-                        self._add_to_queue(
-                            dependent_name,
-                            dependent_metadata
-                        )
-
-    async def _can_run(self, state_name: str) -> bool:
-        """Check if state can run with comprehensive dependency checking."""
-        metadata = self.state_metadata[state_name]
-        current_time = time.time()
-
-        if metadata.status in {StateStatus.RUNNING, StateStatus.FAILED}:
-            return False
-
-        satisfied_groups: Dict[str, Set[str]] = {}
-
-        for dep_name, dep_config in metadata.dependencies.items():
-            dep_metadata = self.state_metadata.get(dep_name)
-            if not dep_metadata:
+        for dependent_name, dep_config, group in self._dependents.get(state_name, ()):
+            dependent_metadata = self.state_metadata.get(dependent_name)
+            if dependent_metadata is None:
                 continue
 
-            # Check if already satisfied based on lifecycle
-            if dep_name in metadata.satisfied_dependencies:
-                # Handle different lifecycle types
-                if dep_config.lifecycle == DependencyLifecycle.ONCE:
-                    continue
+            # Handle different lifecycle types
+            if dep_config.lifecycle == DependencyLifecycle.TEMPORARY:
+                dep_config.expiry = current_time + (dep_config.timeout or 3600)
+                self._arm_expiry(dependent_name, state_name, dep_config)
 
-                elif dep_config.lifecycle == DependencyLifecycle.SESSION:
-                    if (self._session_start and
-                        dep_metadata.last_execution >= self._session_start):
-                        continue
+            elif dep_config.lifecycle == DependencyLifecycle.PERIODIC:
+                if dep_config.interval:
+                    dep_config.expiry = current_time + dep_config.interval
+                    self._arm_expiry(dependent_name, state_name, dep_config)
 
-                elif dep_config.lifecycle == DependencyLifecycle.TEMPORARY:
-                    if dep_config.expiry and current_time < dep_config.expiry:
-                        continue
+            if group is not None:
+                self._mark_satisfied(dependent_name, state_name, group)
 
-                elif dep_config.lifecycle == DependencyLifecycle.PERIODIC:
-                    if (dep_config.interval and
-                        dep_metadata.last_execution and
-                        current_time < dep_metadata.last_execution + dep_config.interval):
-                        continue
+            # Add to queue if ready to run
+            if (not self._unmet_groups[dependent_name] and
+                    await self._can_run(dependent_name)):
+                self._add_to_queue(dependent_name, dependent_metadata)
 
-            # Group dependencies by type for complex dependency logic
-            group_key = f"{dep_config.type}_{id(dep_config)}"
-            if group_key not in satisfied_groups:
-                satisfied_groups[group_key] = set()
+    def _lifecycle_valid(
+        self,
+        dep_name: str,
+        dep_config: DependencyConfig
+    ) -> bool:
+        """
+        Check whether a satisfied SESSION dependency belongs to this session.
+        TEMPORARY and PERIODIC dependencies are lapsed by expiry timers.
+        """
+        dep_metadata = self.state_metadata.get(dep_name)
+        return bool(
+            self._session_start and dep_metadata and
+            dep_metadata.last_execution and
+            dep_metadata.last_execution >= self._session_start
+        )
 
-            # Check dependency conditions
-            is_satisfied = False
+    async def _can_run(self, state_name: str) -> bool:
+        """Check if state can run using the precompiled dependency groups."""
+        metadata = self.state_metadata[state_name]
 
-            if dep_config.type == DependencyType.REQUIRED:
-                is_satisfied = dep_metadata.status == StateStatus.COMPLETED
+        if metadata.status in {StateStatus.RUNNING, StateStatus.FAILED}:
+            return False
 
-            elif dep_config.type == DependencyType.OPTIONAL:
-                is_satisfied = dep_name not in self._running_states
+        # Lapse dependencies from an earlier session before looking at the
+        # counters
+        for dep_name, dep_config, group in self._timed_dependencies.get(state_name, ()):
+            if (dep_config.lifecycle == DependencyLifecycle.SESSION and
+                    dep_name in metadata.satisfied_dependencies and
+                    not self._lifecycle_valid(dep_name, dep_config)):
+                self._mark_unsatisfied(state_name, dep_name, group)
 
-            elif dep_config.type == DependencyType.PARALLEL:
-                is_satisfied = True  # Can always run in parallel
+        if self._unmet_groups.get(state_name, 0):
+            metadata.status = StateStatus.BLOCKED
+            return False
 
-            elif dep_config.type == DependencyType.CONDITIONAL:
+        for dep_name, dep_config in self._dynamic_dependencies.get(state_name, ()):
+            if dep_config.type == DependencyType.OPTIONAL:
+                is_satisfied = dep_name not in self._running_states
+            else:
                 is_satisfied = not dep_config.condition or dep_config.condition(self)
 
-            if is_satisfied:
-                satisfied_groups[group_key].add(dep_name)
-
-        # Check complex dependency relationships
-        for dep_name, dep_config in metadata.dependencies.items():
-            group_key = f"{dep_config.type}_{id(dep_config)}"
-            group = satisfied_groups[group_key]
-
-            if dep_config.type == DependencyType.XOR:
-                if len(group) != 1:
-                    metadata.status = StateStatus.BLOCKED
-                    return False
-
-            elif dep_config.type == DependencyType.AND:
-                if len(group) != len([
-                    d for d in metadata.dependencies.values()
-                    if f"{d.type}_{id(d)}" == group_key
-                ]):
-                    metadata.status = StateStatus.BLOCKED
-                    return False
-
-            elif dep_config.type == DependencyType.OR:
-                if not group:
-                    metadata.status = StateStatus.BLOCKED
-                    return False
+            if not is_satisfied:
+                metadata.status = StateStatus.BLOCKED
+                return False
 
         metadata.status = StateStatus.READY
         return True
 
-    def cancel_state(self, state_name: str) -> None:
-        """Cancel a pending or running state."""
-        if state_name in self.state_metadata:
-            metadata = self.state_metadata[state_name]
-            metadata.status = StateStatus.CANCELLED
+    def cancel_state(self, state_name: str, grace_period: float = 0.0) -> None:
+        """
+        Cancel a pending or running state.
+
+        A running state is asked to stop through ``Context.is_cancelled`` and
+        its task is cancelled after ``grace_period`` seconds (at once by
+        default); its resources and scratch data are released as the task
+        unwinds.
+        """
+        if state_name not in self.state_metadata:
+            return
+
+        metadata = self.state_metadata[state_name]
+        metadata.status = StateStatus.CANCELLED
+        self.priority_queue.remove(state_name)
+        self._parked.pop(state_name, None)
+        self._timers.cancel(("retry", state_name))
+        self._timers.cancel(("periodic", state_name))
+
+        context = self._state_contexts.get(state_name)
+        if context is not None:
+            context.request_cancel()
+
+        task = self._state_tasks.get(state_name)
+        if task is not None and not task.done():
+            if grace_period > 0:
+                handle = asyncio.get_running_loop().call_later(
+                    grace_period, self._hard_cancel, state_name, task
+                )
+                task.add_done_callback(lambda _: handle.cancel())
+            else:
+                self._hard_cancel(state_name, task)
+        else:
             self._running_states.discard(state_name)
-            self._state_events[state_name].set()
 
-    async def cancel_all(self) -> None:
-        """Cancel all pending and running states."""
-        for state_name in list(self._running_states):
-            self.cancel_state(state_name)
+        self._set_state_event(state_name, True)
+
+    def _hard_cancel(self, state_name: str, task: asyncio.Task) -> None:
+        """Cancel a state's task unless it is already cleaning up."""
+        context = self._state_contexts.get(state_name)
+        if context is not None and context.is_cancelled():
+            task.cancel()
 
+    async def cancel_all(self, grace_period: float = 0.0) -> None:
+        """
+        Cancel all pending and running states, returning once every running
+        state has released its resources.
+        """
         self.priority_queue.clear()
-        await asyncio.gather(*self._cleanup_tasks)
\ No newline at end of file
+        self._parked.clear()
+        self._timers.clear("retry", "periodic")
+
+        for state_name in set(self._running_states).union(self._state_tasks):
+            self.cancel_state(state_name, grace_period)
+
+        tasks = list(self._state_tasks.values())
+        if tasks:
+            await asyncio.wait(tasks)
+        await asyncio.gather(*self._cleanup_tasks)
+        self.close()
\ No newline at end of file
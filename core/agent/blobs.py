@@ -0,0 +1,269 @@
+"""Content-addressed spill store for large shared_state values."""
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from core.agent.runtime import deep_sizeof, estimate_size
+
+# Layout of a pickled value: section count, then (offset, length) of the
+# pickle stream and of each out-of-band buffer, each section aligned
+_COUNT = struct.Struct("<I")
+_SECTION = struct.Struct("<QQ")
+_ALIGN = 64
+
+
+def encode_value(value: Any) -> Tuple[str, List[Any]]:
+    """
+    Encoding name and byte chunks of a value for out-of-process storage.
+
+    Bytes are kept raw ("bytes"). Anything else is pickled with protocol 5
+    ("pickle"): a header, the pickle stream and its out-of-band buffers
+    (array data) aligned after it, so ``decode_value`` can rebuild arrays
+    over the stored bytes without copying them.
+    """
+    if type(value) is bytes:
+        return "bytes", [value]
+
+    buffers: List[pickle.PickleBuffer] = []
+    try:
+        stream = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+        sections = [stream] + [buffer.raw() for buffer in buffers]
+    except BufferError:
+        # Non-contiguous buffers cannot be stored out-of-band
+        sections = [pickle.dumps(value, protocol=5)]
+
+    header = bytearray(_COUNT.pack(len(sections)))
+    chunks: List[Any] = [header]
+    offset = _COUNT.size + _SECTION.size * len(sections)
+    for section in sections:
+        padding = -offset % _ALIGN
+        if padding:
+            chunks.append(bytes(padding))
+            offset += padding
+        length = memoryview(section).nbytes
+        header += _SECTION.pack(offset, length)
+        chunks.append(section)
+        offset += length
+    return "pickle", chunks
+
+
+def decode_value(data: memoryview, encoding: str, copy: bool = False) -> Any:
+    """
+    Rebuild a value from ``encode_value`` output. Out-of-band buffers are
+    views of ``data`` unless ``copy`` is set.
+    """
+    if encoding == "bytes":
+        return bytes(data)
+
+    count = _COUNT.unpack_from(data)[0]
+    sections = [
+        data[offset:offset + length]
+        for offset, length in (
+            _SECTION.unpack_from(data, _COUNT.size + index * _SECTION.size)
+            for index in range(count)
+        )
+    ]
+    buffers = [bytearray(section) for section in sections[1:]] if copy else sections[1:]
+    return pickle.loads(sections[0], buffers=buffers)
+
+
+def _blob_path(directory: str, digest: str) -> str:
+    return os.path.join(directory, digest[:2], digest)
+
+
+def _map(path: str) -> memoryview:
+    """Read-only memoryview of a file, mapped rather than read."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        # The mapping stays open for as long as a view of it is alive
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+@dataclass(frozen=True, slots=True)
+class BlobHandle:
+    """
+    Stand-in stored in shared_state for a value spilled to a BlobStore.
+
+    ``load`` decodes the value from a memory map of the blob, so nothing is
+    read before it is needed; arrays pickled out-of-band (numpy, pandas)
+    come back as read-only views of the mapped file rather than copies.
+    Handles are immutable and copying one returns it.
+    """
+    digest: str
+    size: int
+    encoding: str  # "bytes" (stored raw) or "pickle"
+    directory: str
+    value_type: Optional[type] = None
+
+    @property
+    def path(self) -> str:
+        return _blob_path(self.directory, self.digest)
+
+    def view(self) -> memoryview:
+        """Read-only view of the stored bytes (raw values only)."""
+        if self.encoding != "bytes":
+            raise TypeError(
+                f"Blob {self.digest[:12]} holds a pickled "
+                f"{getattr(self.value_type, '__name__', 'value')}, not bytes"
+            )
+        return _map(self.path)
+
+    def load(self) -> Any:
+        """Decode the value."""
+        return decode_value(_map(self.path), self.encoding)
+
+    def __copy__(self) -> "BlobHandle":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "BlobHandle":
+        return self
+
+
+class BlobStore:
+    """
+    Directory of large values, written once and addressed by content.
+
+    Values at least ``threshold`` bytes in size are worth spilling (see
+    ``should_spill``); ``put`` writes one (see ``encode_value``) and
+    returns the handle to keep in its place. A value that is already stored
+    is not written again.
+
+    Blobs are reference-counted by owner: ``put`` adds the owner's
+    reference, ``retain`` adds references to stored blobs, and ``release``
+    and ``discard`` drop them. A blob written by this store is deleted once
+    no owner references it; blobs found in the directory are never deleted.
+    Checkpoints hold handles only, so an agent makes each checkpoint an
+    owner of the blobs it refers to until the checkpoint is released.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        threshold: int = 16 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = deep_sizeof
+    ):
+        self.directory = os.path.abspath(directory)
+        self.threshold = threshold
+        self.sizeof = sizeof
+
+        self._lock = threading.Lock()
+        # digest -> owners referencing it, for blobs this store wrote
+        self._holders: Dict[str, Set[Hashable]] = {}
+        self._sizes: Dict[str, int] = {}
+
+        self.writes = 0
+        self.reuses = 0
+        self.deletes = 0
+
+    # -------------------------------------------------------------- writing --
+
+    def should_spill(self, value: Any) -> bool:
+        """Whether a value is large enough to be stored here."""
+        if type(value) is BlobHandle:
+            return False
+        return estimate_size(value, self.sizeof) >= self.threshold
+
+    def put(self, value: Any, owner: Hashable = None) -> BlobHandle:
+        """Store a value (once) and return its handle."""
+        encoding, chunks = encode_value(value)
+        hasher = hashlib.sha256(encoding.encode())
+        for chunk in chunks:
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        size = sum(memoryview(chunk).nbytes for chunk in chunks)
+
+        path = _blob_path(self.directory, digest)
+        if os.path.exists(path):
+            self.reuses += 1
+            written = False
+        else:
+            self._write(path, chunks)
+            self.writes += 1
+            written = True
+
+        with self._lock:
+            holders = self._holders.get(digest)
+            if holders is None and written:
+                holders = self._holders[digest] = set()
+                self._sizes[digest] = size
+            if holders is not None:
+                holders.add(owner)
+
+        return BlobHandle(digest, size, encoding, self.directory, type(value))
+
+    @staticmethod
+    def _write(path: str, chunks: List[Any]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    # -------------------------------------------------------------- cleanup --
+
+    def retain(self, owner: Hashable, digests: Iterable[str]) -> None:
+        """Add ``owner``'s reference to the given blobs written by this store."""
+        with self._lock:
+            for digest in digests:
+                holders = self._holders.get(digest)
+                if holders is not None:
+                    holders.add(owner)
+
+    def release(self, owner: Hashable, keep: Iterable[str] = ()) -> int:
+        """
+        Drop ``owner``'s references to every blob but the digests in
+        ``keep``, deleting blobs left unreferenced. Returns how many were
+        deleted.
+        """
+        keep = set(keep)
+        with self._lock:
+            for digest in keep:
+                holders = self._holders.get(digest)
+                if holders is not None:
+                    holders.add(owner)
+            digests = [digest for digest in self._holders if digest not in keep]
+        return self.discard(owner, digests)
+
+    def discard(self, owner: Hashable, digests: Iterable[str]) -> int:
+        """
+        Drop ``owner``'s references to the given blobs, deleting blobs left
+        unreferenced. Returns how many were deleted.
+        """
+        removed = []
+        with self._lock:
+            for digest in set(digests):
+                holders = self._holders.get(digest)
+                if holders is None:
+                    continue
+                holders.discard(owner)
+                if not holders:
+                    del self._holders[digest]
+                    self._sizes.pop(digest, None)
+                    removed.append(digest)
+
+        for digest in removed:
+            try:
+                os.remove(_blob_path(self.directory, digest))
+            except OSError:
+                pass
+        self.deletes += len(removed)
+        return len(removed)
+
+    def stats(self) -> Dict[str, int]:
+        """Blobs written by this store and write/reuse/delete counters."""
+        with self._lock:
+            return {
+                "blobs": len(self._holders),
+                "bytes": sum(self._sizes.values()),
+                "writes": self.writes,
+                "reuses": self.reuses,
+                "deletes": self.deletes,
+            }
@@ -0,0 +1,150 @@
+"""Bounded TTL cache behind ``Context.set_cached`` / ``get_cached``."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from core.agent.runtime import deep_sizeof
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire ``ttl`` seconds after being set.
+
+    The cache is bounded by ``max_entries`` and, if set, by ``max_bytes``;
+    the least recently used entries are evicted first. Bytes are only
+    accounted when ``max_bytes`` is set or ``set`` is given a ``size``;
+    otherwise values are measured with ``sizeof`` (``deep_sizeof`` by
+    default). A value larger than ``max_bytes`` is not stored.
+
+    Expired entries are dropped when looked up, or all at once by
+    ``purge_expired``. ``default_ttl`` of None keeps entries until evicted.
+    The cache is thread-safe, so states running on the agent's thread pool
+    can share it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: Optional[int] = None,
+        default_ttl: Optional[float] = 300.0,
+        sizeof: Callable[[Any], int] = deep_sizeof
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+
+        self._lock = threading.Lock()
+        # key -> (value, expires_at or None, size)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Value stored under ``key``, or ``default`` if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at = entry[1]
+                if expires_at is not None and expires_at <= time.monotonic():
+                    self._drop(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+            self.misses += 1
+            return default
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = _MISSING,
+        size: Optional[int] = None
+    ) -> bool:
+        """
+        Store ``value`` for ``ttl`` seconds (``default_ttl`` if omitted, no
+        expiry if None). ``size`` overrides the measured size in bytes.
+        Returns False if the value is too large to be cached.
+        """
+        if ttl is _MISSING:
+            ttl = self.default_ttl
+        if size is None:
+            size = self.sizeof(value) if self.max_bytes is not None else 0
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while (len(self._entries) > self.max_entries or
+                   (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove an entry; False if there was none."""
+        with self._lock:
+            return self._drop(key)
+
+    def purge_expired(self) -> int:
+        """Remove every expired entry, returning how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, (_, expires_at, _) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                self._drop(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        """Remove every entry; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (
+            entry[1] is None or entry[1] > time.monotonic()
+        )
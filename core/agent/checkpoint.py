@@ -1,42 +1,413 @@
 """Checkpoint management for agents."""
 
+from collections.abc import ItemsView, KeysView, ValuesView
 from dataclasses import dataclass, field
-from typing import Dict, Set, List, Any, Optional, TYPE_CHECKING
+from enum import Enum
+from typing import (
+    Dict, Set, List, Any, Callable, Iterable, Iterator, Optional, Tuple,
+    TYPE_CHECKING
+)
+import hashlib
+import pickle
 import time
+import uuid
+
+from core.agent.blobs import BlobHandle
 
 if TYPE_CHECKING:
     from core.agent.base import Agent
     from core.agent.state import AgentStatus, StateMetadata, PrioritizedState
 
 
+# Values of these types cannot change without being assigned again
+_IMMUTABLE_TYPES = (
+    str, bytes, int, float, complex, bool, type(None), frozenset, range,
+    Enum, BlobHandle
+)
+
+
+def _may_mutate(value: Any) -> bool:
+    """Whether a value may be changed in place."""
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return False
+    if type(value) is tuple:
+        return any(_may_mutate(item) for item in value)
+    return True
+
+
+def _fingerprint(value: Any) -> Optional[bytes]:
+    """Digest of a value's pickled form, or None if it cannot be pickled."""
+    try:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class TrackedDict(dict):
+    """
+    Dict that records the keys assigned or deleted since the last
+    ``take_changes()``.
+
+    Assignments are tracked directly. A value that may be mutated in place
+    (lists, dicts, sets, arbitrary objects) cannot be watched, so
+    ``take_changes`` compares a digest of its pickled form with the one
+    taken last time instead: the key is reported only if the digest
+    changed, or if the value cannot be pickled. Hashing is much cheaper
+    than the copy a reported value costs the checkpoint.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        # Keys whose values may change without an assignment, with the
+        # digest of the value at the last take_changes (None: not taken)
+        self._mutable: Dict[str, Optional[bytes]] = {
+            key: None for key, value in dict.items(self) if _may_mutate(value)
+        }
+
+    def _track_value(
+        self,
+        key: str,
+        value: Any,
+        fingerprint: Optional[bytes] = None
+    ) -> None:
+        if _may_mutate(value):
+            self._mutable[key] = fingerprint
+        else:
+            self._mutable.pop(key, None)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        self._track_value(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        self._mutable.pop(key, None)
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            self._dirty.discard(key)
+            self._deleted.add(key)
+            self._mutable.pop(key, None)
+        return super().pop(key, *default)
+
+    def popitem(self) -> Tuple[str, Any]:
+        key, value = super().popitem()
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        self._mutable.pop(key, None)
+        return key, value
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        self._deleted.update(self.keys())
+        self._dirty.clear()
+        self._mutable.clear()
+        super().clear()
+
+    def take_changes(self) -> Tuple[Set[str], Set[str]]:
+        """
+        Return (changed, deleted) keys since the last call and reset them.
+        Mutable values count as changed when their digest did.
+        """
+        changed = self._dirty
+        mutable = self._mutable
+        for key, previous in mutable.items():
+            fingerprint = _fingerprint(dict.__getitem__(self, key))
+            if fingerprint is None or fingerprint != previous:
+                changed.add(key)
+            mutable[key] = fingerprint
+        changes = (changed, self._deleted)
+        self._dirty, self._deleted = set(), set()
+        return changes
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class LazyTrackedDict(TrackedDict):
+    """
+    TrackedDict whose entries start out undecoded.
+
+    ``pending`` maps the undecoded keys to tokens; ``loader(token)`` decodes
+    a value the first time it is read. Once every entry has been loaded the
+    instance turns itself into a plain TrackedDict.
+    """
+
+    def __init__(
+        self,
+        values: Any = (),
+        pending: Optional[Dict[str, Any]] = None,
+        loader: Optional[Callable[[Any], Any]] = None
+    ):
+        super().__init__(values)
+        self._loader = loader
+        self._lazy: Dict[str, Any] = {
+            key: token for key, token in (pending or {}).items()
+            if not dict.__contains__(self, key)
+        }
+        self._settle()
+
+    def _settle(self) -> None:
+        if not self._lazy:
+            del self._lazy, self._loader
+            self.__class__ = TrackedDict
+
+    def _load(self, key: str) -> Any:
+        value = self._loader(self._lazy.pop(key))
+        dict.__setitem__(self, key, value)
+        # Loaded as checkpointed: unchanged until its digest differs
+        self._track_value(
+            key, value, _fingerprint(value) if _may_mutate(value) else None
+        )
+        self._settle()
+        return value
+
+    def _load_all(self) -> None:
+        for key in list(self._lazy):
+            self._load(key)
+
+    def lazy_copy(self, deep: bool = True) -> "LazyTrackedDict":
+        """Copy with loaded values (deep-)copied and the rest still undecoded."""
+        from copy import deepcopy
+        values = dict(dict.items(self))
+        return LazyTrackedDict(
+            deepcopy(values) if deep else values,
+            self._lazy,
+            self._loader
+        )
+
+    def __missing__(self, key: str) -> Any:
+        if key in self._lazy:
+            return self._load(key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._lazy:
+            return self._load(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or key in self._lazy
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(dict.keys(self)) + list(self._lazy))
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._lazy)
+
+    def keys(self) -> KeysView:
+        return KeysView(self)
+
+    def items(self) -> ItemsView:
+        self._load_all()
+        return dict.items(self)
+
+    def values(self) -> ValuesView:
+        self._load_all()
+        return dict.values(self)
+
+    def copy(self) -> Dict[str, Any]:
+        self._load_all()
+        return dict.copy(self)
+
+    def __eq__(self, other: object) -> bool:
+        self._load_all()
+        return dict.__eq__(self, other)
+
+    __hash__ = None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._lazy.pop(key, None)
+        super().__setitem__(key, value)
+        self._settle()
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._lazy:
+            del self._lazy[key]
+            dict.__setitem__(self, key, None)
+        super().__delitem__(key)
+        self._settle()
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self._lazy:
+            self._load(key)
+        return TrackedDict.pop(self, key, *default)
+
+    def popitem(self) -> Tuple[str, Any]:
+        self._load_all()
+        return TrackedDict.popitem(self)
+
+    def clear(self) -> None:
+        self._deleted.update(self._lazy)
+        self._lazy.clear()
+        super().clear()
+        self._settle()
+
+
 @dataclass
 class AgentCheckpoint:
-    """Checkpoint data for agent state."""
+    """
+    Checkpoint data for agent state.
+
+    A full checkpoint has ``base_id`` None. A delta checkpoint belongs to the
+    chain started by the full checkpoint ``base_id``: its ``shared_state``
+    and ``state_metadata`` hold only the entries changed since the previous
+    checkpoint of the chain (``sequence`` - 1), and ``deleted_keys`` the
+    shared_state keys removed since then. The remaining fields are always
+    complete, except ``priority_queue``, which a delta leaves None when the
+    queue did not change since the previous checkpoint. Use ``from_chain``
+    to materialize a full checkpoint.
+
+    ``shared_state`` values are deep copies taken when the checkpoint is
+    created, so it can be serialised off the event loop while the agent
+    keeps mutating its own values.
+    """
     timestamp: float
     agent_name: str
     agent_status: "AgentStatus"
-    priority_queue: List["PrioritizedState"]
+    priority_queue: Optional[List["PrioritizedState"]]
     state_metadata: Dict[str, "StateMetadata"]
     running_states: Set[str]
     completed_states: Set[str]
     completed_once: Set[str]
     shared_state: Dict[str, Any]
     session_start: Optional[float]
+    checkpoint_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    base_id: Optional[str] = None
+    sequence: int = 0
+    deleted_keys: Set[str] = field(default_factory=set)
+
+    @property
+    def is_delta(self) -> bool:
+        """Whether this checkpoint only holds changes on top of a base."""
+        return self.base_id is not None
 
     @classmethod
     def create_from_agent(cls, agent: "Agent") -> "AgentCheckpoint":
         """Create checkpoint from agent instance."""
         from copy import deepcopy
-        
+
         return cls(
             timestamp=time.time(),
             agent_name=agent.name,
             agent_status=agent.status,
-            priority_queue=deepcopy(agent.priority_queue),
+            priority_queue=deepcopy(agent._pending_entries()),
             state_metadata=deepcopy(agent.state_metadata),
             running_states=set(agent._running_states),
             completed_states=set(agent.completed_states),
             completed_once=set(agent.completed_once),
-            shared_state=deepcopy(agent.shared_state),
+            shared_state=deepcopy(dict(agent.shared_state)),
             session_start=agent._session_start
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def create_delta_from_agent(
+        cls,
+        agent: "Agent",
+        base_id: str,
+        sequence: int,
+        changed_keys: Iterable[str],
+        deleted_keys: Iterable[str],
+        changed_states: Iterable[str],
+        priority_queue: Optional[List["PrioritizedState"]] = None
+    ) -> "AgentCheckpoint":
+        """
+        Create a delta checkpoint holding only the given changes; pass the
+        pending entries as ``priority_queue`` only if they changed.
+        """
+        from copy import deepcopy
+
+        shared_state = agent.shared_state
+        return cls(
+            timestamp=time.time(),
+            agent_name=agent.name,
+            agent_status=agent.status,
+            priority_queue=(
+                deepcopy(priority_queue) if priority_queue is not None else None
+            ),
+            state_metadata={
+                name: deepcopy(agent.state_metadata[name])
+                for name in changed_states
+            },
+            running_states=set(agent._running_states),
+            completed_states=set(agent.completed_states),
+            completed_once=set(agent.completed_once),
+            shared_state={
+                key: deepcopy(shared_state[key])
+                for key in changed_keys if key in shared_state
+            },
+            session_start=agent._session_start,
+            base_id=base_id,
+            sequence=sequence,
+            deleted_keys=set(deleted_keys)
+        )
+
+    @classmethod
+    def from_chain(
+        cls,
+        base: "AgentCheckpoint",
+        deltas: Iterable["AgentCheckpoint"] = ()
+    ) -> "AgentCheckpoint":
+        """Apply deltas, in order, to a full checkpoint."""
+        if base.is_delta:
+            raise ValueError("Checkpoint chain must start with a full checkpoint")
+
+        if isinstance(base.shared_state, LazyTrackedDict):
+            shared_state = base.shared_state.lazy_copy(deep=False)
+        else:
+            shared_state = dict(base.shared_state)
+        state_metadata = dict(base.state_metadata)
+        priority_queue = base.priority_queue
+        latest = base
+
+        for delta in deltas:
+            if delta.base_id != base.checkpoint_id:
+                raise ValueError(
+                    f"Checkpoint {delta.checkpoint_id} is not based on "
+                    f"{base.checkpoint_id}"
+                )
+            if delta.sequence != latest.sequence + 1:
+                raise ValueError(
+                    f"Checkpoint chain {base.checkpoint_id} is missing "
+                    f"sequence {latest.sequence + 1}"
+                )
+
+            for key in delta.deleted_keys:
+                shared_state.pop(key, None)
+            shared_state.update(delta.shared_state)
+            state_metadata.update(delta.state_metadata)
+            if delta.priority_queue is not None:
+                priority_queue = delta.priority_queue
+            latest = delta
+
+        if latest is base:
+            return base
+
+        return cls(
+            timestamp=latest.timestamp,
+            agent_name=latest.agent_name,
+            agent_status=latest.agent_status,
+            priority_queue=priority_queue,
+            state_metadata=state_metadata,
+            running_states=latest.running_states,
+            completed_states=latest.completed_states,
+            completed_once=latest.completed_once,
+            shared_state=shared_state,
+            session_start=latest.session_start,
+            checkpoint_id=latest.checkpoint_id
+        )
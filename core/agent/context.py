@@ -10,9 +10,15 @@ Highlights
 • set_typed_variable / get_typed_variable    – first write locks *Python* type
 • set_validated_data / get_validated_data    – first write locks Pydantic model
 • All metadata (_meta_typed_* / _meta_validated_*) is persisted in shared_state
-  so a fresh Context instance can reconstruct locks after reload.
-• Constants, secrets, TTL cache, per-state scratch (typed & untyped),
-  human-in-the-loop helper.
+  so a fresh Context instance can reconstruct locks after reload; the lock
+  types themselves live in a TypeLockIndex the agent shares between its
+  contexts, so constructing one does not scan shared_state.
+• With a BlobStore, values above its size threshold are spilled to disk on
+  write and shared_state holds a BlobHandle; reads decode them lazily, as
+  they do the SharedValue stand-ins a process worker receives.
+• Constants, secrets, TTL cache (shared with other states when the agent
+  passes its own), per-state scratch (typed & untyped), human-in-the-loop
+  helper.
 
 Compatible with Python 3.8 – 3.13 and Pydantic v2 (preferred) or v1.
 """
@@ -29,12 +35,18 @@ from typing import (
     Dict,
     Optional,
     Set,
-    Tuple,
     Type,
     TypeVar,
     runtime_checkable,
 )
 
+from core.agent.blobs import BlobHandle, BlobStore
+from core.agent.cache import TTLCache
+from core.agent.sharedmem import SharedValue
+
+# Stand-ins that shared_state may hold in place of a large value
+_HANDLES = (BlobHandle, SharedValue)
+
 # ─────────────────────────────── protocol helper ────────────────────────── #
 
 try:
@@ -70,6 +82,38 @@ class StateType(Enum):
     UNTYPED = "untyped"
 
 
+# ───────────────────────────────── type locks ───────────────────────────── #
+
+class TypeLockIndex:
+    """
+    Locked types of typed and validated variables, by key.
+
+    An agent keeps one for its shared_state and hands it to every Context,
+    which updates it on first write. The persisted ``_meta_*`` keys remain
+    the source of truth: an entry only counts while its metadata key is in
+    shared_state, and a lock found there without an entry (written by a
+    worker process, restored from a checkpoint) is indexed on first use.
+    """
+
+    __slots__ = ("typed", "validated")
+
+    def __init__(self) -> None:
+        self.typed: Dict[str, Type[Any]] = {}
+        self.validated: Dict[str, Type[Any]] = {}
+
+    def forget(self, key: str) -> None:
+        """Drop both locks of a key, e.g. once it leaves shared_state."""
+        self.typed.pop(key, None)
+        self.validated.pop(key, None)
+
+    def clear(self) -> None:
+        self.typed.clear()
+        self.validated.clear()
+
+    def __len__(self) -> int:
+        return len(self.typed) + len(self.validated)
+
+
 # ────────────────────────────────── Context ─────────────────────────────── #
 
 class Context:
@@ -82,6 +126,15 @@ class Context:
         Mutable mapping persisted for the whole workflow run.
     cache_ttl : int, default 300
         TTL (seconds) for entries set via `set_cached`.
+    cache : TTLCache, optional
+        Cache behind `set_cached` / `get_cached`. Agents pass one they own
+        so entries outlive the state; without it the context gets a
+        private cache.
+    type_locks : TypeLockIndex, optional
+        Type locks shared with the other contexts over the same
+        shared_state; without it the context indexes them on its own.
+    blob_store : BlobStore, optional
+        Where large variables are spilled, referenced by ``blob_owner``.
     """
 
     # metadata prefixes stored in shared_state
@@ -93,7 +146,15 @@ class Context:
 
     # ---------------------------------------------------------------- init --
 
-    def __init__(self, shared_state: Dict[str, Any], cache_ttl: int = 300) -> None:
+    def __init__(
+        self,
+        shared_state: Dict[str, Any],
+        cache_ttl: int = 300,
+        cache: Optional[TTLCache] = None,
+        type_locks: Optional[TypeLockIndex] = None,
+        blob_store: Optional[BlobStore] = None,
+        blob_owner: Any = None,
+    ) -> None:
         self.shared_state = shared_state
         self.cache_ttl = cache_ttl
 
@@ -102,29 +163,42 @@ class Context:
         self._typed_data: Dict[str, _PBM] = {}
         self._protected_keys: Set[str] = set()
 
-        # shared-state metadata (reconstructed from shared_state)
-        self._typed_var_types: Dict[str, Type[Any]] = {}
-        self._validated_types: Dict[str, Type[_PBM]] = {}
+        # shared-state metadata, indexed lazily from the persisted _meta_* keys
+        self._type_locks = type_locks if type_locks is not None else TypeLockIndex()
+        self._typed_var_types: Dict[str, Type[Any]] = self._type_locks.typed
+        self._validated_types: Dict[str, Type[_PBM]] = self._type_locks.validated
+
+        # created on first use when not passed in
+        self._cache: Optional[TTLCache] = cache
 
-        self._cache: Dict[str, Tuple[Any, float]] = {}
+        self._blob_store = blob_store
+        self._blob_owner = blob_owner
 
-        self._restore_metadata()
+        # shared_state keys written through this instance, and those of them
+        # committed even when the state fails (see ``commit_on_failure``)
+        self._written_keys: Set[str] = set()
+        self._failure_keys: Set[str] = set()
+
+        # set by the agent when the state running with this context is cancelled
+        self._cancelled = False
 
     # ---------------------------------------------------------------- utils --
 
-    def _restore_metadata(self) -> None:
-        """
-        Rebuild internal maps from persisted _meta_* keys.
-        """
-        for k, v in self.shared_state.items():
-            if k.startswith(self._META_TYPED):
-                orig = k[len(self._META_TYPED):]
-                if orig in self.shared_state:
-                    self._typed_var_types[orig] = type(self.shared_state[orig])
-            elif k.startswith(self._META_VALIDATED):
-                orig = k[len(self._META_VALIDATED):]
-                if orig in self.shared_state and isinstance(self.shared_state[orig], _PBM):
-                    self._validated_types[orig] = type(self.shared_state[orig])
+    def _locked_type(
+        self, types: Dict[str, Type[Any]], prefix: str, key: str
+    ) -> Optional[Type[Any]]:
+        """Type locked for ``key`` by its persisted metadata, or None."""
+        if f"{prefix}{key}" not in self.shared_state:
+            # never locked, expired, or locked in a discarded overlay
+            types.pop(key, None)
+            return None
+        cls = types.get(key)
+        if cls is None and key in self.shared_state:
+            cls = self._value_type(self.shared_state[key])
+            if prefix == self._META_VALIDATED and not issubclass(cls, _PBM):
+                return None
+            types[key] = cls
+        return cls
 
     @staticmethod
     def _now() -> float:                # monotonic timestamp
@@ -150,7 +224,39 @@ class Context:
 
         Only the dotted path of the class is stored; this is informational.
         """
-        self.shared_state[f"{prefix}{key}"] = f"{cls.__module__}.{cls.__qualname__}"
+        self._write(f"{prefix}{key}", f"{cls.__module__}.{cls.__qualname__}")
+
+    def _write(self, key: str, value: Any) -> None:
+        blobs = self._blob_store
+        if blobs is not None and blobs.should_spill(value):
+            value = blobs.put(value, self._blob_owner)
+        self.shared_state[key] = value
+        self._written_keys.add(key)
+
+    def _read(self, key: str, default: Any = None) -> Any:
+        """shared_state value, decoding a spilled one."""
+        value = self.shared_state.get(key, default)
+        if type(value) in _HANDLES:
+            return value.load()
+        return value
+
+    def _read_as(self, key: str, expected: Type[Any]) -> Optional[Any]:
+        """
+        shared_state value if it is an ``expected``. A spilled value is
+        checked by its recorded type before being decoded.
+        """
+        value = self.shared_state.get(key)
+        if type(value) in _HANDLES:
+            if value.value_type is not None and not issubclass(value.value_type, expected):
+                return None
+            value = value.load()
+        return value if isinstance(value, expected) else None
+
+    @staticmethod
+    def _value_type(value: Any) -> type:
+        if type(value) in _HANDLES:
+            return value.value_type or type(value.load())
+        return type(value)
 
     # ==================================================== per-state scratch --
 
@@ -189,10 +295,23 @@ class Context:
     def set_variable(self, key: str, value: Any) -> None:
         """Cross-state variable (type can change freely)."""
         self._guard_reserved(key)
-        self.shared_state[key] = value
+        self._write(key, value)
 
     def get_variable(self, key: str, default: Any = None) -> Any:
-        return self.shared_state.get(key, default)
+        return self._read(key, default)
+
+    def get_buffer(self, key: str) -> Optional[memoryview]:
+        """
+        Read-only view of a bytes-like variable without copying it; spilled
+        bytes are memory-mapped and shared bytes viewed in place. None if the
+        variable is not set.
+        """
+        value = self.shared_state.get(key)
+        if value is None:
+            return None
+        if type(value) in _HANDLES:
+            return value.view()
+        return memoryview(value).toreadonly()
 
     def get_variable_keys(self) -> Set[str]:
         return {
@@ -205,7 +324,7 @@ class Context:
 
     def set_typed_variable(self, key: str, value: Any) -> None:
         self._guard_reserved(key)
-        current_cls = self._typed_var_types.get(key)
+        current_cls = self._locked_type(self._typed_var_types, self._META_TYPED, key)
         if current_cls is None:
             # first write → record and persist meta
             self._typed_var_types[key] = type(value)
@@ -215,11 +334,10 @@ class Context:
                 f"Typed variable '{key}' already holds {current_cls.__name__}; "
                 f"cannot store {type(value).__name__}."
             )
-        self.shared_state[key] = value
+        self._write(key, value)
 
     def get_typed_variable(self, key: str, expected: Type[Any]) -> Optional[Any]:
-        val = self.shared_state.get(key)
-        return val if isinstance(val, expected) else None
+        return self._read_as(key, expected)
 
     # =========================================== validated data (Pydantic) --
 
@@ -228,7 +346,9 @@ class Context:
         if not isinstance(value, _PBM):
             raise TypeError("set_validated_data expects a Pydantic BaseModel.")
         self._guard_reserved(key)
-        current_cls = self._validated_types.get(key)
+        current_cls = self._locked_type(
+            self._validated_types, self._META_VALIDATED, key
+        )
         if current_cls is None:
             self._validated_types[key] = type(value)
             self._persist_meta(self._META_VALIDATED, key, type(value))
@@ -237,12 +357,11 @@ class Context:
                 f"Validated key '{key}' already stores {current_cls.__name__}; "
                 f"cannot store {type(value).__name__}."
             )
-        self.shared_state[key] = value
+        self._write(key, value)
 
     def get_validated_data(self, key: str, expected: Type[_PBM_T]) -> Optional[_PBM_T]:
         self._ensure_pydantic()
-        val = self.shared_state.get(key)
-        return val if isinstance(val, expected) else None
+        return self._read_as(key, expected)
 
     # ================================================= constants / secrets --
 
@@ -250,19 +369,19 @@ class Context:
         full = f"{prefix}{key}"
         if full in self.shared_state:
             raise ValueError(f"Immutable key '{key}' already set.")
-        self.shared_state[full] = value
+        self._write(full, value)
 
     def set_constant(self, key: str, value: Any) -> None:
         self._set_immutable("const_", key, value)
 
     def get_constant(self, key: str, default: Any = None) -> Any:
-        return self.shared_state.get(f"const_{key}", default)
+        return self._read(f"const_{key}", default)
 
     def set_secret(self, key: str, value: str) -> None:
         self._set_immutable("secret_", key, value)
 
     def get_secret(self, key: str) -> Optional[str]:
-        return self.shared_state.get(f"secret_{key}")
+        return self._read(f"secret_{key}")
 
     # ==================================================== output helpers --
 
@@ -280,15 +399,67 @@ class Context:
 
     # ======================================================== cache (TTL) --
 
+    @property
+    def cache(self) -> TTLCache:
+        if self._cache is None:
+            self._cache = TTLCache(default_ttl=self.cache_ttl)
+        return self._cache
+
     def set_cached(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        self._cache[key] = (value, self._now() + (ttl or self.cache_ttl))
+        self.cache.set(key, value, ttl or self.cache_ttl)
 
     def get_cached(self, key: str, default: Any = None) -> Any:
-        val, exp = self._cache.get(key, (default, 0))
-        if self._now() < exp:
-            return val
-        self._cache.pop(key, None)
-        return default
+        return self.cache.get(key, default)
+
+    # ===================================================== write journal --
+
+    def get_written_keys(self) -> Set[str]:
+        """shared_state keys written through this context."""
+        return set(self._written_keys)
+
+    def commit_on_failure(self, key: str) -> None:
+        """
+        Keep the writes to ``key`` when the state fails. Under snapshot
+        isolation a failed state's writes are otherwise discarded; progress
+        records a retry resumes from must survive the failure.
+        """
+        self._failure_keys.add(key)
+
+    def get_failure_keys(self) -> Set[str]:
+        """Written keys to commit even if the state fails."""
+        return self._failure_keys & self._written_keys
+
+    def merge_writes(
+        self,
+        variables: Dict[str, Any],
+        state_data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Apply shared_state writes and per-state scratch produced elsewhere
+        (e.g. by a worker process) as if they were made through this context.
+        """
+        for key, value in variables.items():
+            # Locks taken elsewhere are re-indexed from shared_state
+            if key.startswith(self._META_TYPED):
+                self._typed_var_types.pop(key[len(self._META_TYPED):], None)
+            elif key.startswith(self._META_VALIDATED):
+                self._validated_types.pop(key[len(self._META_VALIDATED):], None)
+            self._write(key, value)
+        if state_data:
+            self._state_data.update(state_data)
+
+    # ====================================================== cancellation --
+
+    def request_cancel(self) -> None:
+        """Ask the state using this context to stop."""
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        """
+        Whether the state was cancelled. Long-running states should check
+        this and return early; they are hard-cancelled after the grace period.
+        """
+        return self._cancelled
 
     # ================================================= housekeeping --------
 
@@ -20,6 +20,10 @@ class DependencyType(Enum):
     AND = "and"  # All dependencies must be satisfied
     OR = "or"  # At least one dependency must be satisfied
 
+    # Members are singletons compared by identity; the identity hash keeps
+    # the per-dependency set and dict lookups out of Enum's Python __hash__
+    __hash__ = object.__hash__
+
 
 class DependencyLifecycle(Enum):
     """Lifecycle management for dependencies."""
@@ -29,8 +33,10 @@ class DependencyLifecycle(Enum):
     TEMPORARY = "temporary"  # Dependency expires after specified time
     PERIODIC = "periodic"  # Must be re-satisfied after specified interval
 
+    __hash__ = object.__hash__
+
 
-@dataclass
+@dataclass(slots=True)
 class DependencyConfig:
     """Configuration for state dependencies."""
     type: DependencyType
@@ -39,4 +45,50 @@ class DependencyConfig:
     expiry: Optional[float] = None
     interval: Optional[float] = None
     timeout: Optional[float] = None
-    retry_policy: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    retry_policy: Optional[Dict[str, Any]] = None
+
+# Dependency types tracked through completion counters; the remaining
+# types (OPTIONAL, CONDITIONAL, PARALLEL, TIMEOUT) are evaluated on demand
+GROUPED_DEPENDENCY_TYPES = frozenset({
+    DependencyType.REQUIRED,
+    DependencyType.SEQUENTIAL,
+    DependencyType.AND,
+    DependencyType.OR,
+    DependencyType.XOR,
+})
+
+# Ungrouped dependency types evaluated each time the state may run
+DYNAMIC_DEPENDENCY_TYPES = frozenset({
+    DependencyType.OPTIONAL,
+    DependencyType.CONDITIONAL,
+})
+
+# Lifecycles whose satisfaction can lapse with time
+TIMED_LIFECYCLES = frozenset({
+    DependencyLifecycle.SESSION,
+    DependencyLifecycle.TEMPORARY,
+    DependencyLifecycle.PERIODIC,
+})
+
+
+class DependencyGroup:
+    """
+    Compiled group of the same-typed dependencies of one state.
+
+    Only the number of satisfied members is tracked, so checking whether the
+    group is met is a constant-time comparison.
+    """
+
+    __slots__ = ("type", "size", "satisfied")
+
+    def __init__(self, type: DependencyType, size: int):
+        self.type = type
+        self.size = size
+        self.satisfied = 0
+
+    def is_met(self) -> bool:
+        if self.type == DependencyType.OR:
+            return self.satisfied >= 1
+        if self.type == DependencyType.XOR:
+            return self.satisfied == 1
+        return self.satisfied >= self.size
@@ -0,0 +1,237 @@
+"""Out-of-loop executors for agent states."""
+
+import asyncio
+import functools
+import inspect
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from core.agent.context import Context
+from core.agent.sharedmem import (
+    SharedMemoryTransport, detach_all, export_writes, share_resource_tracker
+)
+from core.agent.state import StateResult
+
+
+def is_async_callable(func: Callable) -> bool:
+    """Whether calling ``func`` returns a coroutine."""
+    while isinstance(func, functools.partial):
+        func = func.func
+    return (
+        inspect.iscoroutinefunction(func) or
+        inspect.iscoroutinefunction(getattr(func, "__call__", None))
+    )
+
+
+def _noop() -> None:
+    """Submitted once per worker to start the pool eagerly."""
+
+
+def _execute_in_worker(
+    func: Callable,
+    shared_state: Dict[str, Any],
+    transfer_threshold: Optional[int] = None
+) -> Tuple[StateResult, Dict[str, Any], Dict[str, Any]]:
+    """
+    Run a state function inside a worker process.
+
+    Returns the state result, the shared_state writes made by the function
+    and its per-state scratch (outputs included). With a
+    ``transfer_threshold``, large values are returned in shared memory.
+    """
+    # Segments of the previous state are no longer viewed by its values
+    detach_all()
+    try:
+        context = Context(shared_state)
+        result = func(context)
+        if inspect.iscoroutine(result):
+            result = asyncio.run(result)
+
+        writes = {key: shared_state[key] for key in context.get_written_keys()}
+        state_data = dict(context._state_data)
+        if transfer_threshold is not None:
+            writes = export_writes(writes, transfer_threshold)
+            state_data = export_writes(state_data, transfer_threshold)
+        return result, writes, state_data
+    finally:
+        detach_all()
+
+
+class ProcessStateExecutor:
+    """
+    Warm process pool that runs CPU-bound state functions.
+
+    Only the selected slice of shared_state is shipped to the worker; the
+    variables it writes and its outputs are merged back into the caller's
+    Context when the function returns. With a ``transport``, large values
+    travel through shared memory instead of being pickled into the pipe.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        mp_context: Optional[Any] = None,
+        transport: Optional[SharedMemoryTransport] = None
+    ):
+        self.max_workers = max(1, max_workers)
+        self._mp_context = mp_context
+        self.transport = transport
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            if self.transport is not None:
+                share_resource_tracker()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self._mp_context
+            )
+        return self._pool
+
+    def warm(self) -> None:
+        """Start every worker now rather than on the first state."""
+        pool = self._ensure_pool()
+        for _ in range(self.max_workers):
+            pool.submit(_noop)
+
+    @staticmethod
+    def validate(func: Callable) -> None:
+        """Fail early for functions that cannot be sent to a worker."""
+        try:
+            pickle.dumps(func)
+        except Exception as e:
+            raise ValueError(
+                "Process-mode states need a picklable, module-level function: "
+                f"{getattr(func, '__qualname__', func)!r} ({e})"
+            ) from e
+
+    async def run(
+        self,
+        func: Callable,
+        context: Context,
+        shared_keys: Optional[Iterable[str]] = None
+    ) -> StateResult:
+        """Run a state function in the pool and merge its writes into context."""
+        shared_state = context.shared_state
+        if shared_keys is None:
+            shared_slice = dict(shared_state)
+        else:
+            shared_slice = {
+                key: shared_state[key] for key in shared_keys if key in shared_state
+            }
+
+        transport = self.transport
+        if transport is None:
+            leases = None
+            threshold = None
+        else:
+            shared_slice, leases = transport.pack(shared_slice)
+            threshold = transport.threshold
+
+        loop = asyncio.get_running_loop()
+        try:
+            result, writes, state_data = await loop.run_in_executor(
+                self._ensure_pool(),
+                _execute_in_worker,
+                func,
+                shared_slice,
+                threshold
+            )
+        finally:
+            if leases:
+                transport.unlease(leases)
+
+        if transport is not None:
+            writes = transport.receive(writes)
+            state_data = transport.receive(state_data)
+        context.merge_writes(writes, state_data)
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes and unlink their shared memory."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+        if self.transport is not None:
+            self.transport.release()
+
+
+class ThreadStateExecutor:
+    """
+    Bounded, named thread pool for synchronous state functions.
+
+    Keeps its own queue depth (submitted but not started) and busy-worker
+    counts so the pool can be monitored separately from the event loop.
+    """
+
+    def __init__(self, max_workers: int, name: str = "agent"):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._busy = 0
+        self._completed = 0
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=f"{self.name}-state"
+            )
+        return self._pool
+
+    def _call(self, started: threading.Event, func: Callable, *args: Any) -> Any:
+        with self._lock:
+            if not started.is_set():
+                started.set()
+                self._queued -= 1
+            self._busy += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self._completed += 1
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run a synchronous function without blocking the loop."""
+        started = threading.Event()
+        with self._lock:
+            self._queued += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._ensure_pool(), self._call, started, func, *args
+            )
+        except asyncio.CancelledError:
+            # A submission cancelled while queued never reaches a worker
+            with self._lock:
+                if not started.is_set():
+                    started.set()
+                    self._queued -= 1
+            raise
+
+        if inspect.iscoroutine(result):
+            result = await result
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, busy workers and utilisation of the pool."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "busy": self._busy,
+                "utilization": self._busy / self.max_workers,
+                "completed": self._completed,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
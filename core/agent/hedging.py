@@ -0,0 +1,73 @@
+"""Hedged execution of tail-latency states."""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    Opt-in hedging for idempotent states.
+
+    Once ``min_samples`` durations of the state have been recorded, an
+    attempt still running after the ``percentile`` of the last ``history``
+    durations gets a second, concurrent attempt. The first to succeed wins.
+
+    Only first attempts are timed: a hedge that wins did so because it was
+    fast, so its duration would drag the percentile down. A first attempt
+    cancelled because its hedge won is recorded at the time it had run, a
+    lower bound on its duration.
+    """
+    percentile: float = 0.95
+    min_samples: int = 20
+    history: int = 100
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.percentile < 1.0:
+            raise ValueError("percentile must be between 0 and 1")
+        if self.min_samples < 1 or self.history < self.min_samples:
+            raise ValueError("history must be at least min_samples, which must be positive")
+
+
+class HedgeStats:
+    """
+    Duration history and hedging counters of one state. Attempts are timed
+    with ``clock``.
+    """
+
+    __slots__ = ("durations", "calls", "hedged", "hedge_wins", "censored", "clock")
+
+    def __init__(self, history: int, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.durations: Deque[float] = deque(maxlen=history)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Durations recorded for attempts cancelled before they finished
+        self.censored = 0
+
+    def record(self, duration: float, censored: bool = False) -> None:
+        """Record a first attempt's duration, or its lower bound."""
+        self.durations.append(duration)
+        if censored:
+            self.censored += 1
+
+    def hedge_delay(self, policy: HedgePolicy) -> Optional[float]:
+        """Delay before hedging, or None while there is too little history."""
+        if len(self.durations) < policy.min_samples:
+            return None
+        ordered = sorted(self.durations)
+        index = min(len(ordered) - 1, math.ceil(policy.percentile * len(ordered)) - 1)
+        return ordered[max(0, index)]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "censored": self.censored,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+        }
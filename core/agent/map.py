@@ -0,0 +1,169 @@
+"""Map (fan-out) state: run an item coroutine over a collection."""
+
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from core.agent.context import Context
+from core.agent.executors import ThreadStateExecutor, is_async_callable
+from core.agent.state import StateResult
+
+
+class MapStateError(Exception):
+    """Raised when items of a map state failed and failures are not allowed."""
+
+    def __init__(self, state_name: str, failed: int, processed: int):
+        self.state_name = state_name
+        self.failed = failed
+        self.processed = processed
+        super().__init__(
+            f"Map state '{state_name}': {failed} item(s) failed, "
+            f"{processed} succeeded"
+        )
+
+
+class MapState:
+    """
+    State function that applies ``func(item, context)`` to every item of a
+    collection with bounded concurrency.
+
+    Items come from a Context variable (any iterable or async iterator) or
+    from a callable taking the Context. At most ``concurrency`` items are in
+    flight and each result is folded into the accumulator as soon as it
+    finishes, so results are never held all at once.
+
+    Progress is kept in the ``_map_<name>`` variable: the accumulator, the
+    number of processed items and the failed items. When the state runs again
+    with failed items recorded (an agent retry, or after restoring a
+    checkpoint), only those items are re-run. The variable is kept when the
+    state fails, snapshot isolation included.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any, Context], Any],
+        items: Union[str, Callable[[Context], Any]],
+        reducer: Optional[Callable[[Any, Any], Any]] = None,
+        initial: Any = None,
+        output: Optional[str] = None,
+        concurrency: int = 10,
+        allow_failures: bool = False,
+        executor: Optional[Callable[[], ThreadStateExecutor]] = None
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.name = name
+        self.func = func
+        self.items = items
+        self.reducer = reducer
+        self.initial = initial
+        self.output = output or f"{name}_result"
+        self.concurrency = concurrency
+        self.allow_failures = allow_failures
+        self.progress_key = f"_map_{name}"
+        self._is_async = is_async_callable(func)
+        self._executor = executor
+
+    async def __call__(self, context: Context) -> StateResult:
+        context.commit_on_failure(self.progress_key)
+        progress = context.get_variable(self.progress_key)
+
+        if progress and progress["failed"]:
+            # Partial retry: only the items that failed last time
+            source: Any = [entry["item"] for entry in progress["failed"]]
+            accumulator = progress["accumulator"]
+            processed = progress["processed"]
+        else:
+            source = self._get_source(context)
+            accumulator = self.initial
+            processed = 0
+
+        failed: List[Dict[str, Any]] = []
+        pending: set = set()
+        index = 0
+
+        async def drain(return_when: str) -> None:
+            nonlocal pending, accumulator, processed
+            done, pending = await asyncio.wait(pending, return_when=return_when)
+            for task in done:
+                item_index, item, result, error = task.result()
+                if error is not None:
+                    failed.append({
+                        "index": item_index,
+                        "item": item,
+                        "error": f"{type(error).__name__}: {error}"
+                    })
+                    continue
+
+                processed += 1
+                if self.reducer is not None:
+                    accumulator = self.reducer(accumulator, result)
+                    if inspect.isawaitable(accumulator):
+                        accumulator = await accumulator
+
+        try:
+            if hasattr(source, "__aiter__"):
+                async for item in source:
+                    if context.is_cancelled():
+                        break
+                    if len(pending) >= self.concurrency:
+                        await drain(asyncio.FIRST_COMPLETED)
+                    pending.add(asyncio.create_task(self._run_item(index, item, context)))
+                    index += 1
+            else:
+                for item in source:
+                    if context.is_cancelled():
+                        break
+                    if len(pending) >= self.concurrency:
+                        await drain(asyncio.FIRST_COMPLETED)
+                    pending.add(asyncio.create_task(self._run_item(index, item, context)))
+                    index += 1
+
+            if pending:
+                await drain(asyncio.ALL_COMPLETED)
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+            context.set_variable(self.progress_key, {
+                "accumulator": accumulator,
+                "processed": processed,
+                "failed": failed
+            })
+
+        context.set_variable(self.output, accumulator)
+
+        if failed and not self.allow_failures:
+            raise MapStateError(self.name, len(failed), processed)
+
+        return None
+
+    def _get_source(self, context: Context) -> Any:
+        if callable(self.items):
+            source = self.items(context)
+        else:
+            source = context.get_variable(self.items)
+
+        if source is None:
+            raise ValueError(f"Map state '{self.name}' has no items to process")
+        return source
+
+    async def _run_item(
+        self,
+        index: int,
+        item: Any,
+        context: Context
+    ) -> Tuple[int, Any, Any, Optional[Exception]]:
+        try:
+            if self._is_async:
+                result = await self.func(item, context)
+            elif self._executor is not None:
+                result = await self._executor().run(self.func, item, context)
+            else:
+                result = self.func(item, context)
+            return index, item, result, None
+        except Exception as e:
+            return index, item, None, e
@@ -0,0 +1,411 @@
+"""Memoized state results keyed by function fingerprint and inputs."""
+
+import functools
+import hashlib
+import marshal
+import os
+import pickle
+import threading
+import time
+import types
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from core.agent.blobs import BlobHandle
+from core.agent.state import StateResult
+
+# (result, shared_state writes, per-state scratch)
+CachedResult = Tuple[StateResult, Dict[str, Any], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Opt-in result caching for a state.
+
+    ``inputs`` names the shared_state variables the state reads; the whole
+    shared_state is hashed when it is omitted. ``ttl`` (seconds) bounds how
+    long an entry may be replayed. Calls whose inputs or function bindings
+    cannot be hashed by content run without the cache.
+    """
+    inputs: Optional[Tuple[str, ...]] = None
+    ttl: Optional[float] = None
+
+
+class UncacheableError(TypeError):
+    """A state's inputs or bindings have no stable content hash."""
+
+
+def function_fingerprint(func: Callable) -> str:
+    """
+    Stable fingerprint of a state function's code. The values it is bound
+    to are hashed separately, per call (see ``cache_key``).
+    """
+    from core.execution.determinism import FunctionAnalyzer
+
+    while isinstance(func, functools.partial):
+        func = func.func
+    if not hasattr(func, "__code__"):
+        # Callable objects: fingerprint the class's __call__
+        func = type(func).__call__
+
+    fingerprint = FunctionAnalyzer().analyze_function(func)
+    return f"{fingerprint.function_hash}:{fingerprint.source_hash}"
+
+
+def _feed(hasher: Any, value: Any, seen: Set[int]) -> None:
+    """
+    Feed a canonical encoding of ``value`` to ``hasher``: containers by
+    content (mappings and sets in sorted order), functions by code and
+    bindings, blob handles by digest and anything else by its pickle.
+    Raises UncacheableError for values that cannot be pickled.
+    """
+    kind = type(value)
+    tag = f"{kind.__module__}.{kind.__qualname__}"
+
+    if value is None or kind in (bool, int, float, complex, str):
+        hasher.update(f"{tag}:{value!r};".encode())
+        return
+    if kind in (bytes, bytearray, memoryview):
+        data = bytes(value)
+        hasher.update(f"{tag}:{len(data)}:".encode())
+        hasher.update(data)
+        return
+    if kind is BlobHandle:
+        hasher.update(f"{tag}:{value.digest};".encode())
+        return
+
+    if id(value) in seen:
+        hasher.update(b"<cycle>;")
+        return
+    seen.add(id(value))
+    try:
+        if isinstance(value, (list, tuple)):
+            hasher.update(f"{tag}:{len(value)}[".encode())
+            for item in value:
+                _feed(hasher, item, seen)
+            hasher.update(b"]")
+        elif isinstance(value, Mapping):
+            items = sorted(
+                (_digest(key, seen), item) for key, item in value.items()
+            )
+            hasher.update(f"{tag}:{len(items)}{{".encode())
+            for key_digest, item in items:
+                hasher.update(key_digest.encode())
+                _feed(hasher, item, seen)
+            hasher.update(b"}")
+        elif isinstance(value, (set, frozenset)):
+            digests = sorted(_digest(item, seen) for item in value)
+            hasher.update(f"{tag}:{len(digests)}{{{''.join(digests)}}}".encode())
+        elif isinstance(value, (types.FunctionType, types.MethodType, functools.partial)):
+            hasher.update(f"{tag}(".encode())
+            _feed_bindings(hasher, value, seen)
+            hasher.update(b")")
+        else:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                raise UncacheableError(
+                    f"Cannot hash a {tag} for the result cache: {e}"
+                ) from e
+            hasher.update(f"{tag}:{len(data)}:".encode())
+            hasher.update(data)
+    finally:
+        seen.discard(id(value))
+
+
+def _digest(value: Any, seen: Set[int]) -> str:
+    hasher = hashlib.sha256()
+    _feed(hasher, value, seen)
+    return hasher.hexdigest()
+
+
+def content_key(*values: Any) -> str:
+    """
+    Canonical content hash of values (see ``_feed``). Raises
+    UncacheableError for values that cannot be hashed by content.
+    """
+    try:
+        return _digest(values, set())
+    except RecursionError as e:
+        raise UncacheableError("Values nest too deeply to hash") from e
+
+
+def _feed_bindings(hasher: Any, func: Callable, seen: Set[int]) -> None:
+    """Partial arguments, bound instance, code, defaults and closure cells."""
+    while isinstance(func, functools.partial):
+        _feed(hasher, func.args, seen)
+        _feed(hasher, func.keywords, seen)
+        func = func.func
+    if isinstance(func, types.MethodType):
+        _feed(hasher, func.__self__, seen)
+        func = func.__func__
+    if not isinstance(func, types.FunctionType):
+        # Callable objects: their attributes are their bindings
+        _feed(hasher, func, seen)
+        return
+
+    hasher.update(f"{func.__module__}.{func.__qualname__}:".encode())
+    hasher.update(marshal.dumps(func.__code__))
+    _feed(hasher, func.__defaults__, seen)
+    _feed(hasher, func.__kwdefaults__, seen)
+    for cell in func.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            hasher.update(b"<empty>;")
+            continue
+        _feed(hasher, contents, seen)
+
+
+def cache_key(
+    state_name: str,
+    fingerprint: str,
+    func: Callable,
+    shared_state: Dict[str, Any],
+    inputs: Optional[Iterable[str]] = None
+) -> str:
+    """
+    Content address of a state call: the state's name, its function's code
+    fingerprint, the values the function is bound to (``functools.partial``
+    arguments, closure cells, defaults) and its inputs.
+
+    Raises UncacheableError if a binding or input cannot be hashed by
+    content; such calls are not memoized.
+    """
+    if inputs is None:
+        values = dict(shared_state)
+    else:
+        values = {key: shared_state.get(key) for key in inputs}
+
+    hasher = hashlib.sha256(f"{state_name}\0{fingerprint}\0".encode())
+    seen: Set[int] = set()
+    try:
+        _feed_bindings(hasher, func, seen)
+        _feed(hasher, values, seen)
+    except RecursionError as e:
+        raise UncacheableError("State inputs nest too deeply to hash") from e
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of state results.
+
+    Entries are stored pickled, so a replay never shares objects with the
+    run that produced it. The memory tier is an LRU bounded by entry count
+    and bytes; the optional disk tier (one file per entry under
+    ``directory``) is an LRU bounded by bytes, using file mtimes as access
+    times so it survives restarts. Expired entries are dropped on access.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._memory_bytes = 0
+
+        # path -> size, in access order; loaded from disk on first use
+        self._disk_index: Optional["OrderedDict[str, int]"] = None
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ---------------------------------------------------------------- access --
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Look up an entry, promoting disk hits into memory."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    self._drop_memory(key)
+                    self.expirations += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return pickle.loads(payload)
+
+            if self.directory is not None:
+                entry = self._read_disk(key, now)
+                if entry is not None:
+                    payload, expires_at = entry
+                    self._store_memory(key, payload, expires_at)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return pickle.loads(payload)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: CachedResult, ttl: Optional[float] = None) -> bool:
+        """Store an entry. Returns False if it cannot be pickled."""
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._store_memory(key, payload, expires_at)
+            if self.directory is not None:
+                self._write_disk(key, payload, expires_at)
+        return True
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.directory is not None:
+                for path in list(self._load_disk_index()):
+                    self._drop_disk(path)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._memory),
+                "bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index or ()),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # ---------------------------------------------------------------- memory --
+
+    def _store_memory(
+        self,
+        key: str,
+        payload: bytes,
+        expires_at: Optional[float]
+    ) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        self._drop_memory(key)
+        self._memory[key] = (payload, expires_at)
+        self._memory_bytes += len(payload)
+
+        while (len(self._memory) > self.max_entries or
+               self._memory_bytes > self.max_bytes):
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.evictions += 1
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+
+    # ------------------------------------------------------------------ disk --
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def _load_disk_index(self) -> "OrderedDict[str, int]":
+        if self._disk_index is None:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if name.endswith(".pkl"):
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, path, stat.st_size))
+            files.sort()
+
+            self._disk_index = OrderedDict(
+                (path, size) for _, path, size in files
+            )
+            self._disk_bytes = sum(self._disk_index.values())
+        return self._disk_index
+
+    def _read_disk(
+        self,
+        key: str,
+        now: float
+    ) -> Optional[Tuple[bytes, Optional[float]]]:
+        index = self._load_disk_index()
+        path = self._path(key)
+        if path not in index:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                expires_at, payload = pickle.load(f)
+        except Exception:
+            self._drop_disk(path)
+            return None
+
+        if expires_at is not None and expires_at <= now:
+            self._drop_disk(path)
+            self.expirations += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        index.move_to_end(path)
+        return payload, expires_at
+
+    def _write_disk(
+        self,
+        key: str,
+        payload: bytes,
+        expires_at: Optional[float]
+    ) -> None:
+        index = self._load_disk_index()
+        path = self._path(key)
+        data = pickle.dumps((expires_at, payload), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_disk_bytes:
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._disk_bytes -= index.pop(path, 0)
+        index[path] = len(data)
+        self._disk_bytes += len(data)
+
+        while self._disk_bytes > self.max_disk_bytes:
+            oldest = next(iter(index))
+            self._drop_disk(oldest)
+            self.evictions += 1
+
+    def _drop_disk(self, path: str) -> None:
+        index = self._load_disk_index()
+        self._disk_bytes -= index.pop(path, 0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,149 @@
+"""Addressable priority queue for agent states."""
+
+import heapq
+import itertools
+from dataclasses import replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.agent.state import PrioritizedState
+
+# Orders entries in the heap; the default is (priority, timestamp)
+QueueKey = Callable[[PrioritizedState], Tuple[Any, ...]]
+
+
+def priority_key(entry: PrioritizedState) -> Tuple[Any, ...]:
+    return (entry.priority, entry.timestamp)
+
+
+class StateQueue:
+    """
+    Priority heap of PrioritizedState entries addressable by state name.
+
+    Membership is a dict lookup. Re-prioritising or removing an entry marks
+    the old heap item stale instead of searching for it; stale items are
+    skipped on pop and compacted away once they outnumber live entries.
+
+    ``key`` decides the order. It is evaluated once, when an entry is
+    pushed, so it must not depend on the current time.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[PrioritizedState] = (),
+        key: QueueKey = priority_key
+    ):
+        self.key = key
+        self._entries: Dict[str, PrioritizedState] = {}
+        self._heap: List[Tuple[Any, ...]] = []
+        self._counter = itertools.count()
+
+        for entry in entries:
+            self._entries[entry.state_name] = entry
+        self._heap = [self._item(entry) for entry in self._entries.values()]
+        heapq.heapify(self._heap)
+
+    def _item(self, entry: PrioritizedState) -> Tuple[Any, ...]:
+        return self.key(entry) + (next(self._counter), entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __contains__(self, state_name: object) -> bool:
+        return state_name in self._entries
+
+    def __iter__(self) -> Iterator[PrioritizedState]:
+        return iter(list(self._entries.values()))
+
+    def get(self, state_name: str) -> Optional[PrioritizedState]:
+        """Get the queued entry for a state."""
+        return self._entries.get(state_name)
+
+    def push(self, entry: PrioritizedState) -> None:
+        """Queue an entry, replacing any entry already queued for the state."""
+        self._entries[entry.state_name] = entry
+        heapq.heappush(self._heap, self._item(entry))
+        self._maybe_compact()
+
+    def extend(self, entries: Iterable[PrioritizedState]) -> None:
+        """
+        Queue many entries. A batch at least as large as the heap is
+        heapified with it in O(n) instead of being pushed one at a time.
+        """
+        items = []
+        for entry in entries:
+            self._entries[entry.state_name] = entry
+            items.append(self._item(entry))
+
+        if len(items) >= len(self._heap):
+            self._heap.extend(items)
+            heapq.heapify(self._heap)
+        else:
+            for item in items:
+                heapq.heappush(self._heap, item)
+        self._maybe_compact()
+
+    def pop(self) -> PrioritizedState:
+        """Remove and return the highest-priority entry."""
+        while self._heap:
+            entry = heapq.heappop(self._heap)[-1]
+            if self._entries.get(entry.state_name) is entry:
+                del self._entries[entry.state_name]
+                return entry
+        raise IndexError("pop from an empty StateQueue")
+
+    def peek(self) -> Optional[PrioritizedState]:
+        """Return the highest-priority entry without removing it."""
+        while self._heap:
+            entry = self._heap[0][-1]
+            if self._entries.get(entry.state_name) is entry:
+                return entry
+            heapq.heappop(self._heap)
+        return None
+
+    def remove(self, state_name: str) -> Optional[PrioritizedState]:
+        """Remove a state from the queue, returning its entry if it was queued."""
+        entry = self._entries.pop(state_name, None)
+        if entry is not None:
+            self._maybe_compact()
+        return entry
+
+    def update(
+        self,
+        state_name: str,
+        priority: Optional[int] = None,
+        timestamp: Optional[float] = None,
+        deadline: Optional[float] = None
+    ) -> bool:
+        """Re-prioritise a queued state in place. Returns False if not queued."""
+        entry = self._entries.get(state_name)
+        if entry is None:
+            return False
+
+        changes = {}
+        if priority is not None:
+            changes["priority"] = priority
+        if timestamp is not None:
+            changes["timestamp"] = timestamp
+        if deadline is not None:
+            changes["deadline"] = deadline
+        if changes:
+            self.push(replace(entry, **changes))
+        return True
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._heap.clear()
+
+    def entries(self) -> List[PrioritizedState]:
+        """Live entries in queue order."""
+        return sorted(self._entries.values(), key=self.key)
+
+    def _maybe_compact(self) -> None:
+        """Rebuild the heap once stale items dominate it."""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [self._item(entry) for entry in self._entries.values()]
+            heapq.heapify(self._heap)
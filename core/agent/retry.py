@@ -0,0 +1,62 @@
+"""Agent-wide retry budget."""
+
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the attempts made in a sliding window.
+
+    A retry is allowed while the retries in the last ``window`` seconds stay
+    below ``ratio`` times the attempts in that window, or below
+    ``min_retries`` so that a quiet agent can still retry. When every call
+    to a dependency is failing this bounds the extra load retries add.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        window: float = 60.0,
+        min_retries: int = 10
+    ):
+        self.ratio = ratio
+        self.window = window
+        self.min_retries = min_retries
+        self._attempts: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.rejected = 0
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window
+        for events in (self._attempts, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_attempt(self) -> None:
+        """Record an attempt (first try or retry) of any state."""
+        now = time.monotonic()
+        self._prune(now)
+        self._attempts.append(now)
+
+    def try_acquire(self) -> bool:
+        """Take a retry from the budget; False if it is exhausted."""
+        now = time.monotonic()
+        self._prune(now)
+        limit = max(self.min_retries, self.ratio * len(self._attempts))
+        if len(self._retries) >= limit:
+            self.rejected += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """Attempts and retries in the current window."""
+        self._prune(time.monotonic())
+        return {
+            "attempts": len(self._attempts),
+            "retries": len(self._retries),
+            "limit": max(self.min_retries, self.ratio * len(self._attempts)),
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,245 @@
+"""Compact runtime bookkeeping for agents with many states."""
+
+import asyncio
+import contextlib
+import gc
+import sys
+import types
+from collections import deque
+from collections.abc import MutableSet
+from concurrent.futures import Executor
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Suspend the cyclic garbage collector while building many long-lived
+    objects, which would otherwise trigger repeated full traversals of them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class StateIndex:
+    """
+    Dense integer ids for state names.
+
+    Ids are handed out in registration order and never reused, so they can
+    index bitsets and columns shared by everything that tracks states of one
+    agent. Names are interned.
+    """
+
+    __slots__ = ("_ids", "_names")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        for name in names:
+            self.id(name)
+
+    def id(self, name: str) -> int:
+        """Id of a state, registering the name if it is new."""
+        state_id = self._ids.get(name)
+        if state_id is None:
+            name = sys.intern(name)
+            state_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return state_id
+
+    def get(self, name: str) -> Optional[int]:
+        """Id of a registered state, or None."""
+        return self._ids.get(name)
+
+    def name(self, state_id: int) -> str:
+        """Name of the state with an id."""
+        return self._names[state_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+
+class StateSet(MutableSet):
+    """
+    Set of state names stored as a bitset over a ``StateIndex``.
+
+    Takes one bit per registered state instead of a hash table entry per
+    member. Set operators (``|``, ``&``, ``-``, ...) return plain sets.
+    """
+
+    __slots__ = ("_index", "_bits", "_count")
+
+    def __init__(self, index: StateIndex, names: Iterable[str] = ()):
+        self._index = index
+        self._bits = bytearray()
+        self._count = 0
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[str]) -> Set[str]:
+        return set(iterable)
+
+    def __contains__(self, name: object) -> bool:
+        state_id = self._index.get(name)  # type: ignore[arg-type]
+        if state_id is None:
+            return False
+        byte = state_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] >> (state_id & 7) & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        name = self._index.name
+        for byte_index, byte in enumerate(self._bits):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield name(base + bit)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, name: str) -> None:
+        state_id = self._index.id(name)
+        byte, mask = state_id >> 3, 1 << (state_id & 7)
+        bits = self._bits
+        if byte >= len(bits):
+            bits.extend(bytes(max(byte + 1 - len(bits), len(bits) // 2)))
+        if not bits[byte] & mask:
+            bits[byte] |= mask
+            self._count += 1
+
+    def discard(self, name: str) -> None:
+        state_id = self._index.get(name)
+        if state_id is None:
+            return
+        byte, mask = state_id >> 3, 1 << (state_id & 7)
+        if byte < len(self._bits) and self._bits[byte] & mask:
+            self._bits[byte] &= ~mask
+            self._count -= 1
+
+    def clear(self) -> None:
+        self._bits = bytearray()
+        self._count = 0
+
+    def update(self, *iterables: Iterable[str]) -> None:
+        for iterable in iterables:
+            for name in iterable:
+                self.add(name)
+
+    def copy(self) -> Set[str]:
+        return set(self)
+
+    def union(self, *iterables: Iterable[str]) -> Set[str]:
+        return set(self).union(*iterables)
+
+    def intersection(self, *iterables: Iterable[str]) -> Set[str]:
+        return set(self).intersection(*iterables)
+
+    def difference(self, *iterables: Iterable[str]) -> Set[str]:
+        return set(self).difference(*iterables)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"StateSet({set(self)!r})"
+
+
+class StateSetField:
+    """
+    Attribute holding a ``StateSet`` over the owner's ``_state_index``.
+    Assigning any iterable of names replaces the set.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._attribute = f"_{name.lstrip('_')}_bits"
+
+    def __get__(self, obj: Any, owner: type) -> Any:
+        if obj is None:
+            return self
+        return getattr(obj, self._attribute)
+
+    def __set__(self, obj: Any, names: Iterable[str]) -> None:
+        setattr(obj, self._attribute, StateSet(obj._state_index, names))
+
+
+# Objects that belong to the program or the runtime rather than to the
+# structure referencing them
+_NOT_OWNED = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, types.CodeType, Enum, asyncio.AbstractEventLoop,
+    asyncio.Future, Executor,
+)
+_LEAVES = (str, bytes, bytearray, memoryview, int, float, complex, bool, range)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Approximate bytes reachable from ``obj``.
+
+    Objects whose ids are in ``seen`` are skipped and the ids of the objects
+    counted are added to it, so passing one set to several calls counts
+    shared objects once. Classes, functions, enum members, event loops,
+    tasks and executors are not counted.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, _NOT_OWNED):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, _LEAVES):
+            continue
+
+        if isinstance(obj, dict):
+            # dict methods, so lazily decoded mappings are not loaded
+            stack.extend(dict.keys(obj))
+            stack.extend(dict.values(obj))
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            attributes = getattr(obj, "__dict__", None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            for cls in type(obj).__mro__:
+                slots = cls.__dict__.get("__slots__", ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    value = getattr(obj, slot, None)
+                    if value is not None:
+                        stack.append(value)
+    return size
+
+
+# Values whose size is known to be small without measuring
+_SCALARS = (type(None), bool, int, float, complex)
+
+
+def estimate_size(value: Any, sizeof: Callable[[Any], int] = deep_sizeof) -> int:
+    """
+    Approximate bytes of a value's data: the length of bytes-like values and
+    strings, ``nbytes`` of arrays, and ``sizeof`` of anything else.
+    """
+    if type(value) in _SCALARS:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    # Arrays report their data size without a walk
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sizeof(value)
@@ -0,0 +1,278 @@
+"""Shared-memory transport of large values to and from process workers."""
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.agent.blobs import decode_value, encode_value
+from core.agent.runtime import deep_sizeof, estimate_size
+
+# Segments attached in this process, by name; kept open while values
+# decoded from them may still be in use
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+_attached_lock = threading.Lock()
+
+# Every segment starts with the length of the payload it holds: the OS may
+# round a segment up to whole pages, so its own size is not the payload's
+_HEADER = struct.Struct("<Q")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    with _attached_lock:
+        segment = _attached.get(name)
+        if segment is None:
+            try:
+                segment = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                # Before Python 3.13 attaching registers the segment with the
+                # resource tracker again; the tracker is shared with the
+                # creator (see ``share_resource_tracker``), so this is a no-op
+                segment = shared_memory.SharedMemory(name=name)
+            _attached[name] = segment
+        return segment
+
+
+def share_resource_tracker() -> None:
+    """
+    Start the resource tracker before worker processes are, so they share
+    it: a segment is then registered once whichever process created or
+    attached it, unregistered when unlinked, and unlinked by the tracker if
+    every process using it dies first.
+    """
+    if os.name == "posix":
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+
+
+def detach_all() -> None:
+    """
+    Close the segments attached in this process. A segment still viewed by
+    a live value stays mapped until the value is collected.
+    """
+    with _attached_lock:
+        for name, segment in list(_attached.items()):
+            try:
+                segment.close()
+            except BufferError:
+                continue
+            del _attached[name]
+
+
+def _create(encoding: str, chunks: List[Any]) -> Tuple[shared_memory.SharedMemory, int]:
+    """A new segment holding the length and chunks of an encoded value."""
+    size = sum(memoryview(chunk).nbytes for chunk in chunks)
+    segment = shared_memory.SharedMemory(create=True, size=_HEADER.size + size)
+    _HEADER.pack_into(segment.buf, 0, size)
+    offset = _HEADER.size
+    for chunk in chunks:
+        length = memoryview(chunk).nbytes
+        segment.buf[offset:offset + length] = chunk
+        offset += length
+    return segment, size
+
+
+def _payload(segment: shared_memory.SharedMemory, size: int) -> memoryview:
+    """The payload of a segment, checked to be the ``size`` bytes expected."""
+    (stored,) = _HEADER.unpack_from(segment.buf, 0)
+    if stored != size or _HEADER.size + size > segment.size:
+        raise ValueError(
+            f"Shared memory segment {segment.name} holds {stored} bytes, "
+            f"expected {size}"
+        )
+    return segment.buf[_HEADER.size:_HEADER.size + size]
+
+
+@dataclass(frozen=True, slots=True)
+class SharedValue:
+    """
+    Stand-in for a value placed in a named shared-memory segment.
+
+    Sent to a process worker instead of the value; ``load`` rebuilds it in
+    the receiving process over the segment without copying its data (see
+    ``encode_value``), and ``view`` exposes raw bytes directly. Reads
+    check ``size`` against the payload length stored in the segment.
+    """
+    name: str
+    size: int
+    encoding: str  # "bytes" or "pickle"
+    value_type: Optional[type] = None
+
+    def _buffer(self) -> memoryview:
+        return _payload(_attach(self.name), self.size)
+
+    def view(self) -> memoryview:
+        """Read-only view of the shared bytes (raw values only)."""
+        if self.encoding != "bytes":
+            raise TypeError(
+                f"Shared value {self.name} holds a pickled "
+                f"{getattr(self.value_type, '__name__', 'value')}, not bytes"
+            )
+        return self._buffer().toreadonly()
+
+    def load(self, copy: bool = False) -> Any:
+        """Decode the value; with ``copy`` it does not reference the segment."""
+        return decode_value(self._buffer().toreadonly(), self.encoding, copy=copy)
+
+
+def export_writes(values: Dict[str, Any], threshold: int) -> Dict[str, Any]:
+    """
+    Worker side: move values of at least ``threshold`` bytes into new
+    segments for the parent to ``receive``. Needs POSIX shared memory,
+    which outlives the worker closing it.
+    """
+    if os.name != "posix":
+        return values
+    exported = {}
+    for key, value in values.items():
+        if type(value) is SharedValue:
+            # A stand-in read from the parent's segments: the parent unlinks
+            # what it receives, so it gets a segment of its own
+            value = value.load()
+        if estimate_size(value) >= threshold:
+            encoding, chunks = encode_value(value)
+            segment, size = _create(encoding, chunks)
+            segment.close()
+            value = SharedValue(segment.name, size, encoding, type(value))
+        exported[key] = value
+    return exported
+
+
+class _Export:
+    __slots__ = ("value", "shared", "segment", "leases")
+
+    def __init__(self, value: Any, shared: SharedValue, segment: shared_memory.SharedMemory):
+        self.value = value
+        self.shared = shared
+        self.segment = segment
+        self.leases = 0
+
+
+class SharedMemoryTransport:
+    """
+    Parent side of the shared-memory data plane for one workflow (agent).
+
+    ``pack`` replaces the values of a worker's shared_state slice that are
+    at least ``threshold`` bytes with SharedValue stand-ins. The segment of
+    a value is created once and reused for every state that reads it while
+    the workflow runs; states lease it for their run (``unlease``), unused
+    segments are unlinked least recently used first beyond
+    ``max_cached_bytes``, and ``release`` unlinks the rest at workflow end.
+    Values must not be mutated in place while exported.
+
+    Values written by a worker come back in segments the worker created;
+    ``receive`` copies them out and unlinks each segment at once.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1024 * 1024,
+        max_cached_bytes: int = 1024 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = deep_sizeof
+    ):
+        self.threshold = threshold
+        self.max_cached_bytes = max_cached_bytes
+        self.sizeof = sizeof
+
+        # id(value) -> export, least recently used first
+        self._exports: "OrderedDict[int, _Export]" = OrderedDict()
+        self._bytes = 0
+
+        self.exported = 0
+        self.reused = 0
+        self.received = 0
+        self.bytes_exported = 0
+        self.bytes_received = 0
+        self.peak_bytes = 0
+
+    def pack(self, values: Dict[str, Any]) -> Tuple[Dict[str, Any], List[int]]:
+        """Replace large values by stand-ins; returns the slice and its leases."""
+        packed = {}
+        leases = []
+        for key, value in values.items():
+            if estimate_size(value, self.sizeof) >= self.threshold:
+                export = self._export(value)
+                export.leases += 1
+                leases.append(id(value))
+                value = export.shared
+            packed[key] = value
+        return packed, leases
+
+    def _export(self, value: Any) -> _Export:
+        export = self._exports.get(id(value))
+        if export is not None and export.value is value:
+            self._exports.move_to_end(id(value))
+            self.reused += 1
+            return export
+
+        encoding, chunks = encode_value(value)
+        segment, size = _create(encoding, chunks)
+        export = _Export(value, SharedValue(segment.name, size, encoding, type(value)), segment)
+        self._exports[id(value)] = export
+        self._bytes += size
+        self.exported += 1
+        self.bytes_exported += size
+        self.peak_bytes = max(self.peak_bytes, self._bytes)
+        return export
+
+    def unlease(self, leases: List[int]) -> None:
+        """End a state's use of the segments ``pack`` leased to it."""
+        for value_id in leases:
+            export = self._exports.get(value_id)
+            if export is not None:
+                export.leases -= 1
+        if self._bytes > self.max_cached_bytes:
+            for value_id, export in list(self._exports.items()):
+                if self._bytes <= self.max_cached_bytes:
+                    break
+                if export.leases <= 0:
+                    self._unlink(value_id)
+
+    def receive(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace stand-ins created by a worker by private copies."""
+        received = {}
+        for key, value in values.items():
+            if type(value) is SharedValue:
+                size = value.size
+                segment = shared_memory.SharedMemory(name=value.name)
+                try:
+                    value = decode_value(
+                        _payload(segment, size).toreadonly(), value.encoding, copy=True
+                    )
+                finally:
+                    segment.close()
+                    segment.unlink()
+                self.received += 1
+                self.bytes_received += size
+            received[key] = value
+        return received
+
+    def _unlink(self, value_id: int) -> None:
+        export = self._exports.pop(value_id)
+        self._bytes -= export.shared.size
+        export.segment.close()
+        try:
+            export.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+    def release(self) -> None:
+        """Unlink every exported segment (at workflow end)."""
+        for value_id in list(self._exports):
+            self._unlink(value_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Segments held now, their peak size and transfer counters."""
+        return {
+            "segments": len(self._exports),
+            "bytes": self._bytes,
+            "peak_bytes": self.peak_bytes,
+            "exported": self.exported,
+            "reused": self.reused,
+            "received": self.received,
+            "bytes_exported": self.bytes_exported,
+            "bytes_received": self.bytes_received,
+        }
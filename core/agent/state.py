@@ -1,13 +1,17 @@
 """State management types and enums."""
 
 from enum import Enum, IntEnum
-from typing import Set, Dict, Union, List, Tuple, Optional, TYPE_CHECKING
+from typing import Any, Set, Dict, Union, List, Tuple, Optional, TYPE_CHECKING
 from dataclasses import dataclass, field
+import itertools
 import uuid
 
 
 if TYPE_CHECKING:
-    from core.agent.base import Agent
+    from core.agent.base import Agent, RetryPolicy
+    from core.agent.dependencies import DependencyConfig
+    from core.agent.memo import CachePolicy
+    from core.agent.hedging import HedgePolicy
 
 # Type definitions
 StateResult = Union[str, List[Union[str, Tuple["Agent", str]]], None]
@@ -42,8 +46,34 @@ class StateStatus(str, Enum):
     TIMEOUT = "timeout"
 
 
+class ExecutionMode(str, Enum):
+    """Where a state function is executed."""
+    ASYNC = "async"  # Coroutine on the agent's event loop
+    THREAD = "thread"  # Synchronous function on the agent's thread pool
+    PROCESS = "process"  # Worker of the agent's process pool
+
+
+class SchedulingPolicy(str, Enum):
+    """Order in which an agent starts ready states."""
+    PRIORITY = "priority"  # Highest priority first, then first come
+    DEADLINE = "deadline"  # Earliest deadline first
+
+
 from typing import Protocol, runtime_checkable
 from core.agent.context import Context
+# Imported once the enums it depends on are defined
+from core.resources.requirements import ResourceRequirements
+
+
+# State ids: a random per-process prefix and a counter, which is much
+# cheaper than a uuid4 per state
+_STATE_ID_PREFIX = uuid.uuid4().hex[:16]
+_state_ids = itertools.count()
+
+
+def new_state_id() -> str:
+    """Unique id for a state's metadata."""
+    return f"{_STATE_ID_PREFIX}-{next(_state_ids):x}"
 
 
 @runtime_checkable
@@ -52,25 +82,44 @@ class StateFunction(Protocol):
     async def __call__(self, context: Context) -> StateResult: ...
 
 
-@dataclass
+@dataclass(slots=True)
 class StateMetadata:
     """Metadata for state execution."""
     status: StateStatus
     attempts: int = 0
     max_retries: int = 3
-    resources: "ResourceRequirements" = field(default_factory=lambda: ResourceRequirements())
+    resources: ResourceRequirements = field(default_factory=ResourceRequirements)
     dependencies: Dict[str, "DependencyConfig"] = field(default_factory=dict)
     satisfied_dependencies: Set[str] = field(default_factory=set)
     last_execution: Optional[float] = None
     last_success: Optional[float] = None
-    state_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    state_id: str = field(default_factory=new_state_id)
     retry_policy: Optional["RetryPolicy"] = None
+    execution_mode: ExecutionMode = ExecutionMode.ASYNC
+    shared_keys: Optional[Tuple[str, ...]] = None
+    cache: Optional["CachePolicy"] = None
+    hedge: Optional["HedgePolicy"] = None
 
 
-@dataclass(order=True)
+@dataclass(order=True, slots=True)
 class PrioritizedState:
     """State with priority for queue management."""
     priority: int
     timestamp: float
     state_name: str = field(compare=False)
-    metadata: StateMetadata = field(compare=False)
\ No newline at end of file
+    metadata: StateMetadata = field(compare=False)
+    deadline: Optional[float] = field(default=None, compare=False)
+
+@dataclass(slots=True)
+class StateSpec:
+    """Arguments of one ``Agent.add_state`` call, for ``Agent.add_states``."""
+    name: str
+    func: StateFunction
+    dependencies: Optional[Dict[str, Any]] = None
+    resources: Optional[ResourceRequirements] = None
+    max_retries: int = 3
+    retry_policy: Optional["RetryPolicy"] = None
+    execution_mode: Optional[ExecutionMode] = None
+    shared_keys: Optional[List[str]] = None
+    cache: Optional["CachePolicy"] = None
+    hedge: Optional["HedgePolicy"] = None
@@ -0,0 +1,298 @@
+"""Compiled agent templates for stamping out many runs of one definition."""
+
+import sys
+import time
+import uuid
+from copy import copy
+from dataclasses import fields
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, TYPE_CHECKING
+
+from core.agent.dependencies import (
+    DependencyConfig,
+    DependencyGroup,
+    DependencyType,
+    DYNAMIC_DEPENDENCY_TYPES,
+    GROUPED_DEPENDENCY_TYPES,
+    TIMED_LIFECYCLES,
+)
+from core.agent.memo import function_fingerprint
+from core.agent.queue import StateQueue
+from core.agent.state import (
+    AgentStatus,
+    PrioritizedState,
+    StateFunction,
+    StateMetadata,
+    StateStatus,
+)
+
+if TYPE_CHECKING:
+    from core.agent.base import Agent
+
+
+_FIELD_GETTERS: Dict[type, Callable[[Any], Tuple[Any, ...]]] = {}
+
+
+def _clone(obj: Any) -> Any:
+    """Shallow copy of a dataclass instance through its constructor."""
+    cls = type(obj)
+    getter = _FIELD_GETTERS.get(cls)
+    if getter is None:
+        getter = _FIELD_GETTERS[cls] = attrgetter(
+            *(field.name for field in fields(cls))
+        )
+    return cls(*getter(obj))
+
+
+class _CompiledState:
+    """Immutable definition of one state with its dependencies pre-grouped."""
+
+    __slots__ = (
+        "name", "function", "prototype", "groups", "dependencies",
+        "timed", "dynamic_positions", "dynamic", "conditional",
+        "has_timed_configs"
+    )
+
+    def __init__(self, name: str, function: StateFunction, metadata: StateMetadata):
+        self.name = name
+        self.function = function
+
+        # Runtime fields start from scratch in every instance
+        self.prototype = copy(metadata)
+        self.prototype.status = StateStatus.PENDING
+        self.prototype.attempts = 0
+        self.prototype.satisfied_dependencies = set()
+        self.prototype.last_execution = None
+        self.prototype.last_success = None
+        # Timed configs are copied so later runs of the compiled agent
+        # cannot leak expiry times into the template
+        self.prototype.dependencies = {
+            sys.intern(dep_name): (
+                copy(dep_config)
+                if dep_config.lifecycle in TIMED_LIFECYCLES else dep_config
+            )
+            for dep_name, dep_config in metadata.dependencies.items()
+        }
+
+        # (type, size) of each grouped dependency type, in first-seen order
+        group_index: Dict[DependencyType, int] = {}
+        sizes = []
+        for dep_config in self.prototype.dependencies.values():
+            if dep_config.type in GROUPED_DEPENDENCY_TYPES:
+                if dep_config.type not in group_index:
+                    group_index[dep_config.type] = len(sizes)
+                    sizes.append([dep_config.type, 0])
+                sizes[group_index[dep_config.type]][1] += 1
+        self.groups: Tuple[Tuple[DependencyType, int], ...] = tuple(
+            (dep_type, size) for dep_type, size in sizes
+        )
+
+        # (dep_name, config, group position or -1) per dependency
+        self.dependencies: Tuple[Tuple[str, DependencyConfig, int], ...] = tuple(
+            (dep_name, dep_config, group_index.get(dep_config.type, -1))
+            for dep_name, dep_config in self.prototype.dependencies.items()
+        )
+        self.timed = tuple(
+            position for position, (_, dep_config, group) in enumerate(self.dependencies)
+            if group >= 0 and dep_config.lifecycle in TIMED_LIFECYCLES
+        )
+        self.dynamic_positions = tuple(
+            position for position, (_, dep_config, group) in enumerate(self.dependencies)
+            if group < 0 and dep_config.type in DYNAMIC_DEPENDENCY_TYPES
+        )
+        self.dynamic: Tuple[Tuple[str, DependencyConfig], ...] = tuple(
+            self.dependencies[position][:2] for position in self.dynamic_positions
+        )
+        self.conditional = any(
+            dep_config.type == DependencyType.CONDITIONAL
+            for _, dep_config in self.dynamic
+        )
+        # Timed lifecycles record expiry times on their config, so those
+        # configs cannot be shared between instances
+        self.has_timed_configs = any(
+            dep_config.lifecycle in TIMED_LIFECYCLES
+            for _, dep_config, _ in self.dependencies
+        )
+
+
+class AgentTemplate:
+    """
+    Frozen, compiled definition of an agent.
+
+    ``compile`` takes an agent whose states have been added but that has not
+    run, and pre-computes everything ``add_state`` derives from the
+    definition: normalized dependency configs, dependency groups, the
+    dependents index, execution modes and function fingerprints. State names
+    are interned. ``instantiate`` then builds a ready-to-run agent by copying
+    only the per-run mutable state, without repeating any of that work.
+
+    Functions, resource requirements, retry policies, the result and context
+    caches and the blob store are shared by every instance. Worker pools are
+    not: an instance starts its thread or process pool when a state first
+    needs it, and its owner releases it with ``Agent.close()``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        states: Tuple[_CompiledState, ...],
+        options: Dict[str, Any],
+        fingerprints: Dict[str, str],
+        checkpoint_full_every: int
+    ):
+        self.name = name
+        self._states = states
+        self._options = MappingProxyType(options)
+        self._fingerprints = MappingProxyType(fingerprints)
+        self._checkpoint_full_every = checkpoint_full_every
+        self._functions = MappingProxyType({
+            state.name: state.function for state in states
+        })
+        self._initial = tuple(
+            state for state in states if not state.prototype.dependencies
+        )
+
+    @classmethod
+    def compile(cls, agent: "Agent") -> "AgentTemplate":
+        """Compile the states added to an agent that has not run yet."""
+        if (agent.status != AgentStatus.IDLE or agent.completed_states or
+                agent._running_states):
+            raise ValueError(
+                f"Agent {agent.name} has already run and cannot be compiled"
+            )
+
+        states = tuple(
+            _CompiledState(sys.intern(name), agent.states[name], metadata)
+            for name, metadata in agent.state_metadata.items()
+        )
+
+        # Fingerprint cached states once instead of in every run
+        fingerprints = {}
+        for state in states:
+            if state.prototype.cache is not None:
+                fingerprints[state.name] = (
+                    agent._fingerprints.get(state.name) or
+                    function_fingerprint(state.function)
+                )
+
+        options = {
+            "max_concurrent": agent.max_concurrent,
+            "state_timeout": agent.state_timeout,
+            "retry_policy": agent.retry_policy,
+            "max_threads": agent.max_threads,
+            "result_cache": agent.result_cache,
+            "context_cache": agent.context_cache,
+            "snapshot_isolation": agent.snapshot_isolation,
+            "max_conflict_retries": agent.max_conflict_retries,
+            "blob_store": agent.blob_store,
+            "shared_memory_threshold": agent.shared_memory_threshold,
+            "scheduling": agent.scheduling,
+            "aging_interval": agent.aging_interval,
+        }
+
+        return cls(
+            agent.name,
+            states,
+            options,
+            fingerprints,
+            agent.checkpoint_full_every
+        )
+
+    @property
+    def state_names(self) -> Tuple[str, ...]:
+        """Names of the template's states, in definition order."""
+        return tuple(self._functions)
+
+    @property
+    def functions(self) -> Mapping[str, StateFunction]:
+        """Read-only view of the state functions."""
+        return self._functions
+
+    def instantiate(self, name: Optional[str] = None, **options: Any) -> "Agent":
+        """
+        Create a new agent from the template. ``options`` override the
+        compiled ``Agent`` constructor arguments (e.g. ``resource_pool``).
+        """
+        from core.agent.base import Agent
+
+        agent = Agent(name or self.name, **{**self._options, **options})
+        agent.checkpoint_full_every = self._checkpoint_full_every
+        agent.states = dict(self._functions)
+        agent._fingerprints = dict(self._fingerprints)
+
+        run_id = uuid.uuid4().hex
+        state_metadata: Dict[str, StateMetadata] = {}
+        dependents: Dict[str, list] = {}
+        unmet_groups: Dict[str, int] = {}
+        timed_dependencies: Dict[str, tuple] = {}
+        dynamic_dependencies: Dict[str, tuple] = {}
+        conditional = set()
+
+        for position, state in enumerate(self._states):
+            state_name = state.name
+            metadata = _clone(state.prototype)
+            metadata.satisfied_dependencies = set()
+            metadata.state_id = f"{run_id}-{position}"
+
+            dependencies = state.dependencies
+            if state.has_timed_configs:
+                dependencies = tuple(
+                    (dep_name, _clone(dep_config), group)
+                    for dep_name, dep_config, group in dependencies
+                )
+                metadata.dependencies = {
+                    dep_name: dep_config for dep_name, dep_config, _ in dependencies
+                }
+
+            # No dependency is satisfied yet, so every group starts unmet
+            groups = [DependencyGroup(dep_type, size) for dep_type, size in state.groups]
+            unmet_groups[state_name] = len(groups)
+            for dep_name, dep_config, group in dependencies:
+                dependents.setdefault(dep_name, []).append(
+                    (state_name, dep_config, groups[group] if group >= 0 else None)
+                )
+            timed_dependencies[state_name] = tuple(
+                (dependencies[position][0], dependencies[position][1],
+                 groups[dependencies[position][2]])
+                for position in state.timed
+            )
+            dynamic_dependencies[state_name] = (
+                tuple(dependencies[position][:2] for position in state.dynamic_positions)
+                if state.has_timed_configs else state.dynamic
+            )
+            if state.conditional:
+                conditional.add(state_name)
+
+            state_metadata[state_name] = metadata
+            agent._state_index.id(state_name)
+
+        agent.state_metadata = state_metadata
+        agent._dependents = dependents
+        agent._unmet_groups = unmet_groups
+        agent._timed_dependencies = timed_dependencies
+        agent._dynamic_dependencies = dynamic_dependencies
+        agent._conditional_states = conditional
+
+        now = time.time()
+        agent.priority_queue = StateQueue(
+            (
+                PrioritizedState(
+                    -state.prototype.resources.priority,
+                    now,
+                    state.name,
+                    state_metadata[state.name],
+                    agent._state_deadline(state.name, now)
+                )
+                for state in self._initial
+            ),
+            key=agent._queue_key
+        )
+
+        return agent
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __repr__(self) -> str:
+        return f"AgentTemplate(name={self.name!r}, states={len(self._states)})"
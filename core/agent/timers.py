@@ -0,0 +1,125 @@
+"""Timer wheel for an agent's retries, periodic runs and dependency expiries."""
+
+import heapq
+import math
+from collections import Counter
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+class TimerWheel:
+    """
+    Keyed timers bucketed into fixed ``tick``-wide slots.
+
+    Only occupied slots are kept in a heap. Cancelling a timer is O(1), and
+    so is scheduling one into a slot that already holds a timer; opening a
+    new slot pushes it onto the heap in O(log slots), and the occasional
+    rebuild that drops the heap items of emptied slots costs O(slots),
+    amortized over the pushes that preceded it. Re-scheduling is a cancel
+    plus a schedule. Finding the next due time and collecting expired
+    timers cost O(log slots) per slot popped, however many timers share
+    it. A timer never fires early and at most one tick late.
+
+    Each timer has a key, unique within the wheel (scheduling an existing
+    key moves it), and a ``group`` used to count timers by purpose. Times
+    are ``time.monotonic()`` values.
+    """
+
+    def __init__(self, tick: float = 0.01):
+        if tick <= 0:
+            raise ValueError("tick must be positive")
+        self.tick = tick
+        self._slots: Dict[int, Dict[Hashable, float]] = {}
+        self._slot_heap: List[int] = []
+        self._timers: Dict[Hashable, Tuple[int, Hashable]] = {}
+        self._groups: Counter = Counter()
+
+    def schedule(self, key: Hashable, due: float, group: Hashable = None) -> None:
+        """Fire ``key`` at ``due``, replacing any timer it already has."""
+        self.cancel(key)
+        slot = math.ceil(due / self.tick)
+        timers = self._slots.get(slot)
+        if timers is None:
+            timers = self._slots[slot] = {}
+            heapq.heappush(self._slot_heap, slot)
+            if len(self._slot_heap) > 2 * len(self._slots) + 64:
+                # Drop the items of slots emptied by cancel
+                self._slot_heap = list(self._slots)
+                heapq.heapify(self._slot_heap)
+        timers[key] = due
+        self._timers[key] = (slot, group)
+        self._groups[group] += 1
+
+    def cancel(self, key: Hashable) -> bool:
+        """Remove a timer; False if it was not scheduled."""
+        entry = self._timers.pop(key, None)
+        if entry is None:
+            return False
+        slot, group = entry
+        timers = self._slots[slot]
+        del timers[key]
+        if not timers:
+            # The slot's heap item is skipped when it surfaces
+            del self._slots[slot]
+        self._groups[group] -= 1
+        return True
+
+    def due(self, key: Hashable) -> Optional[float]:
+        """Due time of a scheduled timer, or None."""
+        entry = self._timers.get(key)
+        return None if entry is None else self._slots[entry[0]][key]
+
+    def next_due(self) -> Optional[float]:
+        """Time at which the earliest slot fires, or None if empty."""
+        heap = self._slot_heap
+        while heap and heap[0] not in self._slots:
+            heapq.heappop(heap)
+        return heap[0] * self.tick if heap else None
+
+    def expired(self, now: float) -> List[Hashable]:
+        """Remove and return the keys of the timers due by ``now``, in due order."""
+        fired: List[Tuple[float, int, Hashable]] = []
+        heap = self._slot_heap
+        while heap and heap[0] * self.tick <= now:
+            timers = self._slots.pop(heapq.heappop(heap), None)
+            if not timers:
+                continue
+            for key, due in timers.items():
+                _, group = self._timers.pop(key)
+                self._groups[group] -= 1
+                fired.append((due, len(fired), key))
+        fired.sort()
+        return [key for _, _, key in fired]
+
+    def count(self, group: Hashable = None) -> int:
+        """Number of scheduled timers in a group."""
+        return self._groups[group]
+
+    def keys(self, group: Hashable = None) -> List[Hashable]:
+        """Keys of a group's timers, in due order."""
+        return sorted(
+            (key for key, (_, timer_group) in self._timers.items()
+             if timer_group == group),
+            key=self.due
+        )
+
+    def clear(self, *groups: Hashable) -> None:
+        """Remove the timers of the given groups, or every timer."""
+        if not groups:
+            self._slots.clear()
+            self._slot_heap.clear()
+            self._timers.clear()
+            self._groups.clear()
+            return
+        for key in [
+            key for key, (_, group) in self._timers.items() if group in groups
+        ]:
+            self.cancel(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._timers
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._timers))
@@ -0,0 +1,222 @@
+"""Multi-version shared_state: snapshot reads and atomic commits."""
+
+from bisect import bisect_right
+from collections import Counter, deque
+from collections.abc import Mapping
+from itertools import chain
+from operator import itemgetter
+from typing import (
+    Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Set, Tuple
+)
+
+# Value of a key that did not exist at a version
+_ABSENT = object()
+
+_version_of = itemgetter(0)
+
+
+class CommitConflictError(Exception):
+    """A commit touched keys committed by others since its snapshot."""
+
+    def __init__(self, keys: List[str], version: int):
+        self.keys = keys
+        self.version = version
+        super().__init__(
+            f"Keys {sorted(keys)} changed after snapshot version {version}"
+        )
+
+
+class VersionedStore:
+    """
+    Multi-version concurrency control over a shared_state mapping.
+
+    ``data`` always holds the latest committed value of every key, so code
+    reading it directly keeps working. Each ``commit`` applies a batch of
+    writes and deletions as one new version; while snapshots are open, the
+    values it replaces are kept in a per-key undo history, from which a
+    ``Snapshot`` reads a key as it was at the snapshot's version. History no
+    open snapshot needs is dropped when snapshots are released.
+
+    A commit made from a snapshot is validated first committer wins: if a
+    key the snapshot read, or a key being written, was committed after the
+    snapshot's version, the commit raises CommitConflictError and applies
+    nothing.
+
+    Writes made to ``data`` directly bypass versioning and are visible to
+    open snapshots at once. Committed values are shared, not copied: they
+    must be replaced, not mutated in place, for snapshots (and checkpoints)
+    to stay consistent. Snapshots may be read from other threads; commits
+    and releases happen on the event loop.
+    """
+
+    def __init__(self, data: MutableMapping[str, Any]):
+        self.data = data
+        self.version = 0
+        # key -> [(commit version, value before that commit)], oldest first
+        self._history: Dict[str, List[Tuple[int, Any]]] = {}
+        # (commit version, key) for every history entry, oldest first
+        self._log: deque = deque()
+        # Open snapshots per version
+        self._readers: Counter = Counter()
+        # key -> version of the last commit that wrote or deleted it
+        self._committed: Dict[str, int] = {}
+        self.conflicts = 0
+
+    def snapshot(self) -> "Snapshot":
+        """Open a read-only view of the current version."""
+        self._readers[self.version] += 1
+        return Snapshot(self, self.version)
+
+    def release(self, snapshot: "Snapshot") -> None:
+        """Close a snapshot and drop history no open snapshot needs."""
+        version = snapshot.version
+        self._readers[version] -= 1
+        if self._readers[version] <= 0:
+            del self._readers[version]
+            self.collect()
+
+    def commit(
+        self,
+        writes: Mapping[str, Any],
+        deletes: Iterable[str] = (),
+        snapshot: Optional["Snapshot"] = None
+    ) -> int:
+        """
+        Apply writes and deletions atomically, returning the new version.
+        With the ``snapshot`` they were made from, they are validated first.
+        """
+        deletes = [key for key in deletes if key not in writes]
+        if not writes and not deletes:
+            return self.version
+        if snapshot is not None:
+            committed = self._committed
+            conflicts = [
+                key for key in set(chain(snapshot.reads, writes, deletes))
+                if committed.get(key, 0) > snapshot.version
+            ]
+            if conflicts:
+                self.conflicts += 1
+                raise CommitConflictError(conflicts, snapshot.version)
+        version = self.version + 1
+        data = self.data
+
+        if self._readers:
+            # Keep the replaced values for the open snapshots
+            history = self._history
+            for key in chain(writes, deletes):
+                previous = data[key] if key in data else _ABSENT
+                entries = history.get(key)
+                if entries is None:
+                    history[key] = [(version, previous)]
+                else:
+                    entries.append((version, previous))
+                self._log.append((version, key))
+
+        committed = self._committed
+        for key, value in writes.items():
+            data[key] = value
+            committed[key] = version
+        for key in deletes:
+            if key in data:
+                del data[key]
+            committed[key] = version
+        self.version = version
+        return version
+
+    def collect(self) -> None:
+        """Drop the history entries older than every open snapshot."""
+        oldest = min(self._readers) if self._readers else self.version
+        log = self._log
+        trimmed = set()
+        while log and log[0][0] <= oldest:
+            trimmed.add(log.popleft()[1])
+
+        history = self._history
+        for key in trimmed:
+            entries = history[key]
+            keep = bisect_right(entries, oldest, key=_version_of)
+            if keep == len(entries):
+                del history[key]
+            else:
+                # A new list: snapshot readers on other threads may hold the old
+                history[key] = entries[keep:]
+
+    def read(self, key: str, version: int) -> Any:
+        """Value of ``key`` at ``version``, or the absent marker."""
+        # The latest value is read before the history: a commit records
+        # history before updating data, so either order of interleaving
+        # with a commit on another thread yields the value at ``version``
+        value = self.data.get(key, _ABSENT)
+        entries = self._history.get(key)
+        if entries:
+            position = bisect_right(entries, version, key=_version_of)
+            if position < len(entries):
+                return entries[position][1]
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Current version, open snapshots and retained history."""
+        return {
+            "version": self.version,
+            "open_snapshots": sum(self._readers.values()),
+            "oldest_snapshot": min(self._readers, default=self.version),
+            "history_entries": len(self._log),
+            "conflicts": self.conflicts,
+        }
+
+
+class Snapshot(Mapping):
+    """
+    Read-only view of a VersionedStore at one version. The keys looked up
+    or iterated are recorded in ``reads`` for commit validation.
+    """
+
+    __slots__ = ("_store", "version", "_open", "reads")
+
+    def __init__(self, store: VersionedStore, version: int):
+        self._store = store
+        self.version = version
+        self._open = True
+        self.reads: Set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        self.reads.add(key)
+        value = self._store.read(key, self.version)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self.reads.add(key)
+        value = self._store.read(key, self.version)
+        return default if value is _ABSENT else value
+
+    def __contains__(self, key: object) -> bool:
+        self.reads.add(key)
+        return self._store.read(key, self.version) is not _ABSENT
+
+    def __iter__(self) -> Iterator[str]:
+        store = self._store
+        candidates = dict.fromkeys(chain(list(store.data), list(store._history)))
+        for key in candidates:
+            if store.read(key, self.version) is not _ABSENT:
+                self.reads.add(key)
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def release(self) -> None:
+        """Close the snapshot; later reads may see newer versions."""
+        if self._open:
+            self._open = False
+            self._store.release(self)
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"Snapshot(version={self.version})"
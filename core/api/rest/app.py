@@ -9,9 +9,10 @@ from core.config import get_settings
 from core.execution.engine import WorkflowEngine
 from core.storage.backends.sqlite import SQLiteBackend
 from core.agent.base import Agent
+from core.agent.template import AgentTemplate
 from core.api.rest.models import (
     WorkflowCreate, WorkflowResponse, WorkflowStatus,
-    StateAdd, WorkflowPause, WorkflowResume
+    StateAdd, WorkflowPause, WorkflowResume, TemplateCreate
 )
 
 
@@ -38,6 +39,7 @@ app.add_middleware(
 # Global instances
 engine: Optional[WorkflowEngine] = None
 agents: Dict[str, Agent] = {}
+templates: Dict[str, AgentTemplate] = {}
 
 
 @app.on_event("startup")
@@ -66,6 +68,19 @@ async def shutdown_event():
     logger.info("api_stopped")
 
 
+async def _run_workflow(
+    workflow_id: str,
+    agent: Agent,
+    timeout: Optional[float] = None
+) -> None:
+    """Execute a workflow, then release the worker pools of its agent."""
+    try:
+        await engine.execute_workflow(workflow_id, agent, timeout)
+    finally:
+        # Pools are started again on demand if the workflow is resumed
+        agent.close()
+
+
 @app.get(f"{settings.api_prefix}/health")
 async def health_check():
     """Health check endpoint."""
@@ -85,11 +100,22 @@ async def create_workflow(
     background_tasks: BackgroundTasks
 ):
     """Create a new workflow."""
-    # Create agent
-    agent = Agent(
-        name=workflow.agent_name,
-        max_concurrent=workflow.max_concurrent or settings.worker_concurrency
-    )
+    # Create agent, stamped out of a compiled template when one is named
+    if workflow.template is not None:
+        if workflow.template not in templates:
+            raise HTTPException(status_code=404, detail="Template not found")
+        options = {}
+        if workflow.max_concurrent:
+            options["max_concurrent"] = workflow.max_concurrent
+        agent = templates[workflow.template].instantiate(
+            name=workflow.agent_name,
+            **options
+        )
+    else:
+        agent = Agent(
+            name=workflow.agent_name,
+            max_concurrent=workflow.max_concurrent or settings.worker_concurrency
+        )
     
     # Store agent for later use
     workflow_id = await engine.create_workflow(
@@ -103,7 +129,7 @@ async def create_workflow(
     # Start execution in background if requested
     if workflow.auto_start:
         background_tasks.add_task(
-            engine.execute_workflow,
+            _run_workflow,
             workflow_id,
             agent,
             workflow.timeout
@@ -117,6 +143,24 @@ async def create_workflow(
     )
 
 
+@app.post(
+    f"{settings.api_prefix}/templates",
+    response_model=Dict[str, Any]
+)
+async def create_template(template: TemplateCreate):
+    """Compile a created (not yet run) workflow into a named template."""
+    if template.workflow_id not in agents:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    try:
+        compiled = AgentTemplate.compile(agents[template.workflow_id])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    templates[template.name] = compiled
+    return {"status": "compiled", "template": template.name, "states": len(compiled)}
+
+
 @app.post(
     f"{settings.api_prefix}/workflows/{{workflow_id}}/states",
     response_model=Dict[str, str]
@@ -166,7 +210,7 @@ async def execute_workflow(
     agent = agents[workflow_id]
     
     background_tasks.add_task(
-        engine.execute_workflow,
+        _run_workflow,
         workflow_id,
         agent,
         timeout
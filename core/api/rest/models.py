@@ -15,6 +15,13 @@ class WorkflowCreate(BaseModel):
     timeout: Optional[float] = None
     metadata: Optional[Dict[str, Any]] = None
     auto_start: bool = False
+    template: Optional[str] = None
+
+
+class TemplateCreate(BaseModel):
+    """Compile a workflow's agent into a reusable template."""
+    name: str
+    workflow_id: str
 
 
 class WorkflowResponse(BaseModel):
@@ -24,6 +24,11 @@ from core.coordination.rate_limiter import (
     SlidingWindow,
     FixedWindow
 )
+from core.coordination.singleflight import (
+    SingleFlight,
+    config_key,
+    default_singleflight
+)
 from core.coordination.deadlock import (
     DeadlockDetector,
     DependencyGraph,
@@ -57,6 +62,11 @@ __all__ = [
     "SlidingWindow",
     "FixedWindow",
     
+    # Single-flight
+    "SingleFlight",
+    "config_key",
+    "default_singleflight",
+    
     # Deadlock Detection
     "DeadlockDetector",
     "DependencyGraph",
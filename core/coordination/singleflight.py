@@ -0,0 +1,111 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from core.agent.memo import content_key
+
+T = TypeVar("T")
+
+
+def config_key(*parts: Any) -> str:
+    """
+    Canonical hash of call parameters: containers by content (dict order
+    ignored), other objects by their pickle. Raises UncacheableError (a
+    TypeError) for a value that cannot be hashed by content.
+    """
+    return content_key(*parts)
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    Callers of ``do`` with a key that is already in flight await the
+    running call instead of starting another, and all of them get its
+    result or exception. A successful result can also be kept for ``ttl``
+    seconds so that calls arriving just after it finished reuse it too
+    (at most ``max_results`` are kept, least recently used first out).
+
+    The shared call runs as its own task: a caller being cancelled does not
+    cancel it for the others. Calls are only coalesced within one event
+    loop.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_results: int = 1024):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self._results: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.result_hits = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[T]],
+        ttl: Optional[float] = None
+    ) -> T:
+        """Await ``call()``, sharing it with concurrent callers of ``key``."""
+        self.calls += 1
+        ttl = self.ttl if ttl is None else ttl
+
+        cached = self._results.get(key)
+        if cached is not None:
+            result, expires = cached
+            if time.monotonic() < expires:
+                self._results.move_to_end(key)
+                self.result_hits += 1
+                return result
+            del self._results[key]
+
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        task = self._inflight.get(flight)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = self._inflight[flight] = loop.create_task(call())
+            task.add_done_callback(
+                lambda done: self._landed(flight, done, ttl)
+            )
+
+        return await asyncio.shield(task)
+
+    def _landed(
+        self,
+        flight: Tuple[asyncio.AbstractEventLoop, Hashable],
+        task: asyncio.Task,
+        ttl: float
+    ) -> None:
+        if self._inflight.get(flight) is task:
+            del self._inflight[flight]
+        if ttl > 0 and not task.cancelled() and task.exception() is None:
+            key = flight[1]
+            self._results[key] = (task.result(), time.monotonic() + ttl)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a kept result, so the next call for ``key`` runs again."""
+        self._results.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Call counters; ``executions`` is the number of calls actually run."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "result_hits": self.result_hits,
+            "in_flight": len(self._inflight),
+        }
+
+
+# Shared by every workflow in the process
+default_singleflight = SingleFlight()
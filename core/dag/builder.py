@@ -7,9 +7,11 @@ import black
 from datetime import datetime
 import structlog
 
-from core.dag.graph import DAG, DAGNode, DAGEdge
+from core.dag.graph import DAG, DAGNode, DAGEdge, DAGValidationError
 from core.dag.parser import YAMLParser, WorkflowDefinition, StateDefinition
 from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import StateSpec
 from plugins.base import Plugin, PluginState
 
 
@@ -58,8 +60,7 @@ class DAGBuilder:
         for state_name, state in workflow.states.items():
             for dep in state.dependencies:
                 # Check if edge already exists
-                existing_edges = dag.get_edges(source=dep, target=state_name)
-                if not existing_edges:
+                if state_name not in dag.get_successors(dep):
                     edge = DAGEdge(
                         source=dep,
                         target=state_name,
@@ -72,36 +73,73 @@ class DAGBuilder:
         
         return dag
     
-    def build_agent(self, workflow: WorkflowDefinition, dag: DAG[StateDefinition]) -> Agent:
-        """Build agent from workflow and DAG."""
+    def build_agent(
+        self,
+        workflow: WorkflowDefinition,
+        dag: Optional[DAG[StateDefinition]] = None
+    ) -> Agent:
+        """
+        Build agent from workflow and DAG.
+        
+        Without a DAG the workflow definition is validated and ordered
+        directly, which skips building the graph (and its connectivity
+        check) for large generated workflows.
+        """
         agent = Agent(name=workflow.name)
         
         # Get topological order
-        topo_order = dag.topological_sort()
+        if dag is not None:
+            topo_order = dag.topological_sort()
+        else:
+            topo_order = self._dependency_order(workflow)
         
-        # Add states in order
-        for state_name in topo_order:
-            state_def = workflow.states[state_name]
-            
-            # Create state function
-            state_func = self._create_state_function(state_def)
-            
-            # Determine dependencies
-            dependencies = {}
-            for dep in state_def.dependencies:
-                dependencies[dep] = "required"
-            
-            # Add state to agent
-            agent.add_state(
-                name=state_name,
-                func=state_func,
-                dependencies=dependencies,
-                resources=self._convert_resources(state_def.resources),
-                max_retries=state_def.retries
-            )
+        # Add all states in one batch
+        agent.add_states(
+            self._state_spec(workflow.states[state_name])
+            for state_name in topo_order
+        )
         
         return agent
     
+    def _state_spec(self, state_def: StateDefinition) -> StateSpec:
+        """Agent state arguments for a state definition."""
+        return StateSpec(
+            name=state_def.name,
+            func=self._create_state_function(state_def),
+            dependencies={
+                dep: DependencyType.REQUIRED for dep in state_def.dependencies
+            },
+            resources=self._convert_resources(state_def.resources),
+            max_retries=state_def.retries
+        )
+    
+    def _dependency_order(self, workflow: WorkflowDefinition) -> List[str]:
+        """Validate a workflow and order its states by their dependencies."""
+        YAMLParser.validate_workflow(workflow)
+        
+        dependents: Dict[str, List[str]] = {name: [] for name in workflow.states}
+        in_degree: Dict[str, int] = {}
+        for state_name, state in workflow.states.items():
+            dependencies = set(state.dependencies)
+            in_degree[state_name] = len(dependencies)
+            for dep in dependencies:
+                dependents[dep].append(state_name)
+        
+        order = [name for name, degree in in_degree.items() if degree == 0]
+        for state_name in order:
+            for dependent in dependents[state_name]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    order.append(dependent)
+        
+        if len(order) < len(workflow.states):
+            blocked = sorted(name for name, degree in in_degree.items() if degree)
+            raise DAGValidationError(
+                f"Dependency cycle among states: {', '.join(blocked[:10])}"
+            )
+        
+        return order
+    
     def _create_state_function(self, state_def: StateDefinition):
         """Create state function from definition."""
         plugin_name = state_def.config.get("plugin")
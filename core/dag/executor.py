@@ -12,6 +12,7 @@ from core.dag.graph import DAG, DAGNode
 from core.dag.parser import WorkflowDefinition, StateDefinition
 from core.agent.base import Agent
 from core.agent.context import Context
+from core.agent.cache import TTLCache
 
 
 logger = structlog.get_logger(__name__)
@@ -139,12 +140,17 @@ class DAGExecutor:
     def __init__(
         self,
         max_concurrent: int = 10,
-        node_timeout: float = 300.0
+        node_timeout: float = 300.0,
+        context_cache: Optional[TTLCache] = None
     ):
         self.max_concurrent = max_concurrent
         self.node_timeout = node_timeout
         self._semaphore = asyncio.Semaphore(max_concurrent)
         self._node_handlers: Dict[str, Callable] = {}
+        # Backs Context.set_cached for every node of every execution
+        self.context_cache = (
+            context_cache if context_cache is not None else TTLCache()
+        )
     
     def register_node_handler(
         self,
@@ -250,7 +256,9 @@ class DAGExecutor:
                 )
                 
                 # Execute node
-                node_context = Context(context.shared_state)
+                node_context = Context(
+                    context.shared_state, cache=self.context_cache
+                )
                 
                 # Get handler based on node type
                 handler = self._get_node_handler(node)
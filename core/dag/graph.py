@@ -144,60 +144,37 @@ class DAG(Generic[T]):
     
     def has_cycle(self) -> bool:
         """Check if the DAG has a cycle."""
-        visited = set()
-        rec_stack = set()
-        
-        def dfs(node: str) -> bool:
-            visited.add(node)
-            rec_stack.add(node)
-            
-            for neighbor in self._adjacency.get(node, []):
-                if neighbor not in visited:
-                    if dfs(neighbor):
-                        return True
-                elif neighbor in rec_stack:
-                    return True
-            
-            rec_stack.remove(node)
-            return False
-        
-        for node in self._nodes:
-            if node not in visited:
-                if dfs(node):
-                    return True
-        
-        return False
+        return bool(self._find_cycle())
     
     def _find_cycle(self) -> List[str]:
         """Find a cycle in the DAG."""
-        visited = set()
-        rec_stack = set()
-        path = []
+        # Iterative DFS so that long chains do not hit the recursion limit
+        on_path: Set[str] = set()
+        done: Set[str] = set()
         
-        def dfs(node: str) -> Optional[List[str]]:
-            visited.add(node)
-            rec_stack.add(node)
-            path.append(node)
-            
-            for neighbor in self._adjacency.get(node, []):
-                if neighbor not in visited:
-                    result = dfs(neighbor)
-                    if result:
-                        return result
-                elif neighbor in rec_stack:
-                    # Found cycle
-                    cycle_start = path.index(neighbor)
-                    return path[cycle_start:] + [neighbor]
+        for root in self._nodes:
+            if root in done:
+                continue
+            path = [root]
+            on_path.add(root)
+            stack = [iter(self._adjacency.get(root, ()))]
             
-            path.pop()
-            rec_stack.remove(node)
-            return None
-        
-        for node in self._nodes:
-            if node not in visited:
-                result = dfs(node)
-                if result:
-                    return result
+            while stack:
+                for neighbor in stack[-1]:
+                    if neighbor in on_path:
+                        # Found cycle
+                        cycle_start = path.index(neighbor)
+                        return path[cycle_start:] + [neighbor]
+                    if neighbor not in done:
+                        path.append(neighbor)
+                        on_path.add(neighbor)
+                        stack.append(iter(self._adjacency.get(neighbor, ())))
+                        break
+                else:
+                    node = path.pop()
+                    on_path.discard(node)
+                    done.add(node)
+                    stack.pop()
         
         return []
     
@@ -210,24 +187,27 @@ class DAG(Generic[T]):
         visited = set()
         components = []
         
-        def dfs(node: str, component: Set[str]):
+        for node in self._nodes:
+            if node in visited:
+                continue
+            component = {node}
             visited.add(node)
-            component.add(node)
+            stack = [node]
             
-            # Visit successors and predecessors
-            for neighbor in self._adjacency.get(node, []):
-                if neighbor not in visited:
-                    dfs(neighbor, component)
+            while stack:
+                current = stack.pop()
+                # Visit successors and predecessors
+                for neighbors in (
+                    self._adjacency.get(current, ()),
+                    self._reverse_adjacency.get(current, ())
+                ):
+                    for neighbor in neighbors:
+                        if neighbor not in visited:
+                            visited.add(neighbor)
+                            component.add(neighbor)
+                            stack.append(neighbor)
             
-            for neighbor in self._reverse_adjacency.get(node, []):
-                if neighbor not in visited:
-                    dfs(neighbor, component)
-        
-        for node in self._nodes:
-            if node not in visited:
-                component = set()
-                dfs(node, component)
-                components.append(component)
+            components.append(component)
         
         return components
     
@@ -3,15 +3,18 @@
 import asyncio
 import hashlib
 import json
+import time
 from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
 import uuid
 import structlog
 
 from core.agent.base import Agent
+from core.agent.checkpoint import AgentCheckpoint
 from core.storage.interface import StorageBackend
 from core.storage.events import WorkflowEvent, EventType
 from core.monitoring.telemetry import TracingManager
+from core.monitoring.metrics import MetricsCollector
 from core.config import get_settings
 
 
@@ -24,12 +27,17 @@ class WorkflowEngine:
     def __init__(
         self,
         storage: StorageBackend,
-        tracing: Optional[TracingManager] = None
+        tracing: Optional[TracingManager] = None,
+        metrics: Optional[MetricsCollector] = None
     ):
         self.storage = storage
         self.tracing = tracing or TracingManager()
+        self.metrics = metrics
         self.settings = get_settings()
         self._running_workflows: Dict[str, Agent] = {}
+        self._checkpoint_tasks: Dict[str, asyncio.Task] = {}
+        self._checkpoint_locks: Dict[str, asyncio.Lock] = {}
+        self._checkpoint_stats: Dict[str, Dict[str, Any]] = {}
         self._event_handlers: Dict[EventType, List[callable]] = {
             event_type: [] for event_type in EventType
         }
@@ -87,11 +95,22 @@ class WorkflowEngine:
         agent: Agent,
         timeout: Optional[float] = None
     ) -> None:
-        """Execute a workflow instance."""
+        """
+        Execute a workflow instance.
+        
+        ``timeout`` is also the workflow's deadline for agents using
+        deadline scheduling.
+        """
         if workflow_id in self._running_workflows:
             raise RuntimeError(f"Workflow {workflow_id} is already running")
         
         self._running_workflows[workflow_id] = agent
+        if timeout is not None:
+            agent.set_deadline(time.time() + timeout)
+        if self.settings.checkpoint_interval > 0:
+            self._checkpoint_tasks[workflow_id] = asyncio.create_task(
+                self._checkpoint_loop(workflow_id, agent)
+            )
         
         # Emit started event
         event = WorkflowEvent(
@@ -137,6 +156,98 @@ class WorkflowEngine:
             
         finally:
             self._running_workflows.pop(workflow_id, None)
+            await self._stop_checkpointing(workflow_id)
+    
+    async def _checkpoint_loop(self, workflow_id: str, agent: Agent) -> None:
+        """Checkpoint a running workflow every checkpoint_interval seconds."""
+        interval = self.settings.checkpoint_interval
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.checkpoint_workflow(workflow_id, agent)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "background_checkpoint_failed",
+                    workflow_id=workflow_id,
+                    error=str(e)
+                )
+    
+    async def _stop_checkpointing(self, workflow_id: str) -> None:
+        """Stop the background checkpoint loop of a workflow."""
+        task = self._checkpoint_tasks.pop(workflow_id, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._checkpoint_locks.pop(workflow_id, None)
+    
+    async def checkpoint_workflow(
+        self,
+        workflow_id: str,
+        agent: Optional[Agent] = None,
+        full: bool = False
+    ) -> AgentCheckpoint:
+        """
+        Snapshot a workflow's agent and write the checkpoint.
+
+        The snapshot is taken synchronously on the loop, so it always falls
+        between two steps of the agent's states; serialisation and the write
+        happen without blocking them. Writes of one workflow are serialised
+        so delta chains are stored in order.
+        """
+        agent = agent or self._running_workflows.get(workflow_id)
+        if agent is None:
+            raise ValueError(f"Workflow {workflow_id} is not running")
+        
+        lock = self._checkpoint_locks.setdefault(workflow_id, asyncio.Lock())
+        async with lock:
+            stats = self._checkpoint_stats.setdefault(workflow_id, {
+                "count": 0,
+                "failed": False,
+                "snapshot_seconds": 0.0,
+                "write_seconds": 0.0
+            })
+            
+            # A lost write breaks the delta chain: start a new base
+            start = time.perf_counter()
+            checkpoint = agent.create_checkpoint(full=full or stats["failed"])
+            snapshot_seconds = time.perf_counter() - start
+            
+            try:
+                await self.storage.save_checkpoint(workflow_id, checkpoint)
+            except Exception:
+                stats["failed"] = True
+                raise
+            write_seconds = time.perf_counter() - start - snapshot_seconds
+            
+            stats.update(
+                count=stats["count"] + 1,
+                failed=False,
+                snapshot_seconds=snapshot_seconds,
+                write_seconds=write_seconds,
+                last_timestamp=checkpoint.timestamp,
+                last_delta=checkpoint.is_delta
+            )
+            if self.metrics is not None:
+                self.metrics.record_checkpoint(
+                    agent.name,
+                    snapshot_seconds,
+                    write_seconds,
+                    checkpoint.is_delta
+                )
+        
+        logger.debug(
+            "workflow_checkpointed",
+            workflow_id=workflow_id,
+            delta=checkpoint.is_delta,
+            snapshot_ms=snapshot_seconds * 1000,
+            write_ms=write_seconds * 1000
+        )
+        return checkpoint
     
     async def pause_workflow(self, workflow_id: str) -> Dict[str, Any]:
         """Pause a running workflow."""
@@ -144,10 +255,12 @@ class WorkflowEngine:
             raise ValueError(f"Workflow {workflow_id} is not running")
         
         agent = self._running_workflows[workflow_id]
-        checkpoint = await agent.pause()
+        # The checkpoint is taken (and stored) here, in order with the
+        # background ones
+        await agent.pause(checkpoint=False)
         
         # Save checkpoint
-        await self.storage.save_checkpoint(workflow_id, checkpoint)
+        checkpoint = await self.checkpoint_workflow(workflow_id, agent)
         
         # Emit paused event
         event = WorkflowEvent(
@@ -170,7 +283,10 @@ class WorkflowEngine:
         workflow_id: str,
         agent: Optional[Agent] = None
     ) -> None:
-        """Resume a paused workflow."""
+        """
+        Resume a paused workflow, or restart a crashed one from its latest
+        checkpoint.
+        """
         # Load checkpoint
         checkpoint = await self.storage.load_checkpoint(workflow_id)
         if not checkpoint:
@@ -242,6 +358,9 @@ class WorkflowEngine:
                 "running_states": len(agent._running_states)
             })
         
+        if workflow_id in self._checkpoint_stats:
+            status["checkpoints"] = dict(self._checkpoint_stats[workflow_id])
+        
         return status
     
     def on_event(self, event_type: EventType, handler: callable) -> None:
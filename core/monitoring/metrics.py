@@ -9,6 +9,7 @@ import traceback
 import json
 from collections import defaultdict
 import asyncio
+import contextlib
 from dataclasses import dataclass, field
 import statistics
 from datetime import datetime
@@ -175,6 +176,66 @@ class MetricsCollector:
             registry=self.registry
         )
         
+        self._metrics['scheduling_latency'] = Histogram(
+            'workflow_scheduling_latency_seconds',
+            'Delay between a state becoming ready and starting execution',
+            ['agent'],
+            registry=self.registry
+        )
+        
+        # Worker pool metrics
+        self._metrics['executor_queue_depth'] = Gauge(
+            'workflow_executor_queue_depth',
+            'Tasks submitted to a state worker pool but not started',
+            ['agent', 'pool'],
+            registry=self.registry
+        )
+        
+        self._metrics['executor_utilization'] = Gauge(
+            'workflow_executor_utilization',
+            'Fraction of busy workers in a state worker pool',
+            ['agent', 'pool'],
+            registry=self.registry
+        )
+        
+        self._metrics['shared_memory_bytes'] = Gauge(
+            'workflow_shared_memory_bytes',
+            'Bytes of shared memory exchanged with process workers, by kind '
+            '(held, peak, exported, received)',
+            ['agent', 'kind'],
+            registry=self.registry
+        )
+        
+        self._metrics['shared_memory_values'] = Gauge(
+            'workflow_shared_memory_values',
+            'Values exchanged with process workers through shared memory, by '
+            'kind (segments, exported, reused, received)',
+            ['agent', 'kind'],
+            registry=self.registry
+        )
+        
+        self._metrics['hedge_rate'] = Gauge(
+            'workflow_state_hedge_rate',
+            'Fraction of calls of a hedged state that launched a second attempt',
+            ['agent', 'state'],
+            registry=self.registry
+        )
+        
+        # Checkpoint metrics
+        self._metrics['checkpoint_duration'] = Histogram(
+            'workflow_checkpoint_duration_seconds',
+            'Time spent checkpointing, by phase (snapshot blocks the agent)',
+            ['agent', 'phase'],
+            registry=self.registry
+        )
+        
+        self._metrics['checkpoints_total'] = Counter(
+            'workflow_checkpoints_total',
+            'Total number of checkpoints written',
+            ['agent', 'kind'],
+            registry=self.registry
+        )
+        
         # Error metrics
         self._metrics['errors_total'] = Counter(
             'workflow_errors_total',
@@ -230,6 +291,74 @@ class MetricsCollector:
             priority=priority
         ).set(size)
     
+    def record_scheduling_latency(self, agent: str, latency: float):
+        """Record ready-to-started scheduling latency."""
+        self._metrics['scheduling_latency'].labels(agent=agent).observe(latency)
+    
+    def record_executor_stats(
+        self,
+        agent: str,
+        pool: str,
+        queue_depth: int,
+        utilization: float
+    ):
+        """Record worker pool queue depth and utilisation."""
+        self._metrics['executor_queue_depth'].labels(
+            agent=agent,
+            pool=pool
+        ).set(queue_depth)
+        
+        self._metrics['executor_utilization'].labels(
+            agent=agent,
+            pool=pool
+        ).set(utilization)
+    
+    def record_shared_memory_stats(self, agent: str, stats: Dict[str, int]):
+        """Record an agent's shared-memory transport stats."""
+        for kind, key in (
+            ('held', 'bytes'),
+            ('peak', 'peak_bytes'),
+            ('exported', 'bytes_exported'),
+            ('received', 'bytes_received')
+        ):
+            self._metrics['shared_memory_bytes'].labels(
+                agent=agent,
+                kind=kind
+            ).set(stats[key])
+        
+        for kind in ('segments', 'exported', 'reused', 'received'):
+            self._metrics['shared_memory_values'].labels(
+                agent=agent,
+                kind=kind
+            ).set(stats[kind])
+    
+    def record_hedge_rate(self, agent: str, state: str, rate: float):
+        """Record the hedge rate of a state."""
+        self._metrics['hedge_rate'].labels(agent=agent, state=state).set(rate)
+    
+    def record_checkpoint(
+        self,
+        agent: str,
+        snapshot_seconds: float,
+        write_seconds: float,
+        delta: bool
+    ):
+        """Record checkpoint snapshot and write durations."""
+        self._metrics['checkpoint_duration'].labels(
+            agent=agent,
+            phase='snapshot'
+        ).observe(snapshot_seconds)
+        
+        self._metrics['checkpoint_duration'].labels(
+            agent=agent,
+            phase='write'
+        ).observe(write_seconds)
+        
+        self._metrics['checkpoints_total'].labels(
+            agent=agent,
+            kind='delta' if delta else 'full'
+        ).inc()
+    
     def record_error(self, agent: str, state: str, error_type: str):
         """Record error metrics."""
         self._metrics['errors_total'].labels(
@@ -274,6 +403,10 @@ def agent_monitor(
 ):
     """
     Enhanced decorator for comprehensive agent monitoring
+
+    Executor queue depth and utilisation and the shared memory held for
+    process workers are sampled every ``update_interval`` seconds while
+    the agent runs.
     """
 
     def decorator(coro):
@@ -383,6 +516,38 @@ def agent_monitor(
 
                 agent._resolve_dependencies = monitored_resolve_dependencies
 
+            def sample_executors() -> None:
+                for pool, stats in agent.get_executor_stats().items():
+                    update_metric("concurrency", f"{pool}_queue_depth", stats["queue_depth"])
+                    update_metric("concurrency", f"{pool}_utilization", stats["utilization"])
+                    metrics_collector.record_executor_stats(
+                        agent.name,
+                        pool,
+                        stats["queue_depth"],
+                        stats["utilization"]
+                    )
+
+            def sample_shared_memory() -> None:
+                stats = agent.get_shared_memory_stats()
+                if not stats:
+                    return
+                update_metric("resources", "shared_memory_bytes", stats["bytes"])
+                metrics_collector.record_shared_memory_stats(agent.name, stats)
+
+            async def sampler_loop() -> None:
+                # Pools are idle and segments released once run() returns:
+                # sample them while it runs
+                while True:
+                    await asyncio.sleep(update_interval)
+                    if MetricType.CONCURRENCY in metrics:
+                        sample_executors()
+                    if MetricType.RESOURCES in metrics:
+                        sample_shared_memory()
+
+            sampler = None
+            if MetricType.CONCURRENCY in metrics or MetricType.RESOURCES in metrics:
+                sampler = asyncio.create_task(sampler_loop())
+
             try:
                 # Set agent status
                 metrics_collector.set_agent_status(agent.name, 1)  # Running
@@ -408,9 +573,27 @@ def agent_monitor(
                             used
                         )
 
+                    sample_shared_memory()
+
                 if MetricType.CONCURRENCY in metrics:
                     update_metric("concurrency", "max_concurrent", len(agent._running_states))
 
+                if MetricType.LATENCY in metrics:
+                    for latency in agent._scheduling_latency:
+                        update_metric("latency", "scheduling", latency)
+                        metrics_collector.record_scheduling_latency(
+                            agent.name,
+                            latency
+                        )
+
+                    for state_name, stats in agent.get_hedge_stats().items():
+                        update_metric("latency", f"{state_name}_hedge_rate", stats["hedge_rate"])
+                        metrics_collector.record_hedge_rate(
+                            agent.name,
+                            state_name,
+                            stats["hedge_rate"]
+                        )
+
                 if MetricType.THROUGHPUT in metrics:
                     states_per_second = len(agent.completed_states) / execution_time
                     update_metric("throughput", "states_per_second", states_per_second)
@@ -435,6 +618,11 @@ def agent_monitor(
                 raise
 
             finally:
+                if sampler is not None:
+                    sampler.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await sampler
+
                 # Stop real-time updates
                 if rt_metrics:
                     rt_metrics.stop()
@@ -1,8 +1,8 @@
 """Resource pool implementation"""
 
 import asyncio
-from collections import defaultdict
-from typing import Dict, Optional, Set, List, Tuple, Any
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Set, Tuple, Any
 import contextlib
 import time
 from dataclasses import dataclass  
@@ -48,7 +48,8 @@ class ResourcePool:
         total_network: float = 100.0,
         total_gpu: float = 0.0,
         enable_preemption: bool = False,
-        enable_quotas: bool = False
+        enable_quotas: bool = False,
+        history_limit: int = 10000
     ):
         # Resource limits
         self.resources = {
@@ -84,8 +85,11 @@ class ResourcePool:
         self._enable_preemption = enable_preemption
         self._preempted_states: Set[str] = set()
 
-        # Historical tracking
-        self._usage_history: List[Tuple[float, Dict[ResourceType, float]]] = []
+        # Historical tracking: a ring of at most history_limit samples from
+        # the last hour
+        self._usage_history: Deque[Tuple[float, Dict[ResourceType, float]]] = deque(
+            maxlen=history_limit
+        )
         self._history_retention = 3600  # 1 hour
 
     async def set_quota(self, state_name: str, resource_type: ResourceType, limit: float) -> None:
@@ -169,6 +173,26 @@ class ResourcePool:
 
         finally:
             self._waiting_states.discard(state_name)
+            # Events are only needed while waiting
+            self._allocation_events.pop(state_name, None)
+
+    async def try_acquire(
+        self,
+        state_name: str,
+        requirements: ResourceRequirements
+    ) -> bool:
+        """Acquire resources only if they are available right now."""
+        start_time = time.time()
+        async with self._global_lock:
+            self._validate_requirements(requirements)
+
+            if (not self._check_quota(state_name, requirements) or
+                    not self._can_allocate(requirements)):
+                return False
+
+            self._allocate(state_name, requirements)
+            self._update_stats(state_name, requirements, start_time)
+            return True
 
     def _validate_requirements(self, requirements: ResourceRequirements) -> None:
         """Validate resource requirements."""
@@ -318,7 +342,15 @@ class ResourcePool:
         # Cleanup old history
         cutoff = time.time() - self._history_retention
         while self._usage_history and self._usage_history[0][0] < cutoff:
-            self._usage_history.pop(0)
+            self._usage_history.popleft()
+
+    def compact(self) -> None:
+        """Drop the wait events of states that are no longer waiting."""
+        for state_name in [
+            name for name in self._allocation_events
+            if name not in self._waiting_states
+        ]:
+            del self._allocation_events[state_name]
 
     def get_usage_stats(self) -> Dict[ResourceType, ResourceUsageStats]:
         """Get current usage statistics."""
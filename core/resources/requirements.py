@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from enum import Flag, auto
 from typing import Optional
 
-from core.agent.state import Priority
+from core.agent.state import Priority, ExecutionMode
 
 
 class ResourceType(Flag):
@@ -18,7 +18,7 @@ class ResourceType(Flag):
     ALL = CPU | MEMORY | IO | NETWORK | GPU
 
 
-@dataclass
+@dataclass(slots=True)
 class ResourceRequirements:
     """Resource requirements for state execution."""
     cpu_units: float = 1.0
@@ -28,4 +28,5 @@ class ResourceRequirements:
     gpu_units: float = 0.0
     priority: Priority = Priority.NORMAL
     timeout: Optional[float] = None
-    resource_types: ResourceType = ResourceType.ALL
\ No newline at end of file
+    resource_types: ResourceType = ResourceType.ALL
+    execution_mode: ExecutionMode = ExecutionMode.ASYNC
\ No newline at end of file
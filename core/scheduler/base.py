@@ -13,6 +13,7 @@ import heapq
 from contextlib import asynccontextmanager
 
 from core.agent.base import Agent
+from core.agent.template import AgentTemplate
 from core.execution.engine import WorkflowEngine
 
 
@@ -190,6 +191,7 @@ class Scheduler(ABC):
         self._scheduler_task: Optional[asyncio.Task] = None
         self._running = False
         self._lock = asyncio.Lock()
+        self._templates: Dict[str, AgentTemplate] = {}
         
         # Callbacks
         self._task_callback: Optional[Callable[[ScheduledTask], Any]] = None
@@ -324,6 +326,10 @@ class Scheduler(ABC):
             
             return task.task_id
     
+    def register_template(self, name: str, template: AgentTemplate) -> None:
+        """Make a compiled agent template available to agent configs."""
+        self._templates[name] = template
+    
     def set_task_callback(self, callback: Callable[[ScheduledTask], Any]) -> None:
         """Set callback for task execution."""
         self._task_callback = callback
@@ -436,11 +442,15 @@ class Scheduler(ABC):
             elif self.workflow_engine and task.workflow_id:
                 # Create and execute workflow
                 agent = self._create_agent_from_config(task.agent_config)
-                await self.workflow_engine.execute_workflow(
-                    task.workflow_id,
-                    agent,
-                    timeout=schedule.timeout
-                )
+                try:
+                    await self.workflow_engine.execute_workflow(
+                        task.workflow_id,
+                        agent,
+                        timeout=schedule.timeout
+                    )
+                finally:
+                    # The agent is this task's own: release its worker pools
+                    agent.close()
                 result = {"status": "completed"}
             else:
                 raise ValueError("No execution method available")
@@ -506,6 +516,13 @@ class Scheduler(ABC):
         if not config:
             raise ValueError("No agent configuration provided")
         
+        template_name = config.get("template")
+        if template_name is not None:
+            template = self._templates.get(template_name)
+            if template is None:
+                raise ValueError(f"Unknown agent template {template_name}")
+            return template.instantiate(name=config.get("name"))
+        
         # This is a placeholder - would need proper deserialization
         from core.agent import Agent
         agent = Agent(name=config.get("name", "scheduled_agent"))
@@ -1,5 +1,6 @@
 """Cron-based scheduling implementation."""
 
+import asyncio
 import re
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime, timedelta
@@ -1,5 +1,6 @@
 """SQLite storage backend implementation."""
 
+import asyncio
 import json
 import pickle
 from typing import List, Optional, Dict, Any
@@ -10,13 +11,19 @@ from pathlib import Path
 from core.storage.interface import StorageBackend
 from core.storage.events import WorkflowEvent, EventType
 from core.agent.checkpoint import AgentCheckpoint
+from core.storage.codec import CheckpointCodec, CheckpointFormatError
 
 
 class SQLiteBackend(StorageBackend):
-    """SQLite implementation of storage backend."""
+    """
+    SQLite implementation of storage backend. Checkpoints are stored with
+    ``codec``; pass one with ``allow_pickle`` to store values it cannot
+    encode otherwise, or to read rows stored as pickles.
+    """
     
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, codec: Optional[CheckpointCodec] = None):
         self.database_url = database_url
+        self.codec = codec or CheckpointCodec()
         self.db_path = database_url.replace("sqlite+aiosqlite:///", "")
         self._connection: Optional[aiosqlite.Connection] = None
     
@@ -50,6 +57,8 @@ class SQLiteBackend(StorageBackend):
                 workflow_id TEXT NOT NULL,
                 checkpoint_data BLOB NOT NULL,
                 timestamp DATETIME NOT NULL,
+                checkpoint_id TEXT,
+                base_id TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             );
             
@@ -67,6 +76,24 @@ class SQLiteBackend(StorageBackend):
             );
         """)
         
+        # Databases created before delta checkpoints lack the chain columns
+        cursor = await self._connection.execute(
+            "PRAGMA table_info(workflow_checkpoints)"
+        )
+        columns = {row[1] for row in await cursor.fetchall()}
+        for column in ("checkpoint_id", "base_id"):
+            if column not in columns:
+                await self._connection.execute(
+                    f"ALTER TABLE workflow_checkpoints ADD COLUMN {column} TEXT"
+                )
+        
+        await self._connection.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_workflow_checkpoints_chain
+                ON workflow_checkpoints(workflow_id, base_id)
+            """
+        )
+        
         await self._connection.commit()
     
     async def close(self) -> None:
@@ -178,18 +205,26 @@ class SQLiteBackend(StorageBackend):
         workflow_id: str,
         checkpoint: AgentCheckpoint
     ) -> None:
-        """Save an agent checkpoint."""
+        """Save an agent checkpoint (full or delta)."""
         if not self._connection:
             raise RuntimeError("Storage backend not initialized")
         
-        checkpoint_data = pickle.dumps(checkpoint)
+        # Checkpoints are snapshots, so they can be serialised off the loop
+        checkpoint_data = await asyncio.to_thread(self.codec.encode, checkpoint)
         
         await self._connection.execute(
             """
-            INSERT INTO workflow_checkpoints (workflow_id, checkpoint_data, timestamp)
-            VALUES (?, ?, ?)
+            INSERT INTO workflow_checkpoints
+                (workflow_id, checkpoint_data, timestamp, checkpoint_id, base_id)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (workflow_id, checkpoint_data, datetime.utcnow().isoformat())
+            (
+                workflow_id,
+                checkpoint_data,
+                datetime.utcnow().isoformat(),
+                checkpoint.checkpoint_id,
+                checkpoint.base_id
+            )
         )
         
         await self._connection.commit()
@@ -198,25 +233,66 @@ class SQLiteBackend(StorageBackend):
         self,
         workflow_id: str
     ) -> Optional[AgentCheckpoint]:
-        """Load the latest checkpoint for a workflow."""
+        """
+        Load the latest checkpoint for a workflow.
+
+        A delta checkpoint is returned materialized on top of its base.
+        """
         if not self._connection:
             raise RuntimeError("Storage backend not initialized")
         
         cursor = await self._connection.execute(
             """
-            SELECT checkpoint_data FROM workflow_checkpoints
+            SELECT id, checkpoint_data, base_id FROM workflow_checkpoints
             WHERE workflow_id = ?
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
             LIMIT 1
             """,
             (workflow_id,)
         )
         
         row = await cursor.fetchone()
-        if row:
-            return pickle.loads(row[0])
+        if not row:
+            return None
+        
+        latest_id, checkpoint_data, base_id = row
+        if base_id is None:
+            return self._decode_checkpoint(checkpoint_data)
         
-        return None
+        cursor = await self._connection.execute(
+            """
+            SELECT checkpoint_data FROM workflow_checkpoints
+            WHERE workflow_id = ?
+              AND (checkpoint_id = ? OR base_id = ?)
+              AND id <= ?
+            ORDER BY id ASC
+            """,
+            (workflow_id, base_id, base_id, latest_id)
+        )
+        
+        chain = [
+            self._decode_checkpoint(data) for (data,) in await cursor.fetchall()
+        ]
+        if not chain or chain[0].is_delta:
+            raise ValueError(
+                f"Base checkpoint {base_id} of workflow {workflow_id} is missing"
+            )
+        
+        return AgentCheckpoint.from_chain(chain[0], chain[1:])
+    
+    def _decode_checkpoint(self, data: bytes) -> AgentCheckpoint:
+        """
+        Decode a stored checkpoint. Rows written before the codec are
+        pickles, loaded only if the codec allows pickle.
+        """
+        if self.codec.is_encoded(data):
+            return self.codec.decode(data)
+        if not self.codec.allow_pickle:
+            raise CheckpointFormatError(
+                "Checkpoint was stored pickled; decoding it needs a codec "
+                "with allow_pickle"
+            )
+        return pickle.loads(data)
     
     async def list_workflows(
         self,
@@ -0,0 +1,919 @@
+"""Versioned binary encoding of agent checkpoints."""
+
+import importlib
+import itertools
+import json
+import marshal
+import math
+import pickle
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.agent.base import RetryPolicy
+from core.agent.blobs import BlobHandle
+from core.agent.checkpoint import AgentCheckpoint, LazyTrackedDict
+from core.agent.dependencies import (
+    DependencyConfig,
+    DependencyLifecycle,
+    DependencyType,
+)
+from core.agent.memo import CachePolicy
+from core.agent.hedging import HedgePolicy
+from core.agent.state import (
+    AgentStatus,
+    ExecutionMode,
+    Priority,
+    PrioritizedState,
+    StateMetadata,
+    StateStatus,
+)
+from core.resources.requirements import ResourceRequirements, ResourceType
+
+
+MAGIC = b"PFCK"
+VERSION = 3
+
+# Header flags
+_FLAG_NONE = 0
+_FLAG_COMPRESSED = 1  # shared_state data section is zlib-compressed
+
+# Enums are stored as their index in these tables; new members must only
+# ever be appended (or VERSION bumped)
+_ENUMS: Dict[type, Tuple[Any, ...]] = {
+    AgentStatus: tuple(AgentStatus),
+    StateStatus: tuple(StateStatus),
+    ExecutionMode: tuple(ExecutionMode),
+    Priority: tuple(Priority),
+    DependencyType: tuple(DependencyType),
+    DependencyLifecycle: tuple(DependencyLifecycle),
+}
+_ENUM_INDEX: Dict[type, Dict[Any, int]] = {
+    enum_type: {member: index for index, member in enumerate(members)}
+    for enum_type, members in _ENUMS.items()
+}
+
+
+class CheckpointFormatError(ValueError):
+    """Raised for data that is not a checkpoint this codec can decode."""
+    pass
+
+
+# ----------------------------------------------------------- serialisers --
+
+class ValueSerializer:
+    """
+    Encodes shared_state values.
+
+    ``name`` is stored with every entry and used to find the serialiser
+    again when decoding, so it must stay stable. ``encode`` may raise
+    ValueError or TypeError to pass the value on to the next serialiser;
+    ``decode`` receives a bytes-like object.
+    """
+
+    name: str = ""
+
+    def can_encode(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class BytesSerializer(ValueSerializer):
+    """Raw bytes, stored as-is."""
+
+    name = "bytes"
+
+    def can_encode(self, value: Any) -> bool:
+        return type(value) is bytes
+
+    def encode(self, value: Any) -> bytes:
+        return value
+
+    def decode(self, data: bytes) -> Any:
+        return bytes(data)
+
+
+class BlobHandleSerializer(ValueSerializer):
+    """
+    Handles of values spilled to a BlobStore. Only the handle is stored;
+    the blob stays in its directory.
+    """
+
+    name = "blob"
+
+    def can_encode(self, value: Any) -> bool:
+        return type(value) is BlobHandle
+
+    def encode(self, value: BlobHandle) -> bytes:
+        value_type = value.value_type
+        return json.dumps([
+            value.digest,
+            value.size,
+            value.encoding,
+            value.directory,
+            f"{value_type.__module__}:{value_type.__qualname__}"
+            if value_type is not None else None
+        ], separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        digest, size, encoding, directory, type_path = json.loads(bytes(data))
+        return BlobHandle(
+            digest, size, encoding, directory, self._resolve_type(type_path)
+        )
+
+    @staticmethod
+    def _resolve_type(type_path: Optional[str]) -> Optional[type]:
+        if type_path is None:
+            return None
+        module_name, _, qualname = type_path.partition(":")
+        try:
+            value_type: Any = importlib.import_module(module_name)
+            for name in qualname.split("."):
+                value_type = getattr(value_type, name)
+        except (ImportError, AttributeError):
+            return None
+        return value_type if isinstance(value_type, type) else None
+
+
+# Type tags of BuiltinSerializer values; new ones must only ever be appended
+(_B_NONE, _B_FALSE, _B_TRUE, _B_INT, _B_FLOAT, _B_COMPLEX, _B_STR, _B_BYTES,
+ _B_BYTEARRAY, _B_LIST, _B_TUPLE, _B_DICT, _B_SET, _B_FROZENSET) = range(14)
+
+_F64 = struct.Struct("<d")
+_C128 = struct.Struct("<dd")
+_CONTAINER_TAGS = {
+    list: _B_LIST, tuple: _B_TUPLE, set: _B_SET, frozenset: _B_FROZENSET
+}
+
+
+def _encode_builtin(value: Any) -> bytes:
+    out = bytearray()
+    append = out.append
+    pack_f64 = _F64.pack
+
+    def uint(number: int) -> None:
+        while number > 0x7F:
+            append((number & 0x7F) | 0x80)
+            number >>= 7
+        append(number)
+
+    def write(value: Any) -> None:
+        nonlocal out
+        value_type = type(value)
+        if value_type is str:
+            data = value.encode("utf-8", "surrogatepass")
+            append(_B_STR)
+            uint(len(data))
+            out += data
+        elif value_type is int:
+            append(_B_INT)
+            # Zigzag: small negative numbers stay small
+            uint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif value_type is float:
+            append(_B_FLOAT)
+            out += pack_f64(value)
+        elif value_type is bool:
+            append(_B_TRUE if value else _B_FALSE)
+        elif value is None:
+            append(_B_NONE)
+        elif value_type is dict:
+            append(_B_DICT)
+            uint(len(value))
+            for key, item in value.items():
+                write(key)
+                write(item)
+        elif value_type in _CONTAINER_TAGS:
+            append(_CONTAINER_TAGS[value_type])
+            uint(len(value))
+            for item in value:
+                write(item)
+        elif value_type is bytes or value_type is bytearray:
+            append(_B_BYTES if value_type is bytes else _B_BYTEARRAY)
+            uint(len(value))
+            out += value
+        elif value_type is complex:
+            append(_B_COMPLEX)
+            out += _C128.pack(value.real, value.imag)
+        else:
+            raise TypeError(f"{value_type.__name__} is not a built-in value")
+
+    try:
+        write(value)
+    except RecursionError as e:
+        raise ValueError("Value nests too deeply (or is cyclic)") from e
+    return bytes(out)
+
+
+def _decode_builtin(data: Any) -> Any:
+    data = bytes(data)
+    offset = 0
+    unpack_f64 = _F64.unpack_from
+
+    def uint() -> int:
+        nonlocal offset
+        result = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def chunk() -> bytes:
+        nonlocal offset
+        size = uint()
+        start = offset
+        offset += size
+        return data[start:offset]
+
+    def read() -> Any:
+        nonlocal offset
+        tag = data[offset]
+        offset += 1
+        if tag == _B_STR:
+            return chunk().decode("utf-8", "surrogatepass")
+        if tag == _B_INT:
+            number = uint()
+            return (number >> 1) ^ -(number & 1)
+        if tag == _B_FLOAT:
+            offset += 8
+            return unpack_f64(data, offset - 8)[0]
+        if tag == _B_NONE:
+            return None
+        if tag == _B_FALSE:
+            return False
+        if tag == _B_TRUE:
+            return True
+        if tag == _B_LIST:
+            return [read() for _ in range(uint())]
+        if tag == _B_DICT:
+            result = {}
+            for _ in range(uint()):
+                key = read()
+                result[key] = read()
+            return result
+        if tag == _B_TUPLE:
+            return tuple([read() for _ in range(uint())])
+        if tag == _B_SET:
+            return {read() for _ in range(uint())}
+        if tag == _B_FROZENSET:
+            return frozenset([read() for _ in range(uint())])
+        if tag == _B_BYTES:
+            return chunk()
+        if tag == _B_BYTEARRAY:
+            return bytearray(chunk())
+        if tag == _B_COMPLEX:
+            offset += 16
+            return complex(*_C128.unpack_from(data, offset - 16))
+        raise CheckpointFormatError(f"Unknown built-in value tag {tag}")
+
+    return read()
+
+
+class BuiltinSerializer(ValueSerializer):
+    """
+    Built-in scalars and containers (exact types only): None, bool, int,
+    float, complex, str, bytes, bytearray, list, tuple, dict, set and
+    frozenset, nested to any depth.
+
+    The encoding is defined here (a type tag per value, varint lengths and
+    integers, little-endian floats), so unlike marshal it does not change
+    between Python versions, and loading cannot run code.
+    """
+
+    name = "builtin"
+
+    def can_encode(self, value: Any) -> bool:
+        # Unsupported types are rejected by encode, anywhere in the value
+        return True
+
+    def encode(self, value: Any) -> bytes:
+        return _encode_builtin(value)
+
+    def decode(self, data: bytes) -> Any:
+        return _decode_builtin(data)
+
+
+class MarshalSerializer(ValueSerializer):
+    """
+    Built-in scalars and containers (exact types only).
+
+    Only decoded, for entries written by earlier versions of the codec:
+    marshal's format may change between Python versions, so new
+    checkpoints use BuiltinSerializer. Loading cannot run code.
+    """
+
+    name = "marshal"
+
+    def can_encode(self, value: Any) -> bool:
+        # marshal rejects subclasses and other types itself, see encode
+        return True
+
+    def encode(self, value: Any) -> bytes:
+        return marshal.dumps(value)
+
+    def decode(self, data: bytes) -> Any:
+        return marshal.loads(data)
+
+
+# Values are checked by _is_json first, which rejects cycles
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+_JSON_DECODER = json.JSONDecoder()
+_JSON_SCALARS = frozenset((str, int, bool, type(None)))
+_JSON_TYPES = _JSON_SCALARS | {float, list, dict}
+
+
+def _is_json(value: Any) -> bool:
+    """Whether ``value`` round-trips exactly through JSON (exact types only)."""
+    value_type = type(value)
+    if value_type in _JSON_SCALARS:
+        return True
+    if value_type is float:
+        return math.isfinite(value)
+    if value_type is dict:
+        if not set(map(type, value)) <= {str}:
+            return False
+        items = value.values()
+    elif value_type is list:
+        items = value
+    else:
+        return False
+    # Type the items in C, then only visit floats and containers
+    item_types = set(map(type, items))
+    if item_types <= _JSON_SCALARS:
+        return True
+    if not item_types <= _JSON_TYPES:
+        return False
+    return all(
+        _is_json(item) for item in items if type(item) not in _JSON_SCALARS
+    )
+
+
+class JSONSerializer(ValueSerializer):
+    """
+    Values that round-trip exactly through JSON, for stores that must stay
+    readable outside Python.
+    """
+
+    name = "json"
+
+    def can_encode(self, value: Any) -> bool:
+        try:
+            return _is_json(value)
+        except RecursionError:
+            return False
+
+    def encode(self, value: Any) -> bytes:
+        return _JSON_ENCODER.encode(value).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return _JSON_DECODER.raw_decode(bytes(data).decode())[0]
+
+
+class PickleSerializer(ValueSerializer):
+    """
+    Fallback for any other picklable value. Loading a pickle can run
+    arbitrary code, so codecs only use this when pickle is allowed.
+    """
+
+    name = "pickle"
+
+    def can_encode(self, value: Any) -> bool:
+        return True
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+# ---------------------------------------------------------------- writer --
+
+class _Writer:
+    """Append-only buffer with a string table."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.strings: Dict[str, int] = {}
+
+    def uint(self, value: int) -> None:
+        while value > 0x7F:
+            self.buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.buffer.append(value)
+
+    def sint(self, value: int) -> None:
+        # Zigzag: small negative numbers stay small
+        self.uint(value << 1 if value >= 0 else (-value << 1) - 1)
+
+    def f64(self, value: float) -> None:
+        self.buffer += struct.pack("<d", value)
+
+    def opt_f64(self, value: Optional[float]) -> None:
+        if value is None:
+            self.buffer.append(0)
+        else:
+            self.buffer.append(1)
+            self.f64(value)
+
+    def flag(self, value: bool) -> None:
+        self.buffer.append(1 if value else 0)
+
+    def enum(self, value: Any) -> None:
+        self.uint(_ENUM_INDEX[type(value)][value])
+
+    def index(self, value: str) -> int:
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def string(self, value: str) -> None:
+        self.uint(self.index(value))
+
+    def opt_string(self, value: Optional[str]) -> None:
+        if value is None:
+            self.buffer.append(0)
+        else:
+            self.buffer.append(1)
+            self.string(value)
+
+    def string_set(self, values: Iterable[str]) -> None:
+        values = sorted(values)
+        self.uint(len(values))
+        for value in values:
+            self.string(value)
+
+    def opt_strings(self, values: Optional[Sequence[str]]) -> None:
+        if values is None:
+            self.buffer.append(0)
+        else:
+            self.buffer.append(1)
+            # Order is meaningful for these, so they are not sorted
+            self.uint(len(values))
+            for value in values:
+                self.string(value)
+
+    def blob(self, value: bytes) -> None:
+        self.uint(len(value))
+        self.buffer += value
+
+    def string_table(self) -> bytes:
+        table = _Writer()
+        table.uint(len(self.strings))
+        for value in self.strings:
+            table.blob(value.encode())
+        return bytes(table.buffer)
+
+
+# ---------------------------------------------------------------- reader --
+
+class _Reader:
+    """Cursor over an encoded checkpoint."""
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = memoryview(data)
+        self.offset = offset
+        self.strings: List[str] = []
+
+    def uint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.offset]
+            self.offset += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def sint(self) -> int:
+        value = self.uint()
+        return (value >> 1) ^ -(value & 1)
+
+    def f64(self) -> float:
+        value = struct.unpack_from("<d", self.data, self.offset)[0]
+        self.offset += 8
+        return value
+
+    def opt_f64(self) -> Optional[float]:
+        present = self.data[self.offset]
+        self.offset += 1
+        return self.f64() if present else None
+
+    def flag(self) -> bool:
+        value = self.data[self.offset]
+        self.offset += 1
+        return bool(value)
+
+    def enum(self, enum_type: type) -> Any:
+        return _ENUMS[enum_type][self.uint()]
+
+    def string(self) -> str:
+        return self.strings[self.uint()]
+
+    def opt_string(self) -> Optional[str]:
+        present = self.data[self.offset]
+        self.offset += 1
+        return self.string() if present else None
+
+    def string_set(self) -> List[str]:
+        return [self.string() for _ in range(self.uint())]
+
+    def opt_strings(self) -> Optional[List[str]]:
+        present = self.data[self.offset]
+        self.offset += 1
+        return self.string_set() if present else None
+
+    def blob(self) -> bytes:
+        size = self.uint()
+        value = bytes(self.data[self.offset:self.offset + size])
+        self.offset += size
+        return value
+
+    def packed(self, count: int) -> Tuple[int, ...]:
+        values = struct.unpack_from(f"<{count}I", self.data, self.offset)
+        self.offset += 4 * count
+        return values
+
+    def read_string_table(self) -> None:
+        self.strings = [self.blob().decode() for _ in range(self.uint())]
+
+
+# ----------------------------------------------------------------- codec --
+
+class CheckpointCodec:
+    """
+    Compact, schema-versioned binary codec for AgentCheckpoint.
+
+    State names and other repeated strings go through a string table, enums
+    are stored as small ints and sets as sorted arrays. shared_state values
+    are encoded by the first serialiser that accepts them (raw bytes, blob
+    handles, JSON, then other built-in values) into one data section,
+    zlib-compressed as a whole. Decoding returns a checkpoint whose
+    shared_state entries are only deserialised when first read.
+
+    Pickle is opt-in: with ``allow_pickle`` any other picklable value is
+    pickled, and pickled entries (and legacy pickled checkpoints) can be
+    decoded. Only allow it for stores whose contents are trusted, since
+    loading a pickle can run arbitrary code. Without it, encoding a value
+    no serialiser accepts raises TypeError.
+
+    Callables (dependency conditions) are not stored: they come back from
+    the agent definition when the checkpoint is restored.
+    """
+
+    def __init__(
+        self,
+        serializers: Optional[Sequence[ValueSerializer]] = None,
+        compress: bool = True,
+        compress_level: int = 1,
+        allow_pickle: bool = False
+    ):
+        serializers = list(serializers or (
+            BytesSerializer(), BlobHandleSerializer(), JSONSerializer(),
+            BuiltinSerializer()
+        ))
+        if allow_pickle and not any(s.name == PickleSerializer.name for s in serializers):
+            serializers.append(PickleSerializer())
+        if not allow_pickle:
+            serializers = [s for s in serializers if s.name != PickleSerializer.name]
+
+        self.serializers = serializers
+        self.allow_pickle = allow_pickle
+        # Entries of earlier versions may use marshal; it is only decoded
+        self._by_name = {MarshalSerializer.name: MarshalSerializer()}
+        self._by_name.update(
+            (serializer.name, serializer) for serializer in serializers
+        )
+        self.compress = compress
+        self.compress_level = compress_level
+
+    @staticmethod
+    def is_encoded(data: bytes) -> bool:
+        """Whether data was produced by this codec (rather than pickle)."""
+        return bytes(data[:len(MAGIC)]) == MAGIC
+
+    # -------------------------------------------------------------- encode --
+
+    def encode(self, checkpoint: AgentCheckpoint) -> bytes:
+        """Encode a checkpoint."""
+        w = _Writer()
+
+        w.f64(checkpoint.timestamp)
+        w.string(checkpoint.agent_name)
+        w.enum(checkpoint.agent_status)
+        w.opt_f64(checkpoint.session_start)
+        w.string(checkpoint.checkpoint_id)
+        w.opt_string(checkpoint.base_id)
+        w.uint(checkpoint.sequence)
+        w.string_set(checkpoint.deleted_keys)
+        w.string_set(checkpoint.running_states)
+        w.string_set(checkpoint.completed_states)
+        w.string_set(checkpoint.completed_once)
+
+        # A delta may leave out an unchanged queue
+        queue = checkpoint.priority_queue
+        w.flag(queue is not None)
+        if queue is not None:
+            w.uint(len(queue))
+            for entry in queue:
+                w.sint(entry.priority)
+                w.f64(entry.timestamp)
+                w.string(entry.state_name)
+
+        w.uint(len(checkpoint.state_metadata))
+        for name, metadata in checkpoint.state_metadata.items():
+            w.string(name)
+            self._encode_metadata(w, metadata)
+
+        # The entry index is stored as packed columns (key string, serialiser
+        # string, length); values are concatenated in the data section
+        keys, names, chunks = [], [], []
+        for key, value in checkpoint.shared_state.items():
+            serializer, data = self._encode_value(key, value)
+            keys.append(key)
+            names.append(serializer.name)
+            chunks.append(data)
+
+        count = len(keys)
+        w.uint(count)
+        w.buffer += struct.pack(f"<{count}I", *map(w.index, keys))
+        w.buffer += struct.pack(f"<{count}I", *map(w.index, names))
+        w.buffer += struct.pack(f"<{count}I", *map(len, chunks))
+
+        section = b"".join(chunks)
+        flags = _FLAG_NONE
+        if self.compress and section:
+            section = zlib.compress(section, self.compress_level)
+            flags |= _FLAG_COMPRESSED
+
+        return b"".join((
+            MAGIC,
+            bytes((VERSION, flags)),
+            w.string_table(),
+            bytes(w.buffer),
+            section
+        ))
+
+    def _encode_value(self, key: str, value: Any) -> Tuple[ValueSerializer, bytes]:
+        for serializer in self.serializers:
+            if serializer.can_encode(value):
+                try:
+                    return serializer, serializer.encode(value)
+                except (ValueError, TypeError):
+                    continue
+        hint = "" if self.allow_pickle else "; allow_pickle would pickle it"
+        raise TypeError(
+            f"No checkpoint serialiser accepts shared_state['{key}'] "
+            f"({type(value).__name__}){hint}"
+        )
+
+    def _encode_metadata(self, w: _Writer, metadata: StateMetadata) -> None:
+        w.enum(metadata.status)
+        w.uint(metadata.attempts)
+        w.uint(metadata.max_retries)
+
+        resources = metadata.resources
+        w.f64(resources.cpu_units)
+        w.f64(resources.memory_mb)
+        w.f64(resources.io_weight)
+        w.f64(resources.network_weight)
+        w.f64(resources.gpu_units)
+        w.enum(Priority(resources.priority))
+        w.opt_f64(resources.timeout)
+        w.uint(resources.resource_types.value)
+        w.enum(resources.execution_mode)
+
+        w.uint(len(metadata.dependencies))
+        for dep_name, dep_config in metadata.dependencies.items():
+            w.string(dep_name)
+            w.enum(dep_config.type)
+            w.enum(dep_config.lifecycle)
+            w.opt_f64(dep_config.expiry)
+            w.opt_f64(dep_config.interval)
+            w.opt_f64(dep_config.timeout)
+            w.opt_string(
+                json.dumps(dep_config.retry_policy)
+                if dep_config.retry_policy is not None else None
+            )
+
+        w.string_set(metadata.satisfied_dependencies)
+        w.opt_f64(metadata.last_execution)
+        w.opt_f64(metadata.last_success)
+        w.string(metadata.state_id)
+
+        policy = metadata.retry_policy
+        w.flag(policy is not None)
+        if policy is not None:
+            w.uint(policy.max_retries)
+            w.f64(policy.initial_delay)
+            w.f64(policy.max_delay)
+            w.f64(policy.exponential_base)
+            w.flag(policy.jitter)
+
+        w.enum(metadata.execution_mode)
+        w.opt_strings(metadata.shared_keys)
+
+        cache = metadata.cache
+        w.flag(cache is not None)
+        if cache is not None:
+            w.opt_strings(cache.inputs)
+            w.opt_f64(cache.ttl)
+
+        hedge = metadata.hedge
+        w.flag(hedge is not None)
+        if hedge is not None:
+            w.f64(hedge.percentile)
+            w.uint(hedge.min_samples)
+            w.uint(hedge.history)
+
+    # -------------------------------------------------------------- decode --
+
+    def decode(self, data: bytes) -> AgentCheckpoint:
+        """Decode a checkpoint; shared_state entries are decoded on access."""
+        if not self.is_encoded(data):
+            raise CheckpointFormatError("Not an encoded checkpoint")
+        version, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+        if version > VERSION:
+            raise CheckpointFormatError(
+                f"Checkpoint format version {version} is newer than "
+                f"supported version {VERSION}"
+            )
+
+        r = _Reader(data, len(MAGIC) + 2)
+        r.read_string_table()
+
+        timestamp = r.f64()
+        agent_name = r.string()
+        agent_status = r.enum(AgentStatus)
+        session_start = r.opt_f64()
+        checkpoint_id = r.string()
+        base_id = r.opt_string()
+        sequence = r.uint()
+        deleted_keys = set(r.string_set())
+        running_states = set(r.string_set())
+        completed_states = set(r.string_set())
+        completed_once = set(r.string_set())
+
+        queue = None
+        if version < 3 or r.flag():
+            queue = [(r.sint(), r.f64(), r.string()) for _ in range(r.uint())]
+
+        state_metadata = {}
+        for _ in range(r.uint()):
+            name = r.string()
+            state_metadata[name] = self._decode_metadata(r, version)
+
+        count = r.uint()
+        keys = r.packed(count)
+        names = r.packed(count)
+        lengths = r.packed(count)
+
+        serializers = {}
+        for index in set(names):
+            serializer = self._by_name.get(r.strings[index])
+            if serializer is None:
+                name = r.strings[index]
+                hint = (
+                    " (pickled values need allow_pickle)"
+                    if name == PickleSerializer.name else ""
+                )
+                raise CheckpointFormatError(
+                    f"No serialiser '{name}' to decode shared_state{hint}"
+                )
+            serializers[index] = serializer
+
+        section = r.data[r.offset:]
+        if flags & _FLAG_COMPRESSED:
+            section = memoryview(zlib.decompress(section))
+
+        # Tokens are (serialiser string index, end offset, length)
+        ends = list(itertools.accumulate(lengths))
+        strings = r.strings
+        pending = dict(zip(
+            (strings[index] for index in keys),
+            zip(names, ends, lengths)
+        ))
+
+        def load(token: Tuple[int, int, int]) -> Any:
+            name, end, length = token
+            return serializers[name].decode(section[end - length:end])
+
+        # Queue entries refer to the state's metadata; a delta checkpoint may
+        # not carry it, in which case a placeholder is used (restores only
+        # take priority and timestamp from the queue)
+        priority_queue = None if queue is None else [
+            PrioritizedState(
+                priority,
+                entry_timestamp,
+                name,
+                state_metadata.get(name) or StateMetadata(status=StateStatus.PENDING)
+            )
+            for priority, entry_timestamp, name in queue
+        ]
+
+        return AgentCheckpoint(
+            timestamp=timestamp,
+            agent_name=agent_name,
+            agent_status=agent_status,
+            priority_queue=priority_queue,
+            state_metadata=state_metadata,
+            running_states=running_states,
+            completed_states=completed_states,
+            completed_once=completed_once,
+            shared_state=LazyTrackedDict(pending=pending, loader=load),
+            session_start=session_start,
+            checkpoint_id=checkpoint_id,
+            base_id=base_id,
+            sequence=sequence,
+            deleted_keys=deleted_keys
+        )
+
+    def _decode_metadata(self, r: _Reader, version: int) -> StateMetadata:
+        status = r.enum(StateStatus)
+        attempts = r.uint()
+        max_retries = r.uint()
+
+        resources = ResourceRequirements(
+            cpu_units=r.f64(),
+            memory_mb=r.f64(),
+            io_weight=r.f64(),
+            network_weight=r.f64(),
+            gpu_units=r.f64(),
+            priority=r.enum(Priority),
+            timeout=r.opt_f64(),
+            resource_types=ResourceType(r.uint()),
+            execution_mode=r.enum(ExecutionMode)
+        )
+
+        dependencies = {}
+        for _ in range(r.uint()):
+            dep_name = r.string()
+            dependencies[dep_name] = DependencyConfig(
+                type=r.enum(DependencyType),
+                lifecycle=r.enum(DependencyLifecycle),
+                expiry=r.opt_f64(),
+                interval=r.opt_f64(),
+                timeout=r.opt_f64()
+            )
+            retry_policy = r.opt_string()
+            if retry_policy is not None:
+                dependencies[dep_name].retry_policy = json.loads(retry_policy)
+
+        satisfied = set(r.string_set())
+        last_execution = r.opt_f64()
+        last_success = r.opt_f64()
+        state_id = r.string()
+
+        retry_policy = None
+        if r.flag():
+            retry_policy = RetryPolicy(
+                max_retries=r.uint(),
+                initial_delay=r.f64(),
+                max_delay=r.f64(),
+                exponential_base=r.f64(),
+                jitter=r.flag()
+            )
+
+        execution_mode = r.enum(ExecutionMode)
+        shared_keys = r.opt_strings()
+
+        cache = None
+        if r.flag():
+            inputs = r.opt_strings()
+            cache = CachePolicy(
+                inputs=tuple(inputs) if inputs is not None else None,
+                ttl=r.opt_f64()
+            )
+
+        hedge = None
+        if version >= 2 and r.flag():
+            hedge = HedgePolicy(
+                percentile=r.f64(),
+                min_samples=r.uint(),
+                history=r.uint()
+            )
+
+        return StateMetadata(
+            status=status,
+            attempts=attempts,
+            max_retries=max_retries,
+            resources=resources,
+            dependencies=dependencies,
+            satisfied_dependencies=satisfied,
+            last_execution=last_execution,
+            last_success=last_success,
+            state_id=state_id,
+            retry_policy=retry_policy,
+            execution_mode=execution_mode,
+            shared_keys=tuple(shared_keys) if shared_keys is not None else None,
+            cache=cache,
+            hedge=hedge
+        )
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+examples/checkpoint_codec_benchmark.py
+
+Compares the binary checkpoint codec with pickle on a synthetic agent:
+encoded size, encode time, full decode time and the time to restore an
+agent that only reads one shared_state entry (lazy decoding).
+
+    python examples/checkpoint_codec_benchmark.py [states] [variables]
+"""
+
+import asyncio
+import pickle
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.agent import Agent, DependencyType
+from core.storage.codec import CheckpointCodec
+
+
+async def noop(context):
+    return None
+
+
+def build_agent(states: int, variables: int) -> Agent:
+    agent = Agent("benchmark")
+    for i in range(states):
+        dependencies = {f"state_{i - 1}": DependencyType.REQUIRED} if i else None
+        agent.add_state(f"state_{i}", noop, dependencies=dependencies)
+
+    for i in range(variables):
+        agent.shared_state[f"var_{i}"] = {
+            "id": i,
+            "name": f"record-{i}",
+            "values": list(range(50)),
+            "tags": ["alpha", "beta", "gamma"],
+        }
+    return agent
+
+
+def timed(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(states: int, variables: int) -> None:
+    agent = build_agent(states, variables)
+    checkpoint = agent.create_checkpoint(full=True)
+    codec = CheckpointCodec()
+
+    pickled = pickle.dumps(checkpoint)
+    encoded = codec.encode(checkpoint)
+
+    def full_decode() -> None:
+        decoded = codec.decode(encoded)
+        dict(decoded.shared_state)
+
+    async def restore_one(data: bytes, decode) -> float:
+        target = build_agent(states, 0)
+        start = time.perf_counter()
+        await target.restore_from_checkpoint(decode(data))
+        target.shared_state.get("var_0")
+        return time.perf_counter() - start
+
+    print(f"{states} states, {variables} shared_state entries\n")
+    print(f"{'':24}{'pickle':>12}{'codec':>12}")
+    print(f"{'size (KiB)':24}{len(pickled) / 1024:12.1f}{len(encoded) / 1024:12.1f}")
+    print(f"{'encode (ms)':24}"
+          f"{timed(lambda: pickle.dumps(checkpoint)) * 1000:12.2f}"
+          f"{timed(lambda: codec.encode(checkpoint)) * 1000:12.2f}")
+    print(f"{'full decode (ms)':24}"
+          f"{timed(lambda: pickle.loads(pickled)) * 1000:12.2f}"
+          f"{timed(full_decode) * 1000:12.2f}")
+    print(f"{'restore, read 1 (ms)':24}"
+          f"{await restore_one(pickled, pickle.loads) * 1000:12.2f}"
+          f"{await restore_one(encoded, codec.decode) * 1000:12.2f}")
+
+
+if __name__ == "__main__":
+    states = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    variables = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    asyncio.run(main(states, variables))
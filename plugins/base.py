@@ -1,13 +1,22 @@
 """Plugin system base classes."""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Type
+from collections import ChainMap
+from copy import deepcopy
+import inspect
+from typing import Dict, Any, Optional, List, Tuple, Type
 from dataclasses import dataclass
 import yaml
 from pathlib import Path
 
 from core.agent.context import Context
+from core.agent.memo import UncacheableError
 from core.agent.state import StateResult
+from core.coordination.singleflight import (
+    SingleFlight,
+    config_key,
+    default_singleflight
+)
 
 
 @dataclass
@@ -27,12 +36,33 @@ class PluginManifest:
 class PluginState(ABC):
     """Base class for plugin states."""
     
+    # Opt-in, per class or with the "singleflight" config entry: concurrent
+    # runs of this state with the same config share one execution, and its
+    # result is reused for singleflight_ttl seconds (or the
+    # "singleflight_ttl" config entry). Only for states whose effects depend
+    # on their config and on the shared_state keys in singleflight_inputs
+    # (secrets as "secret_<name>"): the shared run sees nothing else, and
+    # those values are part of the key. Runs whose config or inputs cannot
+    # be hashed by content are not coalesced.
+    singleflight: bool = False
+    singleflight_ttl: float = 0.0
+    singleflight_inputs: Tuple[str, ...] = ()
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
     
+    def coalescible(self) -> bool:
+        """Whether this run may share an identical concurrent run."""
+        return bool(self.config.get("singleflight", self.singleflight))
+    
     @abstractmethod
     async def execute(self, context: Context) -> StateResult:
-        """Execute the plugin state."""
+        """
+        Execute the plugin state.
+
+        States doing blocking work may implement this as a plain method;
+        the agent then runs it on its thread pool.
+        """
         pass
     
     def validate_inputs(self, context: Context) -> None:
@@ -49,6 +79,9 @@ class PluginState(ABC):
 class Plugin(ABC):
     """Base class for plugins."""
     
+    # Coalesces identical runs of opted-in states across all workflows
+    singleflight: SingleFlight = default_singleflight
+    
     def __init__(self, manifest_path: Path):
         self.manifest_path = manifest_path
         self.manifest = self._load_manifest()
@@ -88,11 +121,67 @@ class Plugin(ABC):
         if not state_class:
             raise ValueError(f"State {state_name} not found in plugin {self.manifest.name}")
         
+        if not inspect.iscoroutinefunction(state_class.execute):
+            # Blocking state: stay synchronous so the agent offloads it
+            def blocking_state_function(context: Context) -> StateResult:
+                state = state_class(config)
+                state.validate_inputs(context)
+                result = state.execute(context)
+                state.validate_outputs(context)
+                return result
+            
+            return blocking_state_function
+        
         async def state_function(context: Context) -> StateResult:
             state = state_class(config)
             state.validate_inputs(context)
-            result = await state.execute(context)
+            if state.coalescible():
+                result = await self._execute_coalesced(state_name, state, context)
+            else:
+                result = await state.execute(context)
             state.validate_outputs(context)
             return result
         
-        return state_function
\ No newline at end of file
+        return state_function
+    
+    async def _execute_coalesced(
+        self,
+        state_name: str,
+        state: PluginState,
+        context: Context
+    ) -> StateResult:
+        """
+        Run a state through the single-flight layer, keyed by plugin, state
+        type, config and the values of its singleflight_inputs. The shared
+        run reads only those inputs, so no caller's other variables reach
+        it; its variables and outputs are then copied into every caller's
+        context.
+        """
+        shared_state = context.shared_state
+        inputs = {
+            key: shared_state[key]
+            for key in state.singleflight_inputs if key in shared_state
+        }
+        try:
+            key = config_key(self.manifest.name, state_name, state.config, inputs)
+        except UncacheableError:
+            return await state.execute(context)
+        
+        async def execute():
+            scratch = Context(ChainMap({}, inputs), cache_ttl=context.cache_ttl)
+            result = await state.execute(scratch)
+            overlay = scratch.shared_state.maps[0]
+            writes = {
+                key: overlay[key]
+                for key in scratch.get_written_keys()
+                if key in overlay
+            }
+            return result, writes, dict(scratch._state_data)
+        
+        result, writes, state_data = await self.singleflight.do(
+            key,
+            execute,
+            ttl=state.config.get("singleflight_ttl", state.singleflight_ttl)
+        )
+        context.merge_writes(deepcopy(writes), deepcopy(state_data))
+        return result
\ No newline at end of file
@@ -17,7 +17,12 @@ from core.agent.state import StateResult
 
 
 class GmailBaseState(PluginState):
-    """Base state for Gmail operations."""
+    """
+    Base state for Gmail operations.
+
+    googleapiclient is blocking, so execute() is synchronous and runs on the
+    agent's thread pool.
+    """
     
     def _get_service(self, credentials: Dict[str, Any]):
         """Create Gmail service instance."""
@@ -35,7 +40,7 @@ class GmailBaseState(PluginState):
 class SendEmailState(GmailBaseState):
     """Send an email via Gmail."""
     
-    async def execute(self, context: Context) -> StateResult:
+    def execute(self, context: Context) -> StateResult:
         """Send email."""
         # Get configuration
         to_addresses = self.config["to"]
@@ -116,7 +121,7 @@ class SendEmailState(GmailBaseState):
 class ReadEmailsState(GmailBaseState):
     """Read emails from Gmail."""
     
-    async def execute(self, context: Context) -> StateResult:
+    def execute(self, context: Context) -> StateResult:
         """Read emails."""
         # Get configuration
         query = self.config.get("query", "is:unread")
@@ -217,7 +222,7 @@ class ReadEmailsState(GmailBaseState):
 class SearchEmailsState(GmailBaseState):
     """Search emails in Gmail."""
     
-    async def execute(self, context: Context) -> StateResult:
+    def execute(self, context: Context) -> StateResult:
         """Search emails."""
         # Get configuration
         query = self.config["query"]
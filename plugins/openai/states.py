@@ -75,6 +75,11 @@ class ChatCompletionState(PluginState):
 class EmbeddingsState(PluginState):
     """Generate embeddings using OpenAI models."""
     
+    # Embeddings depend only on model, input and the API key
+    singleflight = True
+    singleflight_ttl = 5.0
+    singleflight_inputs = ("secret_openai_api_key",)
+    
     async def execute(self, context: Context) -> StateResult:
         """Generate embeddings."""
         # Get configuration
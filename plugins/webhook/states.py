@@ -16,6 +16,17 @@ from core.agent.state import StateResult
 class HTTPRequestState(PluginState):
     """Make HTTP requests."""
     
+    def coalescible(self) -> bool:
+        """
+        Identical concurrent reads share one request when the config opts
+        in ("singleflight", optionally "singleflight_ttl"); only safe
+        (read-only) methods are coalesced.
+        """
+        return (
+            self.config.get("method", "GET") in ("GET", "HEAD") and
+            super().coalescible()
+        )
+    
     async def execute(self, context: Context) -> StateResult:
         """Execute HTTP request."""
         url = self.config["url"]
@@ -0,0 +1,87 @@
+import pytest
+
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import StateSpec
+
+
+def _noop(context):
+    return None
+
+
+def _specs(count):
+    # A layered graph: every state depends on the two before it
+    return [
+        StateSpec(
+            f"s{i}",
+            _noop,
+            {f"s{j}": DependencyType.REQUIRED for j in (i - 1, i - 2) if j >= 0}
+        )
+        for i in range(count)
+    ]
+
+
+def _indexes(agent):
+    return (
+        {name: sorted(entry[0] for entry in entries)
+         for name, entries in agent._dependents.items()},
+        dict(agent._unmet_groups),
+        sorted(entry.state_name for entry in agent.priority_queue),
+    )
+
+
+def test_bulk_load_matches_one_by_one():
+    bulk = Agent("bulk")
+    bulk.add_states(_specs(50))
+
+    single = Agent("single")
+    for spec in _specs(50):
+        single.add_state(spec.name, spec.func, dependencies=spec.dependencies)
+
+    assert _indexes(bulk) == _indexes(single)
+    assert list(bulk.state_metadata) == list(single.state_metadata)
+
+
+def test_whole_batch_is_validated_before_anything_is_added():
+    agent = Agent("invalid")
+    with pytest.raises(ValueError) as error:
+        agent.add_states([
+            {"name": "a", "func": _noop},
+            {"name": "a", "func": _noop},
+            {"name": "b", "func": _noop, "dependencies": {"missing": "required"}},
+            {"name": "c", "func": _noop, "dependencies": {"a": 42}},
+        ])
+
+    message = str(error.value)
+    assert "'a' is defined more than once" in message
+    assert "unknown state 'missing'" in message
+    assert "invalid dependency spec for 'a'" in message
+    assert not agent.states and not agent.priority_queue
+
+
+def test_batches_can_depend_on_existing_states():
+    agent = Agent("extend")
+    agent.add_state("root", _noop)
+    agent.add_states([
+        {"name": "leaf", "func": _noop,
+         "dependencies": {"root": DependencyType.REQUIRED}},
+        StateSpec("other", _noop),
+    ])
+
+    assert sorted(entry.state_name for entry in agent.priority_queue) == [
+        "other", "root"
+    ]
+    assert [entry[0] for entry in agent._dependents["root"]] == ["leaf"]
+    assert agent._unmet_groups["leaf"] == 1
+
+
+def test_large_batches_heapify_the_initial_states():
+    agent = Agent("large")
+    specs = _specs(20_000) + [StateSpec(f"root{i}", _noop) for i in range(1_000)]
+    agent.add_states(specs)
+
+    assert len(agent.state_metadata) == 21_000
+    assert len(agent.priority_queue) == 1_001
+    # One heap item per queued state: nothing was pushed twice
+    assert len(agent.priority_queue._heap) == 1_001
+    assert agent._unmet_groups["s19999"] == 1
@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.blobs import BlobHandle, BlobStore
+from core.agent.checkpoint import AgentCheckpoint
+from core.agent.dependencies import DependencyType
+
+
+def test_checkpoint_taken_during_a_run_keeps_its_blobs(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1024)
+    agent = Agent("blobs", blob_store=store)
+    checkpoints = []
+
+    async def write(context):
+        context.set_variable("big", b"x" * 4096)
+
+    async def checkpoint(context):
+        checkpoints.append(agent.create_checkpoint(full=True))
+
+    async def drop(context):
+        context.set_variable("big", None)
+
+    agent.add_state("write", write)
+    agent.add_state(
+        "checkpoint", checkpoint, dependencies={"write": DependencyType.REQUIRED}
+    )
+    agent.add_state(
+        "drop", drop, dependencies={"checkpoint": DependencyType.REQUIRED}
+    )
+    asyncio.run(agent.run(timeout=10))
+
+    assert agent.shared_state["big"] is None
+    assert checkpoints[0].shared_state["big"].load() == b"x" * 4096
+
+
+def test_released_checkpoints_free_their_blobs(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1024)
+    agent = Agent("blobs", blob_store=store)
+
+    async def write(context):
+        context.set_variable("big", b"x" * 4096)
+
+    agent.add_state("write", write)
+    asyncio.run(agent.run(timeout=10))
+    handle = agent.shared_state["big"]
+    assert type(handle) is BlobHandle
+
+    base = agent.create_checkpoint(full=True)
+    agent.shared_state["big"] = None
+    delta = agent.create_checkpoint()
+    agent._release_blobs()
+
+    assert os.path.exists(handle.path)
+    restored = AgentCheckpoint.from_chain(base, [delta])
+    assert restored.shared_state["big"] is None
+    assert base.shared_state["big"].load() == b"x" * 4096
+
+    assert agent.release_checkpoints([base.checkpoint_id, delta.checkpoint_id]) == 1
+    assert not os.path.exists(handle.path)
+
+
+def test_discarded_isolated_writes_release_their_blobs(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1024)
+    agent = Agent("blobs", blob_store=store, snapshot_isolation=True)
+
+    async def fail(context):
+        context.set_variable("big", b"y" * 4096)
+        assert store.stats()["blobs"] == 1
+        raise RuntimeError("boom")
+
+    agent.add_state("fail", fail, max_retries=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.run(timeout=10))
+
+    assert "big" not in agent.shared_state
+    assert store.stats()["blobs"] == 0
+    assert store.stats()["deletes"] == 1
@@ -0,0 +1,134 @@
+import asyncio
+
+from core.agent import cache as cache_module
+from core.agent.base import Agent
+from core.agent.cache import TTLCache
+from core.agent.context import Context
+from core.agent.dependencies import DependencyType
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = TTLCache(default_ttl=10.0)
+
+    cache.set("short", 1)
+    cache.set("long", 2, ttl=60.0)
+    cache.set("forever", 3, ttl=None)
+    assert cache.get("short") == 1
+
+    clock.now = 110.0
+    assert cache.get("short") is None
+    assert "long" in cache and "forever" in cache
+
+    clock.now = 1000.0
+    assert cache.purge_expired() == 1
+    assert cache.get("forever") == 3
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["expirations"] == 2
+    assert stats["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = TTLCache(max_entries=3)
+    for key in "abc":
+        cache.set(key, key)
+
+    # A read makes "a" the most recently used entry
+    assert cache.get("a") == "a"
+    cache.set("d", "d")
+
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bytes_are_bounded_and_accounted():
+    cache = TTLCache(max_bytes=100, sizeof=len)
+
+    assert cache.set("a", "x" * 40)
+    assert cache.set("b", "x" * 40)
+    assert cache.stats()["bytes"] == 80
+
+    # Over the budget: the least recently used entry makes room
+    assert cache.set("c", "x" * 40)
+    assert "a" not in cache
+    assert cache.stats()["bytes"] == 80
+
+    # Larger than the whole budget: refused, nothing is evicted
+    assert not cache.set("huge", "x" * 101)
+    assert len(cache) == 2
+
+    # An explicit size overrides the measured one
+    assert cache.set("b", "tiny", size=60)
+    assert cache.stats()["bytes"] == 100
+
+    assert cache.delete("b")
+    assert cache.stats()["bytes"] == 40
+
+
+def test_context_without_a_cache_gets_a_private_one():
+    first, second = Context({}), Context({})
+    first.set_cached("key", "value")
+
+    assert first.get_cached("key") == "value"
+    assert second.get_cached("key") is None
+
+
+def test_states_share_the_agent_cache():
+    lookups = []
+
+    def expensive(context):
+        value = context.get_cached("lookup")
+        if value is None:
+            lookups.append(context)
+            value = "result"
+            context.set_cached("lookup", value)
+        context.set_variable(f"seen_{len(lookups)}", value)
+
+    agent = Agent("cached")
+    agent.add_state("first", expensive)
+    agent.add_state(
+        "second", expensive, dependencies={"first": DependencyType.REQUIRED}
+    )
+    asyncio.run(agent.run(timeout=5))
+
+    assert len(lookups) == 1
+    stats = agent.get_context_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_agents_given_one_cache_share_entries_across_runs():
+    shared = TTLCache(max_entries=16)
+
+    def producer(context):
+        context.set_cached("token", "abc", ttl=60)
+
+    def consumer(context):
+        context.set_variable("token", context.get_cached("token"))
+
+    first = Agent("producer", context_cache=shared)
+    first.add_state("produce", producer)
+    second = Agent("consumer", context_cache=shared)
+    second.add_state("consume", consumer)
+
+    async def runs():
+        await first.run(timeout=5)
+        await second.run(timeout=5)
+
+    asyncio.run(runs())
+
+    assert second.shared_state["token"] == "abc"
+    assert first.get_context_cache_stats() == second.get_context_cache_stats()
+    assert shared.stats()["hits"] == 1
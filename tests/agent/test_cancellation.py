@@ -0,0 +1,121 @@
+import asyncio
+
+from core.agent.base import Agent
+from core.agent.state import StateStatus
+
+
+async def _start(agent, started, count):
+    """Run the agent until ``count`` states have signalled they started."""
+    run = asyncio.create_task(agent.run(timeout=10))
+    while len(started) < count:
+        await asyncio.sleep(0)
+    return run
+
+
+def test_cancel_state_releases_resources_and_scratch_at_once():
+    agent = Agent("cancel")
+    started = []
+    contexts = {}
+    outcome = []
+
+    async def blocked(context):
+        contexts["blocked"] = context
+        context.set_state("scratch", "big")
+        started.append("blocked")
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            outcome.append("cancelled")
+            raise
+
+    agent.add_state("blocked", blocked)
+
+    async def scenario():
+        run = await _start(agent, started, 1)
+        assert "blocked" in agent.resource_pool.get_state_allocations()
+
+        agent.cancel_state("blocked")
+        await run
+        return agent.resource_pool.get_state_allocations()
+
+    allocations = asyncio.run(scenario())
+    assert outcome == ["cancelled"]
+    assert allocations == {}
+    assert contexts["blocked"].get_keys() == set()
+    assert agent.state_metadata["blocked"].status == StateStatus.CANCELLED
+    assert "blocked" not in agent.completed_states
+
+
+def test_grace_period_lets_cooperative_states_stop_themselves():
+    agent = Agent("grace")
+    started = []
+    outcome = {}
+
+    async def cooperative(context):
+        started.append("cooperative")
+        while not context.is_cancelled():
+            await asyncio.sleep(0)
+        outcome["cooperative"] = "stopped"
+
+    async def stubborn(context):
+        started.append("stubborn")
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            outcome["stubborn"] = "cancelled"
+            raise
+
+    agent.add_state("cooperative", cooperative)
+    agent.add_state("stubborn", stubborn)
+
+    async def scenario():
+        run = await _start(agent, started, 2)
+        agent.cancel_state("cooperative", grace_period=60.0)
+        agent.cancel_state("stubborn", grace_period=0.01)
+        await run
+
+    asyncio.run(scenario())
+    # Stopping early on request is not a completion
+    assert outcome == {"cooperative": "stopped", "stubborn": "cancelled"}
+    assert not agent.completed_states
+    assert agent.resource_pool.get_state_allocations() == {}
+
+
+def test_cancel_all_frees_capacity_for_new_work():
+    agent = Agent("all", max_concurrent=3)
+    started = []
+
+    async def blocked(context):
+        started.append(1)
+        await asyncio.Event().wait()
+
+    for i in range(3):
+        agent.add_state(f"s{i}", blocked)
+    agent.add_state("queued", blocked)
+
+    async def scenario():
+        run = await _start(agent, started, 3)
+        await agent.cancel_all()
+        allocations = agent.resource_pool.get_state_allocations()
+        await run
+        return allocations
+
+    allocations = asyncio.run(scenario())
+    assert allocations == {}
+    assert not agent._state_tasks and not agent.priority_queue
+    assert len(started) == 3
+    assert all(
+        metadata.status == StateStatus.CANCELLED
+        for name, metadata in agent.state_metadata.items() if name != "queued"
+    )
+
+
+def test_cancelling_a_queued_state_drops_it_and_its_retry():
+    agent = Agent("pending")
+    agent.add_state("later", lambda context: None)
+    agent._schedule_retry("later", 3600.0)
+
+    agent.cancel_state("later")
+    assert "later" not in agent.priority_queue
+    assert agent.get_retry_stats()["delayed"] == 0
+    assert agent.state_metadata["later"].status == StateStatus.CANCELLED
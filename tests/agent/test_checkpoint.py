@@ -0,0 +1,66 @@
+from core.agent.base import Agent
+from core.agent.checkpoint import AgentCheckpoint
+
+
+def test_checkpoint_does_not_alias_mutable_values():
+    agent = Agent("checkpoints")
+    agent.shared_state["items"] = [1]
+
+    full = agent.create_checkpoint(full=True)
+    agent.shared_state["items"].append(2)
+    agent.shared_state["items"] = agent.shared_state["items"]
+    delta = agent.create_checkpoint()
+    agent.shared_state["items"].append(3)
+
+    assert full.shared_state["items"] == [1]
+    assert delta.shared_state["items"] == [1, 2]
+
+
+def test_delta_chain_sees_in_place_mutations():
+    agent = Agent("checkpoints")
+    agent.shared_state["items"] = [1]
+    agent.shared_state["name"] = "a"
+
+    base = agent.create_checkpoint(full=True)
+    agent.shared_state["items"].append(2)
+    delta = agent.create_checkpoint()
+
+    assert delta.is_delta
+    assert set(delta.shared_state) == {"items"}
+    restored = AgentCheckpoint.from_chain(base, [delta])
+    assert restored.shared_state == {"items": [1, 2], "name": "a"}
+
+
+def test_delta_leaves_out_unchanged_mutable_values():
+    agent = Agent("checkpoints")
+    agent.shared_state["items"] = [1]
+    agent.shared_state["config"] = {"retries": 3}
+
+    agent.create_checkpoint(full=True)
+    first = agent.create_checkpoint()
+    agent.shared_state["config"]["retries"] = 4
+    second = agent.create_checkpoint()
+
+    assert first.shared_state == {}
+    assert second.shared_state == {"config": {"retries": 4}}
+
+
+def test_delta_stores_the_queue_only_when_it_changed():
+    async def noop(context):
+        return None
+
+    agent = Agent("checkpoints")
+    agent.add_state("a", noop)
+
+    base = agent.create_checkpoint(full=True)
+    unchanged = agent.create_checkpoint()
+    agent.add_state("b", noop)
+    changed = agent.create_checkpoint()
+
+    assert unchanged.priority_queue is None
+    assert [entry.state_name for entry in changed.priority_queue] == ["a", "b"]
+    restored = AgentCheckpoint.from_chain(base, [unchanged, changed])
+    assert [entry.state_name for entry in restored.priority_queue] == ["a", "b"]
+    assert AgentCheckpoint.from_chain(base, [unchanged]).priority_queue == (
+        base.priority_queue
+    )
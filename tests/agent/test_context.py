@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.context import Context, TypeLockIndex
+from core.agent.dependencies import DependencyType
+
+
+class _Unscannable(dict):
+    """shared_state whose keys may not be walked."""
+
+    def __iter__(self):
+        raise AssertionError("shared_state was scanned")
+
+    def keys(self):
+        raise AssertionError("shared_state was scanned")
+
+    def items(self):
+        raise AssertionError("shared_state was scanned")
+
+
+def test_construction_does_not_scan_shared_state():
+    shared = _Unscannable({f"key_{i}": i for i in range(50_000)})
+    shared["_meta_typed_key_0"] = "builtins.int"
+    locks = TypeLockIndex()
+
+    context = Context(shared, type_locks=locks)
+    assert len(locks) == 0
+
+    # The persisted lock is picked up on first use
+    with pytest.raises(TypeError, match="holds int"):
+        context.set_typed_variable("key_0", "text")
+    assert locks.typed == {"key_0": int}
+
+
+def test_contexts_share_one_index():
+    shared = {}
+    locks = TypeLockIndex()
+
+    Context(shared, type_locks=locks).set_typed_variable("count", 1)
+    assert locks.typed == {"count": int}
+    assert shared["_meta_typed_count"] == "builtins.int"
+
+    other = Context(shared, type_locks=locks)
+    other.set_typed_variable("count", 2)
+    with pytest.raises(TypeError):
+        other.set_typed_variable("count", "two")
+    assert other.get_typed_variable("count", int) == 2
+
+
+def test_lock_without_its_metadata_key_is_ignored():
+    shared = {}
+    locks = TypeLockIndex()
+    Context(shared, type_locks=locks).set_typed_variable("value", 1)
+
+    # The key left shared_state, e.g. in a discarded overlay or on expiry
+    del shared["_meta_typed_value"], shared["value"]
+
+    context = Context(shared, type_locks=locks)
+    context.set_typed_variable("value", "text")
+    assert locks.typed == {"value": str}
+
+    locks.forget("value")
+    assert len(locks) == 0
+
+
+def test_validated_locks_are_indexed():
+    pydantic = pytest.importorskip("pydantic")
+
+    class User(pydantic.BaseModel):
+        name: str
+
+    class Order(pydantic.BaseModel):
+        total: int
+
+    shared = {}
+    locks = TypeLockIndex()
+    Context(shared, type_locks=locks).set_validated_data("user", User(name="a"))
+    assert locks.validated == {"user": User}
+
+    context = Context(shared, type_locks=locks)
+    with pytest.raises(TypeError, match="already stores User"):
+        context.set_validated_data("user", Order(total=1))
+    assert context.get_validated_data("user", User).name == "a"
+
+
+def test_agent_states_share_type_locks():
+    def first(context):
+        context.set_typed_variable("total", 1)
+
+    def second(context):
+        context.set_typed_variable("total", "not a number")
+
+    agent = Agent("locks")
+    agent.add_state("first", first)
+    agent.add_state(
+        "second", second, max_retries=1,
+        dependencies={"first": DependencyType.REQUIRED}
+    )
+
+    with pytest.raises(TypeError, match="holds int"):
+        asyncio.run(agent.run(timeout=5))
+    assert agent._type_locks.typed == {"total": int}
+
+    # Replacing shared_state drops the index along with the locks
+    agent.shared_state = {}
+    assert len(agent._type_locks) == 0
@@ -0,0 +1,131 @@
+import asyncio
+
+from core.agent.base import Agent, RetryPolicy
+from core.agent.dependencies import DependencyConfig, DependencyType
+
+
+def _noop(context):
+    pass
+
+
+def _agent(name):
+    agent = Agent(name)
+    agent.add_state("a", _noop)
+    agent.add_state("b", _noop, dependencies={"a": DependencyType.REQUIRED})
+    agent.add_state("c", _noop, dependencies={"a": DependencyType.REQUIRED})
+    return agent
+
+
+def test_bare_dependencies_get_a_config_per_state():
+    first = _agent("first")
+    second = _agent("second")
+
+    b_config = first.state_metadata["b"].dependencies["a"]
+    c_config = first.state_metadata["c"].dependencies["a"]
+    assert b_config == c_config == DependencyConfig(type=DependencyType.REQUIRED)
+
+    b_config.timeout = 5.0
+    assert c_config.timeout is None
+    assert second.state_metadata["b"].dependencies["a"].timeout is None
+
+
+def _complete(agent, name):
+    agent.completed_states.add(name)
+    asyncio.run(agent._resolve_dependencies(name))
+
+
+def _grouped(dependencies):
+    agent = Agent("groups")
+    for name in ("a", "b", "c"):
+        agent.add_state(name, _noop)
+    agent.add_state("d", _noop, dependencies=dependencies)
+    return agent
+
+
+def test_required_group_is_met_once_every_member_completes():
+    agent = _grouped({"a": DependencyType.REQUIRED, "b": DependencyType.REQUIRED})
+    assert agent._unmet_groups["d"] == 1
+
+    _complete(agent, "a")
+    assert agent._unmet_groups["d"] == 1
+    # Completing a member twice is counted once
+    _complete(agent, "a")
+    _complete(agent, "b")
+    assert agent._unmet_groups["d"] == 0
+    assert "d" in agent.priority_queue
+
+
+def test_or_and_xor_groups():
+    agent = _grouped({"a": DependencyType.OR, "b": DependencyType.OR})
+    _complete(agent, "b")
+    assert agent._unmet_groups["d"] == 0
+
+    agent = _grouped({"a": DependencyType.XOR, "b": DependencyType.XOR})
+    _complete(agent, "a")
+    assert agent._unmet_groups["d"] == 0
+    # A second satisfied member breaks an exclusive group again
+    _complete(agent, "b")
+    assert agent._unmet_groups["d"] == 1
+
+
+def test_each_dependency_type_is_its_own_group():
+    agent = _grouped({
+        "a": DependencyType.REQUIRED,
+        "b": DependencyType.OR,
+        "c": DependencyType.OR,
+    })
+    assert agent._unmet_groups["d"] == 2
+
+    _complete(agent, "c")
+    assert agent._unmet_groups["d"] == 1
+    _complete(agent, "a")
+    assert agent._unmet_groups["d"] == 0
+
+
+def test_optional_dependencies_are_not_counted():
+    agent = _grouped({"a": DependencyType.OPTIONAL})
+    assert agent._unmet_groups["d"] == 0
+
+    agent._running_states.add("a")
+    assert not asyncio.run(agent._can_run("d"))
+    agent._running_states.discard("a")
+    assert asyncio.run(agent._can_run("d"))
+
+
+def test_failed_dependency_resets_its_groups():
+    agent = _grouped({"a": DependencyType.REQUIRED, "b": DependencyType.REQUIRED})
+    _complete(agent, "a")
+    _complete(agent, "b")
+    assert agent._unmet_groups["d"] == 0
+
+    asyncio.run(agent._handle_failure("a", RuntimeError("retry")))
+    assert agent._unmet_groups["d"] == 1
+    assert agent.state_metadata["d"].satisfied_dependencies == {"b"}
+    assert not asyncio.run(agent._can_run("d"))
+
+    _complete(agent, "a")
+    assert agent._unmet_groups["d"] == 0
+
+
+def test_dependent_runs_once_after_a_retried_dependency_succeeds():
+    agent = Agent("retry")
+    attempts = []
+    ran = []
+
+    async def flaky(context):
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise RuntimeError("transient")
+
+    async def dependent(context):
+        ran.append(len(attempts))
+
+    agent.add_state(
+        "a", flaky, max_retries=3,
+        retry_policy=RetryPolicy(initial_delay=0.0, jitter=False)
+    )
+    agent.add_state("b", dependent, dependencies={"a": DependencyType.REQUIRED})
+
+    asyncio.run(agent.run(timeout=5))
+    assert ran == [3]
+    assert agent._unmet_groups["b"] == 0
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.context import Context
+from core.agent.hedging import HedgePolicy, HedgeStats
+
+
+def _ticks():
+    """Fake clock: every reading is one second after the previous one."""
+    return itertools.count().__next__
+
+
+def _agent(func, policy, durations):
+    agent = Agent("hedging")
+    agent.add_state("lookup", func, hedge=policy)
+    stats = agent._hedge_stats["lookup"] = HedgeStats(policy.history, clock=_ticks())
+    for duration in durations:
+        stats.record(duration)
+    return agent, stats
+
+
+def _run(agent, context):
+    metadata = agent.state_metadata["lookup"]
+    return asyncio.run(agent._execute_hedged("lookup", metadata, context))
+
+
+def test_hedge_delay_is_a_percentile_of_recent_durations():
+    policy = HedgePolicy(percentile=0.8, min_samples=5, history=10)
+    stats = HedgeStats(policy.history)
+
+    for duration in range(1, 5):
+        stats.record(float(duration))
+    assert stats.hedge_delay(policy) is None
+
+    for duration in range(5, 21):
+        stats.record(float(duration))
+    # Only the last 10 durations (11..20) count
+    assert list(stats.durations) == [float(d) for d in range(11, 21)]
+    assert stats.hedge_delay(policy) == 18.0
+
+
+def test_first_attempts_are_timed_with_the_stats_clock():
+    async def lookup(context):
+        return "done"
+
+    policy = HedgePolicy(min_samples=20, history=20)
+    agent, stats = _agent(lookup, policy, [])
+
+    _run(agent, Context({}))
+    # Too little history: one attempt, timed between two clock readings
+    assert list(stats.durations) == [1]
+    assert stats.hedged == 0
+
+
+def test_fast_attempt_is_not_hedged():
+    calls = []
+
+    async def lookup(context):
+        calls.append(context)
+        return "primary"
+
+    policy = HedgePolicy(min_samples=2, history=4)
+    agent, stats = _agent(lookup, policy, [3600.0] * 4)
+
+    assert _run(agent, Context({})) == "primary"
+    assert len(calls) == 1
+    assert stats.to_dict()["hedged"] == 0
+
+
+def test_slow_attempt_is_hedged_and_only_the_winner_writes():
+    never = asyncio.Event()
+    started = []
+
+    async def lookup(context):
+        started.append(context)
+        if len(started) == 1:
+            context.set_variable("winner", "primary")
+            # Never finishes: only the hedge can complete the call
+            await never.wait()
+        context.set_variable("winner", "hedge")
+        return "hedge"
+
+    policy = HedgePolicy(min_samples=2, history=4)
+    agent, stats = _agent(lookup, policy, [0.0] * 4)
+    context = Context({})
+
+    assert _run(agent, context) == "hedge"
+    assert context.get_variable("winner") == "hedge"
+    assert len(started) == 2
+
+    counters = stats.to_dict()
+    assert counters["hedged"] == 1 and counters["hedge_wins"] == 1
+    # The cancelled primary is recorded as a lower bound, by the fake clock
+    assert counters["censored"] == 1
+    assert list(stats.durations)[-1] == 1
+
+
+def test_failed_hedged_call_raises_the_primary_error():
+    hedge_failed = asyncio.Event()
+    started = []
+
+    async def lookup(context):
+        started.append(context)
+        if len(started) == 1:
+            await hedge_failed.wait()
+            raise ValueError("primary")
+        hedge_failed.set()
+        raise KeyError("hedge")
+
+    policy = HedgePolicy(min_samples=2, history=4)
+    agent, stats = _agent(lookup, policy, [0.0] * 4)
+
+    with pytest.raises(ValueError, match="primary"):
+        _run(agent, Context({}))
+    assert stats.hedged == 1 and stats.hedge_wins == 0
@@ -0,0 +1,114 @@
+import asyncio
+
+from core.agent import base
+from core.agent.base import Agent
+from core.agent.dependencies import (
+    DependencyConfig,
+    DependencyLifecycle,
+    DependencyType,
+)
+from core.agent.state import StateStatus
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def _noop(context):
+    return None
+
+
+def _complete(agent, name):
+    agent.completed_states.add(name)
+    agent.state_metadata[name].status = StateStatus.COMPLETED
+    agent.state_metadata[name].last_execution = base.time.time()
+    asyncio.run(agent._resolve_dependencies(name))
+
+
+def test_temporary_dependency_lapses_when_its_expiry_fires(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(base, "time", clock)
+
+    agent = Agent("temporary")
+    agent.add_state("a", _noop)
+    agent.add_state("b", _noop, dependencies={"a": DependencyConfig(
+        type=DependencyType.REQUIRED,
+        lifecycle=DependencyLifecycle.TEMPORARY,
+        timeout=30.0
+    )})
+
+    _complete(agent, "a")
+    assert agent._unmet_groups["b"] == 0
+    assert agent._timers.due(("expiry", "b", "a")) == 130.0
+
+    clock.now = 129.0
+    agent._fire_timers()
+    assert "a" in agent.state_metadata["b"].satisfied_dependencies
+
+    clock.now = 130.0
+    agent._fire_timers()
+    assert agent._unmet_groups["b"] == 1
+    assert "a" not in agent.state_metadata["b"].satisfied_dependencies
+    assert agent._timers.count("expiry") == 0
+
+
+def test_periodic_state_is_rearmed_when_its_interval_elapses(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(base, "time", clock)
+
+    agent = Agent("periodic")
+    agent.add_state("source", _noop)
+    agent.add_state("poll", _noop, dependencies={"source": DependencyConfig(
+        type=DependencyType.REQUIRED,
+        lifecycle=DependencyLifecycle.PERIODIC,
+        interval=60.0
+    )})
+
+    agent.priority_queue.clear()
+    _complete(agent, "source")
+    agent.priority_queue.clear()
+    _complete(agent, "poll")
+    agent._schedule_periodic_execution("poll", agent.state_metadata["poll"])
+
+    # Idle until the interval: the only work left is two timers
+    assert agent._timers.next_due() == 160.0
+    assert agent._has_scheduled_runs()
+
+    clock.now = 159.0
+    agent._fire_timers()
+    assert not agent.priority_queue
+
+    clock.now = 160.0
+    agent._fire_timers()
+    # The lapsed dependency runs again before the periodic state can
+    assert sorted(entry.state_name for entry in agent.priority_queue) == [
+        "poll", "source"
+    ]
+    assert agent._unmet_groups["poll"] == 1
+    assert agent.state_metadata["poll"].attempts == 0
+
+
+def test_cancelled_periodic_state_is_not_rearmed(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(base, "time", clock)
+
+    agent = Agent("cancelled")
+    agent.add_state("source", _noop)
+    agent.add_state("poll", _noop, dependencies={"source": DependencyConfig(
+        type=DependencyType.REQUIRED,
+        lifecycle=DependencyLifecycle.PERIODIC,
+        interval=60.0
+    )})
+    _complete(agent, "source")
+    _complete(agent, "poll")
+    agent._schedule_periodic_execution("poll", agent.state_metadata["poll"])
+
+    agent.cancel_state("poll")
+    assert not agent._has_scheduled_runs()
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from core.agent.base import Agent, RetryPolicy
+from core.agent.map import MapStateError
+from core.storage.codec import CheckpointCodec
+
+
+def _flaky_map_agent(name, **options):
+    agent = Agent(
+        name, retry_policy=RetryPolicy(initial_delay=0.001, jitter=False), **options
+    )
+    agent.shared_state["items"] = list(range(6))
+    calls = []
+
+    async def double(item, context):
+        calls.append(item)
+        if item == 3 and calls.count(3) == 1:
+            raise RuntimeError("transient")
+        return item * 2
+
+    agent.add_map_state(
+        "double", double, "items", reducer=lambda total, value: (total or 0) + value
+    )
+    return agent, calls
+
+
+@pytest.mark.parametrize("isolation", [False, True])
+def test_retry_reruns_only_failed_items(isolation):
+    agent, calls = _flaky_map_agent("partial", snapshot_isolation=isolation)
+    asyncio.run(agent.run(timeout=10))
+
+    assert sorted(calls) == [0, 1, 2, 3, 3, 4, 5]
+    assert agent.shared_state["double_result"] == 30
+
+
+def _sum(total, value):
+    return (total or 0) + value
+
+
+def _failing_map_agent(name, failing, calls):
+    agent = Agent(name)
+    agent.shared_state["items"] = list(range(6))
+
+    async def double(item, context):
+        calls.append(item)
+        if item in failing:
+            raise RuntimeError("down")
+        return item * 2
+
+    agent.add_map_state("double", double, "items", reducer=_sum, max_retries=1)
+    return agent
+
+
+def test_progress_resumes_from_a_checkpoint():
+    calls = []
+    agent = _failing_map_agent("resume", {3}, calls)
+    with pytest.raises(MapStateError):
+        asyncio.run(agent.run(timeout=10))
+
+    progress = agent.shared_state["_map_double"]
+    assert progress["processed"] == 5 and progress["accumulator"] == 24
+    assert [entry["item"] for entry in progress["failed"]] == [3]
+
+    codec = CheckpointCodec()
+    checkpoint = codec.decode(codec.encode(agent.create_checkpoint(full=True)))
+
+    calls = []
+    restored = _failing_map_agent("resume", set(), calls)
+    asyncio.run(restored.restore_from_checkpoint(checkpoint))
+    restored._rearm("double", restored.state_metadata["double"])
+    asyncio.run(restored.run(timeout=10))
+
+    # Only the failed item runs again, on top of the restored accumulator
+    assert calls == [3]
+    assert restored.shared_state["double_result"] == 30
+    assert restored.shared_state["_map_double"]["failed"] == []
+
+
+def test_allowed_failures_are_recorded_without_failing_the_state():
+    calls = []
+    agent = Agent("allowed")
+    agent.shared_state["items"] = list(range(4))
+
+    async def double(item, context):
+        calls.append(item)
+        if item % 2:
+            raise ValueError(f"odd {item}")
+        return item * 2
+
+    agent.add_map_state(
+        "double", double, "items", reducer=_sum, allow_failures=True
+    )
+    asyncio.run(agent.run(timeout=10))
+
+    assert agent.shared_state["double_result"] == 4
+    failed = agent.shared_state["_map_double"]["failed"]
+    assert sorted(entry["item"] for entry in failed) == [1, 3]
+    assert failed[0]["error"].startswith("ValueError: odd")
+
+
+def test_concurrency_bound_and_async_sources():
+    agent = Agent("bounded")
+    running = set()
+    peak = 0
+
+    async def source():
+        for item in range(10):
+            yield item
+
+    async def visit(item, context):
+        nonlocal peak
+        running.add(item)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0)
+        running.discard(item)
+        return 1
+
+    agent.add_map_state(
+        "count", visit, lambda context: source(), reducer=_sum, concurrency=3
+    )
+    asyncio.run(agent.run(timeout=10))
+
+    assert peak == 3
+    assert agent.shared_state["count_result"] == 10
@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import threading
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.memo import CachePolicy, UncacheableError, cache_key, function_fingerprint
+
+
+def _multiplier(factor):
+    async def multiply(context):
+        context.set_variable(f"out_{factor}", context.get_variable("x") * factor)
+    return multiply
+
+
+async def _scale(context, factor=1):
+    context.set_variable(f"scaled_{factor}", context.get_variable("x") * factor)
+
+
+def test_factory_states_do_not_share_results():
+    agent = Agent("memo")
+    agent.shared_state["x"] = 3
+    policy = CachePolicy(inputs=("x",))
+    agent.add_state("double", _multiplier(2), cache=policy)
+    agent.add_state("triple", _multiplier(10), cache=policy)
+    agent.add_state("half", functools.partial(_scale, factor=5), cache=policy)
+    agent.add_state("same", functools.partial(_scale, factor=7), cache=policy)
+    asyncio.run(agent.run(timeout=10))
+
+    assert agent.shared_state["out_2"] == 6
+    assert agent.shared_state["out_10"] == 30
+    assert agent.shared_state["scaled_5"] == 15
+    assert agent.shared_state["scaled_7"] == 21
+
+
+def test_cache_key_covers_name_and_bindings():
+    func = _multiplier(2)
+    fingerprint = function_fingerprint(func)
+    state = {"x": 3}
+    key = cache_key("a", fingerprint, func, state)
+
+    assert key == cache_key("a", fingerprint, func, {"x": 3})
+    assert key != cache_key("b", fingerprint, func, state)
+    assert key != cache_key("a", fingerprint, _multiplier(3), state)
+    assert key != cache_key("a", fingerprint, func, {"x": "3"})
+
+
+def test_unhashable_inputs_are_not_cached():
+    func = _multiplier(2)
+    with pytest.raises(UncacheableError):
+        cache_key("a", function_fingerprint(func), func, {"lock": threading.Lock()})
@@ -0,0 +1,112 @@
+import asyncio
+
+from core.agent import base
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.resources.pool import ResourcePool
+from core.resources.requirements import ResourceRequirements
+
+
+def _noop(context):
+    return None
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def test_repeated_runs_reach_a_steady_state():
+    agent = Agent("steady")
+    agent.add_state("a", _noop)
+    agent.add_state("b", _noop, dependencies={"a": DependencyType.REQUIRED})
+    bounded = (
+        "state_metadata", "dependency_index", "queue", "timers",
+        "completion_sets", "contexts", "state_events",
+    )
+
+    async def runs():
+        reports = []
+        for _ in range(30):
+            agent._rearm("a", agent.state_metadata["a"])
+            await agent.run(timeout=5)
+            report = agent.memory_report()
+            reports.append({name: report[name] for name in bounded})
+        return reports
+
+    reports = asyncio.run(runs())
+    assert len(agent.completed_states) == 2
+    assert reports[-1] == reports[9]
+
+
+def test_resource_pool_history_is_a_bounded_ring():
+    pool = ResourcePool(history_limit=5)
+
+    async def churn():
+        for i in range(50):
+            await pool.acquire(f"s{i}", ResourceRequirements())
+            await pool.release(f"s{i}")
+
+    asyncio.run(churn())
+    assert len(pool._usage_history) == 5
+
+
+def test_compact_drops_bookkeeping_of_undefined_states():
+    agent = Agent("compact")
+    agent.add_state("a", _noop)
+    asyncio.run(agent.run(timeout=5))
+
+    agent.completed_states.add("ghost")
+    agent._duration_estimates["ghost"] = 1.0
+    agent.state_event("ghost")
+    agent.compact()
+
+    assert set(agent.completed_states) == {"a"}
+    assert "ghost" not in agent._duration_estimates
+    assert "ghost" not in agent._state_events
+    assert "a" in agent._duration_estimates
+
+
+def test_shared_keys_expire_after_their_ttl(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(base, "time", clock)
+
+    def write(context):
+        context.set_variable("tmp_x", 1)
+        context.set_variable("kept", 2)
+
+    agent = Agent("ttl")
+    agent.expire_shared_keys("tmp_", 10.0)
+    agent.add_state("write", write)
+    asyncio.run(agent.run(timeout=5))
+    assert agent._timers.keys("shared") == [("shared", "tmp_x")]
+
+    clock.now = 109.0
+    agent._fire_timers()
+    assert "tmp_x" in agent.shared_state
+
+    clock.now = 110.0
+    agent._fire_timers()
+    assert "tmp_x" not in agent.shared_state
+    assert agent.shared_state["kept"] == 2
+
+
+def test_memory_report_breaks_down_bytes_per_structure():
+    agent = Agent("report")
+    agent.add_state("a", _noop)
+    before = agent.memory_report()
+
+    agent.shared_state["payload"] = "x" * 100_000
+    after = agent.memory_report()
+
+    assert before["total"] == sum(
+        value for name, value in before.items() if name != "total"
+    )
+    assert after["shared_state"] - before["shared_state"] >= 100_000
+    assert after["state_metadata"] == before["state_metadata"]
@@ -0,0 +1,63 @@
+import pytest
+
+from core.agent.queue import StateQueue
+from core.agent.state import PrioritizedState, StateMetadata, StateStatus
+
+
+def _entry(name, priority, timestamp=0.0):
+    return PrioritizedState(
+        priority, timestamp, name, StateMetadata(status=StateStatus.PENDING)
+    )
+
+
+def _drain(queue):
+    return [queue.pop().state_name for _ in range(len(queue))]
+
+
+def test_pops_by_priority_then_timestamp():
+    queue = StateQueue([_entry("late", 0, 2.0), _entry("high", -1, 5.0)])
+    queue.push(_entry("early", 0, 1.0))
+
+    assert queue.peek().state_name == "high"
+    assert _drain(queue) == ["high", "early", "late"]
+    with pytest.raises(IndexError):
+        queue.pop()
+
+
+def test_push_replaces_the_entry_of_a_queued_state():
+    queue = StateQueue([_entry("a", 0), _entry("b", 1)])
+    queue.push(_entry("b", -1))
+
+    assert len(queue) == 2
+    assert _drain(queue) == ["b", "a"]
+
+
+def test_update_and_remove_skip_stale_items():
+    queue = StateQueue([_entry("a", 0), _entry("b", 1), _entry("c", 2)])
+
+    assert queue.update("c", priority=-1)
+    assert not queue.update("missing", priority=0)
+    assert queue.remove("a").state_name == "a"
+    assert queue.remove("a") is None
+
+    assert "a" not in queue and "c" in queue
+    assert [entry.state_name for entry in queue.entries()] == ["c", "b"]
+    assert _drain(queue) == ["c", "b"]
+
+
+def test_stale_items_are_compacted():
+    queue = StateQueue()
+    for i in range(200):
+        queue.push(_entry("a", -i))
+
+    assert len(queue) == 1
+    assert len(queue._heap) <= 2 * len(queue) + 64
+    assert queue.pop().priority == -199
+
+
+def test_extend_and_custom_key():
+    queue = StateQueue(key=lambda entry: (entry.state_name,))
+    queue.push(_entry("b", 0))
+    queue.extend([_entry("c", -5), _entry("a", 5), _entry("d", 0)])
+
+    assert _drain(queue) == ["a", "b", "c", "d"]
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from core.agent import retry
+from core.agent.base import Agent, RetryPolicy
+from core.agent.retry import RetryBudget
+from core.agent.state import Priority
+from core.resources.requirements import ResourceRequirements
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_backoff_releases_the_slot_and_resources():
+    agent = Agent(
+        "backoff", max_concurrent=1,
+        retry_policy=RetryPolicy(initial_delay=3600.0, jitter=False)
+    )
+    attempts = []
+    seen = {}
+
+    async def flaky(context):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RuntimeError("transient")
+
+    async def healthy(context):
+        # Runs in the only slot while flaky waits out its backoff
+        seen["allocations"] = set(agent.resource_pool.get_state_allocations())
+        seen["tasks"] = set(agent._state_tasks)
+        seen["delayed"] = agent.get_retry_stats()["delayed"]
+        # Let the retry fire now instead of in an hour
+        agent._timers.schedule(("retry", "flaky"), time.monotonic(), "retry")
+
+    agent.add_state(
+        "flaky", flaky, resources=ResourceRequirements(priority=Priority.HIGH)
+    )
+    agent.add_state("healthy", healthy)
+    asyncio.run(agent.run(timeout=5))
+
+    assert seen == {"allocations": {"healthy"}, "tasks": {"healthy"}, "delayed": 1}
+    assert len(attempts) == 2
+    assert agent.completed_states == {"flaky", "healthy"}
+    assert agent.get_retry_stats()["delayed"] == 0
+
+
+def test_budget_caps_retries_to_a_fraction_of_recent_attempts(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(retry, "time", clock)
+    budget = RetryBudget(ratio=0.5, window=10.0, min_retries=1)
+
+    for _ in range(4):
+        budget.record_attempt()
+    assert budget.try_acquire() and budget.try_acquire()
+    assert not budget.try_acquire()
+    assert budget.stats() == {
+        "attempts": 4, "retries": 2, "limit": 2.0, "rejected": 1
+    }
+
+    # Old attempts and retries leave the window; min_retries still applies
+    clock.now = 11.0
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+
+def test_exhausted_budget_fails_the_state_without_retrying():
+    agent = Agent(
+        "budget",
+        retry_budget=RetryBudget(ratio=0.0, min_retries=0),
+        retry_policy=RetryPolicy(initial_delay=0.0, jitter=False)
+    )
+    attempts = []
+
+    async def failing(context):
+        attempts.append(1)
+        raise ValueError("down")
+
+    agent.add_state("failing", failing, max_retries=5)
+    with pytest.raises(ValueError):
+        asyncio.run(agent.run(timeout=5))
+
+    assert len(attempts) == 1
+    assert agent.get_retry_stats()["rejected"] == 1
@@ -0,0 +1,139 @@
+import asyncio
+
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import Priority, StateStatus
+from core.resources.requirements import ResourceRequirements
+
+
+def test_dependent_is_parked_until_its_dependency_completes():
+    agent = Agent("scheduler")
+    seen = {}
+
+    async def a(context):
+        # b was popped, found blocked and parked outside the heap
+        seen["parked"] = "b" in agent._parked
+        seen["queued"] = "b" in agent.priority_queue
+        seen["tasks"] = set(agent._state_tasks)
+
+    async def b(context):
+        seen["b_after_a"] = "a" in agent.completed_states
+
+    agent.add_state("a", a)
+    agent.add_state("b", b, dependencies={"a": DependencyType.REQUIRED})
+    agent._add_to_queue("b", agent.state_metadata["b"])
+
+    asyncio.run(agent.run(timeout=5))
+
+    assert seen == {
+        "parked": True, "queued": False, "tasks": {"a"}, "b_after_a": True
+    }
+    assert not agent._parked and not agent._state_tasks
+
+
+def test_completion_wakes_the_dispatcher():
+    agent = Agent("scheduler")
+    release = asyncio.Event()
+    order = []
+
+    async def slow(context):
+        await release.wait()
+        order.append("slow")
+
+    async def trigger(context):
+        order.append("trigger")
+        release.set()
+
+    async def after(context):
+        order.append("after")
+
+    agent.add_state("slow", slow)
+    agent.add_state("trigger", trigger)
+    agent.add_state("after", after, dependencies={"slow": DependencyType.REQUIRED})
+
+    async def scenario():
+        waits = 0
+        wait_for_wakeup = agent._wait_for_wakeup
+
+        async def counted():
+            nonlocal waits
+            waits += 1
+            await wait_for_wakeup()
+
+        agent._wait_for_wakeup = counted
+        await agent.run(timeout=5)
+        return waits
+
+    waits = asyncio.run(scenario())
+    assert order == ["trigger", "slow", "after"]
+    # One wait per completion, not a polling loop
+    assert waits <= 4
+
+
+def test_queued_states_start_in_priority_order():
+    agent = Agent("scheduler", max_concurrent=1)
+    order = []
+
+    def state(name):
+        async def run(context):
+            order.append(name)
+        return run
+
+    for name, priority in [
+        ("low", Priority.LOW), ("critical", Priority.CRITICAL),
+        ("normal", Priority.NORMAL), ("high", Priority.HIGH),
+    ]:
+        agent.add_state(
+            name, state(name), resources=ResourceRequirements(priority=priority)
+        )
+
+    asyncio.run(agent.run(timeout=5))
+    assert order == ["critical", "high", "normal", "low"]
+
+
+def test_dispatch_respects_max_concurrent():
+    agent = Agent("scheduler", max_concurrent=2)
+    running = set()
+    peak = 0
+
+    def state(name):
+        async def run(context):
+            nonlocal peak
+            running.add(name)
+            peak = max(peak, len(running))
+            await asyncio.sleep(0)
+            running.discard(name)
+        return run
+
+    for i in range(6):
+        agent.add_state(f"s{i}", state(f"s{i}"))
+
+    asyncio.run(agent.run(timeout=5))
+    assert peak == 2
+    assert len(agent.completed_states) == 6
+
+
+def test_cancelling_a_running_state_ends_the_run():
+    agent = Agent("scheduler")
+
+    async def blocked(context):
+        await asyncio.Event().wait()
+
+    async def canceller(context):
+        agent.cancel_state("blocked")
+
+    async def dependent(context):
+        pass
+
+    agent.add_state("blocked", blocked)
+    agent.add_state("canceller", canceller)
+    agent.add_state("dependent", dependent, dependencies={
+        "blocked": DependencyType.REQUIRED
+    })
+    agent._add_to_queue("dependent", agent.state_metadata["dependent"])
+
+    asyncio.run(agent.run(timeout=5))
+
+    assert agent.state_metadata["blocked"].status == StateStatus.CANCELLED
+    assert "dependent" not in agent.completed_states
+    assert not agent._state_tasks
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import (
+    PrioritizedState,
+    Priority,
+    SchedulingPolicy,
+    StateMetadata,
+    StateStatus,
+)
+from core.resources.requirements import ResourceRequirements
+
+
+def _recorder(order, name):
+    async def run(context):
+        order.append(name)
+    return run
+
+
+def _chain_agent(order, **options):
+    # x -> x1 -> x2 is a 30s critical path; y is a lone 1s state
+    agent = Agent("edf", max_concurrent=1, **options)
+    agent.add_state("x", _recorder(order, "x"))
+    agent.add_state(
+        "x1", _recorder(order, "x1"), dependencies={"x": DependencyType.REQUIRED}
+    )
+    agent.add_state(
+        "x2", _recorder(order, "x2"), dependencies={"x1": DependencyType.REQUIRED}
+    )
+    agent.add_state(
+        "y", _recorder(order, "y"),
+        resources=ResourceRequirements(priority=Priority.CRITICAL)
+    )
+    for name, duration in [("x", 10.0), ("x1", 10.0), ("x2", 10.0), ("y", 1.0)]:
+        agent._record_duration(name, duration)
+    return agent
+
+
+def test_critical_path_is_the_longest_chain_of_estimates():
+    agent = _chain_agent([])
+    agent.add_state(
+        "z", _recorder([], "z"), dependencies={"x": DependencyType.REQUIRED}
+    )
+    agent._record_duration("z", 50.0)
+
+    assert agent._critical_path("x2") == 10.0
+    assert agent._critical_path("x") == 60.0
+    assert agent._critical_path("y") == 1.0
+
+
+def test_workflow_deadline_runs_the_long_chain_first():
+    order = []
+    agent = _chain_agent(order, scheduling=SchedulingPolicy.DEADLINE)
+    agent.set_deadline(time.time() + 100.0)
+    asyncio.run(agent.run(timeout=5))
+
+    # y is critical but has 99s of slack; the chain only has 70s
+    assert order == ["x", "x1", "x2", "y"]
+
+    order = []
+    asyncio.run(_chain_agent(order).run(timeout=5))
+    assert order[0] == "y"
+
+
+def test_state_timeouts_are_deadlines():
+    order = []
+    agent = Agent("edf", max_concurrent=1, scheduling=SchedulingPolicy.DEADLINE)
+    for name, timeout, priority in [
+        ("relaxed", 600.0, Priority.CRITICAL),
+        ("urgent", 5.0, Priority.LOW),
+        ("unbounded", None, Priority.HIGH),
+    ]:
+        agent.add_state(name, _recorder(order, name), resources=ResourceRequirements(
+            timeout=timeout, priority=priority
+        ))
+    asyncio.run(agent.run(timeout=5))
+
+    # States without a deadline go last
+    assert order == ["urgent", "relaxed", "unbounded"]
+
+
+def _entry(name, priority, timestamp):
+    return PrioritizedState(
+        -priority, timestamp, name, StateMetadata(status=StateStatus.PENDING)
+    )
+
+
+def test_aging_lets_waiting_states_overtake_higher_priorities():
+    agent = Agent("aging", aging_interval=10.0)
+    queue = agent.priority_queue
+    queue.push(_entry("low", Priority.LOW, 0.0))
+    # Two levels above, but enqueued three intervals later
+    queue.push(_entry("late_high", Priority.HIGH, 30.0))
+    # Two levels above and only one interval later
+    queue.push(_entry("recent_high", Priority.HIGH, 10.0))
+
+    assert [queue.pop().state_name for _ in range(3)] == [
+        "recent_high", "low", "late_high"
+    ]
+
+    plain = Agent("plain").priority_queue
+    plain.push(_entry("low", Priority.LOW, 0.0))
+    plain.push(_entry("late_high", Priority.HIGH, 30.0))
+    assert plain.pop().state_name == "late_high"
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from core.agent.sharedmem import SharedMemoryTransport, SharedValue
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="needs POSIX shared memory")
+
+
+def test_shared_values_read_only_their_own_payload():
+    transport = SharedMemoryTransport(threshold=16)
+    value = b"x" * 100
+    packed, leases = transport.pack({"blob": value})
+    shared = packed["blob"]
+    try:
+        assert shared.size == 100
+        assert bytes(shared.view()) == value
+        assert shared.load() == value
+
+        stale = SharedValue(shared.name, 4000, shared.encoding, bytes)
+        with pytest.raises(ValueError):
+            stale.view()
+    finally:
+        transport.unlease(leases)
+        transport.release()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import ExecutionMode, StateStatus
+from core.agent.template import AgentTemplate
+
+
+def _first(context):
+    context.set_variable("x", 1)
+
+
+async def _second(context):
+    context.set_variable("y", context.get_variable("x") + 1)
+
+
+def _source(**options):
+    agent = Agent("template", max_concurrent=3, **options)
+    agent.add_state("a", _first)
+    agent.add_state("b", _second, dependencies={"a": DependencyType.REQUIRED})
+    return agent
+
+
+def test_instances_are_independent_runs_of_the_definition():
+    template = AgentTemplate.compile(_source())
+    assert template.state_names == ("a", "b") and len(template) == 2
+
+    first = template.instantiate(name="first")
+    second = template.instantiate(name="second", max_concurrent=1)
+    assert first.max_concurrent == 3 and second.max_concurrent == 1
+
+    asyncio.run(first.run(timeout=5))
+    first.close()
+
+    assert first.shared_state["y"] == 2
+    assert first.completed_states == {"a", "b"}
+    assert not second.completed_states and "y" not in second.shared_state
+    assert second.state_metadata["a"].status == StateStatus.PENDING
+    assert second.state_metadata["a"] is not first.state_metadata["a"]
+    assert [entry.state_name for entry in second.priority_queue] == ["a"]
+
+    asyncio.run(second.run(timeout=5))
+    second.close()
+    assert second.shared_state["y"] == 2
+
+
+def test_compile_rejects_an_agent_that_has_run():
+    agent = _source()
+    asyncio.run(agent.run(timeout=5))
+    agent.close()
+
+    with pytest.raises(ValueError, match="already run"):
+        AgentTemplate.compile(agent)
+
+
+def test_instances_start_and_release_worker_pools_on_demand():
+    source = _source()
+    source.add_state(
+        "remote", _first, dependencies={"b": DependencyType.REQUIRED},
+        execution_mode=ExecutionMode.PROCESS
+    )
+    template = AgentTemplate.compile(source)
+    source.close()
+
+    agent = template.instantiate()
+    # Neither pool exists until a state needs it
+    assert agent._thread_executor is None and agent._process_executor is None
+    assert agent.state_metadata["remote"].execution_mode == ExecutionMode.PROCESS
+
+    asyncio.run(agent.run(timeout=30))
+    assert agent.completed_states == {"a", "b", "remote"}
+    assert agent._thread_executor is not None
+    assert agent._process_executor is not None
+
+    agent.close()
+    assert agent._thread_executor is None and agent._process_executor is None
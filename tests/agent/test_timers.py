@@ -0,0 +1,115 @@
+import pytest
+
+from core.agent import base
+from core.agent.base import Agent
+from core.agent.timers import TimerWheel
+
+
+async def _noop(context):
+    return None
+
+
+def test_timers_fire_in_due_order_never_early():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule("b", 2.5)
+    wheel.schedule("a", 2.1)
+    wheel.schedule("c", 7.0)
+
+    # 2.1 and 2.5 share slot 3, which opens at 3.0
+    assert wheel.next_due() == 3.0
+    assert wheel.expired(2.9) == []
+    assert wheel.expired(3.0) == ["a", "b"]
+    assert wheel.next_due() == 7.0
+    assert wheel.expired(100.0) == ["c"]
+    assert wheel.next_due() is None and len(wheel) == 0
+
+
+def test_cancel_and_reschedule():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule("a", 1.0, group="retry")
+    wheel.schedule("b", 1.0, group="retry")
+
+    assert wheel.cancel("a")
+    assert not wheel.cancel("a")
+    assert "a" not in wheel and wheel.count("retry") == 1
+
+    # Scheduling an existing key moves it
+    wheel.schedule("b", 5.0, group="retry")
+    assert wheel.due("b") == 5.0 and wheel.count("retry") == 1
+    assert wheel.next_due() == 5.0
+    assert wheel.expired(4.0) == []
+    assert wheel.expired(5.0) == ["b"]
+
+
+def test_long_delays_and_many_slots():
+    wheel = TimerWheel(tick=0.01)
+    now = 1_000_000.0
+    wheel.schedule("hour", now + 3600.0)
+    wheel.schedule("day", now + 86400.0)
+    for i in range(500):
+        wheel.schedule(("short", i), now + i * 0.01)
+
+    assert wheel.expired(now + 5.0) == [("short", i) for i in range(500)]
+    assert wheel.next_due() == pytest.approx(now + 3600.0)
+    assert wheel.expired(now + 3599.0) == []
+    assert wheel.expired(now + 3600.0) == ["hour"]
+    assert wheel.expired(now + 86400.0) == ["day"]
+
+
+def test_cancelled_slots_do_not_grow_the_heap():
+    wheel = TimerWheel(tick=1.0)
+    for i in range(1000):
+        wheel.schedule("moving", float(i))
+
+    assert len(wheel) == 1
+    assert len(wheel._slot_heap) <= 2 * len(wheel._slots) + 64
+    assert wheel.next_due() == 999.0
+
+
+def test_groups():
+    wheel = TimerWheel(tick=1.0)
+    wheel.schedule("r2", 2.0, group="retry")
+    wheel.schedule("r1", 1.0, group="retry")
+    wheel.schedule("p", 1.0, group="periodic")
+
+    assert wheel.keys("retry") == ["r1", "r2"]
+    wheel.clear("retry")
+    assert list(wheel) == ["p"] and wheel.count("retry") == 0
+    wheel.clear()
+    assert len(wheel) == 0 and wheel.next_due() is None
+
+
+def test_tick_must_be_positive():
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0)
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def test_agent_releases_retries_when_their_timer_is_due(monkeypatch):
+    clock = _Clock(100.0)
+    monkeypatch.setattr(base, "time", clock)
+
+    agent = Agent("timers")
+    agent.add_state("a", _noop)
+    agent.priority_queue.remove("a")
+    agent._timers.schedule(("retry", "a"), 160.0, "retry")
+
+    clock.now = 159.0
+    agent._fire_timers()
+    assert "a" not in agent.priority_queue
+    assert agent.get_retry_stats()["delayed"] == 1
+
+    clock.now = 160.0
+    agent._fire_timers()
+    assert "a" in agent.priority_queue
+    assert agent.get_retry_stats()["delayed"] == 0
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.state import StateStatus
+from core.agent.versioned import CommitConflictError, VersionedStore
+
+
+def test_first_committer_wins():
+    store = VersionedStore({"x": 0})
+    first, second = store.snapshot(), store.snapshot()
+    store.commit({"x": first["x"] + 1}, snapshot=first)
+    with pytest.raises(CommitConflictError):
+        store.commit({"x": second["x"] + 1}, snapshot=second)
+    assert store.data["x"] == 1
+    assert store.stats()["conflicts"] == 1
+
+
+def test_disjoint_commits_do_not_conflict():
+    store = VersionedStore({"x": 0, "y": 0})
+    first, second = store.snapshot(), store.snapshot()
+    store.commit({"x": first["x"] + 1}, snapshot=first)
+    store.commit({"y": second["y"] + 1}, snapshot=second)
+    assert store.data == {"x": 1, "y": 1}
+
+
+def _incrementing_agent(name, states, **options):
+    agent = Agent(name, snapshot_isolation=True, **options)
+    agent.shared_state["count"] = 0
+    runs = []
+
+    async def increment(context):
+        runs.append(1)
+        count = context.get_variable("count")
+        await asyncio.sleep(0.01)
+        context.set_variable("count", count + 1)
+
+    for i in range(states):
+        agent.add_state(f"inc{i}", increment, max_retries=states)
+    return agent, runs
+
+
+def test_isolation_is_opt_in():
+    assert Agent("default").snapshot_isolation is False
+
+
+def test_concurrent_increments_are_not_lost():
+    agent, runs = _incrementing_agent("increments", 5, max_conflict_retries=4)
+    asyncio.run(agent.run(timeout=10))
+
+    assert agent.shared_state["count"] == 5
+    conflicts = agent.get_shared_state_stats()["conflicts"]
+    assert conflicts > 0
+    # Every conflicting commit re-ran its state once
+    assert len(runs) == 5 + conflicts
+
+
+def test_conflict_reruns_are_capped():
+    agent, runs = _incrementing_agent("capped", 2, max_conflict_retries=0)
+    with pytest.raises(CommitConflictError):
+        asyncio.run(agent.run(timeout=10))
+
+    assert agent.shared_state["count"] == 1
+    assert len(runs) == 2
+    failed = [
+        name for name, metadata in agent.state_metadata.items()
+        if metadata.status == StateStatus.FAILED
+    ]
+    assert len(failed) == 1
+
+
+def test_conflict_reruns_spend_attempts():
+    agent = Agent("attempts", snapshot_isolation=True, max_conflict_retries=10)
+    agent.shared_state["count"] = 0
+    runs = []
+
+    async def increment(context):
+        runs.append(1)
+        count = context.get_variable("count")
+        await asyncio.sleep(0.01)
+        context.set_variable("count", count + 1)
+
+    for i in range(3):
+        agent.add_state(f"inc{i}", increment, max_retries=1)
+    with pytest.raises(CommitConflictError):
+        asyncio.run(agent.run(timeout=10))
+
+    # One attempt each: only the first commit lands, nothing is re-run
+    assert agent.shared_state["count"] == 1
+    assert len(runs) == 3
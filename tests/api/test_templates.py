@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import HTTPException  # noqa: E402
+
+from core.agent.base import Agent  # noqa: E402
+from core.api.rest import app as rest  # noqa: E402
+from core.api.rest.models import TemplateCreate  # noqa: E402
+
+
+def _work(context):
+    context.set_variable("done", True)
+
+
+class _Engine:
+    def __init__(self):
+        self.runs = []
+
+    async def execute_workflow(self, workflow_id, agent, timeout=None):
+        self.runs.append(workflow_id)
+        await agent.run(timeout=timeout)
+
+
+def test_create_template_compiles_a_created_workflow(monkeypatch):
+    agent = Agent("rest")
+    agent.add_state("work", _work)
+    monkeypatch.setattr(rest, "agents", {"wf": agent})
+    monkeypatch.setattr(rest, "templates", {})
+
+    result = asyncio.run(
+        rest.create_template(TemplateCreate(name="nightly", workflow_id="wf"))
+    )
+    assert result == {"status": "compiled", "template": "nightly", "states": 1}
+    assert rest.templates["nightly"].state_names == ("work",)
+
+    with pytest.raises(HTTPException) as missing:
+        asyncio.run(rest.create_template(TemplateCreate(name="x", workflow_id="no")))
+    assert missing.value.status_code == 404
+
+
+def test_run_workflow_closes_the_agent(monkeypatch):
+    engine = _Engine()
+    monkeypatch.setattr(rest, "engine", engine)
+    agent = Agent("rest")
+    agent.add_state("work", _work)
+
+    asyncio.run(rest._run_workflow("wf", agent, 5))
+    assert engine.runs == ["wf"]
+    assert agent.shared_state["done"] is True
+    assert agent._thread_executor is None
@@ -0,0 +1,42 @@
+import pytest
+
+# core.dag needs the graph extras (networkx, matplotlib, graphviz)
+pytest.importorskip("core.dag")
+
+from core.dag.builder import DAGBuilder  # noqa: E402
+from core.dag.graph import DAGValidationError  # noqa: E402
+from core.dag.parser import StateDefinition, WorkflowDefinition  # noqa: E402
+
+
+def _workflow(dependencies):
+    return WorkflowDefinition(
+        name="generated",
+        states={
+            name: StateDefinition(name=name, type="task", dependencies=deps)
+            for name, deps in dependencies.items()
+        },
+    )
+
+
+def test_build_agent_without_a_dag_orders_states_by_dependency():
+    workflow = _workflow({"c": ["b"], "b": ["a"], "a": [], "d": ["a", "c"]})
+    agent = DAGBuilder().build_agent(workflow)
+
+    assert list(agent.state_metadata) == ["a", "b", "c", "d"]
+    assert [entry.state_name for entry in agent.priority_queue] == ["a"]
+    assert agent._unmet_groups == {"a": 0, "b": 1, "c": 1, "d": 1}
+
+
+def test_build_agent_from_the_dag_matches_the_fast_path():
+    workflow = _workflow({"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]})
+    builder = DAGBuilder()
+
+    direct = builder.build_agent(workflow)
+    via_dag = builder.build_agent(workflow, builder.build_from_definition(workflow))
+    assert set(direct.state_metadata) == set(via_dag.state_metadata)
+    assert direct._unmet_groups == via_dag._unmet_groups
+
+
+def test_dependency_cycles_are_rejected():
+    with pytest.raises(DAGValidationError, match="cycle"):
+        DAGBuilder().build_agent(_workflow({"a": ["b"], "b": ["a"], "c": []}))
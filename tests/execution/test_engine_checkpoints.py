@@ -0,0 +1,61 @@
+import asyncio
+
+from core.agent.base import Agent
+from core.agent.dependencies import DependencyType
+from core.agent.state import AgentStatus
+from core.execution.engine import WorkflowEngine
+from core.storage.backends.sqlite import SQLiteBackend
+
+
+def _agent(runs, pause=None):
+    agent = Agent("paused")
+
+    async def first(context):
+        runs.append("a")
+        context.set_variable("x", 1)
+        if pause is not None:
+            await pause()
+
+    async def second(context):
+        runs.append("b")
+        context.set_variable("y", context.get_variable("x") + 1)
+
+    agent.add_state("a", first)
+    agent.add_state("b", second, dependencies={"a": DependencyType.REQUIRED})
+    return agent
+
+
+def test_pause_resume_round_trip(tmp_path):
+    async def scenario():
+        engine = WorkflowEngine(SQLiteBackend(f"sqlite+aiosqlite:///{tmp_path}/wf.db"))
+        await engine.start()
+        runs = []
+        workflow_id = None
+
+        async def pause():
+            await engine.pause_workflow(workflow_id)
+
+        agent = _agent(runs, pause)
+        workflow_id = await engine.create_workflow("paused", agent)
+        execution = asyncio.create_task(engine.execute_workflow(workflow_id, agent))
+
+        while not (agent.status == AgentStatus.PAUSED and "a" in agent.completed_states):
+            await asyncio.sleep(0.01)
+        # A delta on top of the checkpoint taken by the pause
+        await engine.checkpoint_workflow(workflow_id)
+
+        execution.cancel()
+        await asyncio.gather(execution, return_exceptions=True)
+
+        checkpoint = await engine.storage.load_checkpoint(workflow_id)
+        assert checkpoint is not None and not checkpoint.is_delta
+        assert checkpoint.shared_state["x"] == 1
+
+        resumed = _agent(runs)
+        await engine.resume_workflow(workflow_id, resumed)
+        await engine.stop()
+        return runs, resumed
+
+    runs, resumed = asyncio.run(scenario())
+    assert runs == ["a", "b"]
+    assert resumed.shared_state["y"] == 2
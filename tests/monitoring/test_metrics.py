@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from core.agent.base import Agent
+from core.agent.state import ExecutionMode
+from core.monitoring.metrics import MetricType, MetricsCollector, agent_monitor
+
+
+def _work(context):
+    time.sleep(0.2)
+
+
+def test_executor_gauges_are_sampled_while_running():
+    reports = []
+    agent = Agent("monitored", max_threads=2)
+    for i in range(4):
+        agent.add_state(f"work{i}", _work, execution_mode=ExecutionMode.THREAD)
+
+    @agent_monitor(
+        metrics=MetricType.CONCURRENCY,
+        metrics_callback=reports.append,
+        update_interval=0.05
+    )
+    async def run(agent):
+        await agent.run(timeout=10)
+
+    asyncio.run(run(agent))
+    agent.close()
+
+    concurrency = reports[0]["concurrency"]
+    assert concurrency["thread_utilization"]["max"] == 1.0
+    assert concurrency["thread_queue_depth"]["max"] > 0
+
+
+def _copy(context):
+    context.set_variable("copy", bytes(context.get_buffer("blob")))
+
+
+def test_shared_memory_stats_are_exported():
+    collector = MetricsCollector()
+    agent = Agent("shared", shared_memory_threshold=1024)
+    agent.shared_state["blob"] = bytes(4096)
+    agent.add_state("copy", _copy, execution_mode=ExecutionMode.PROCESS)
+
+    @agent_monitor(metrics=MetricType.RESOURCES, collector=collector)
+    async def run(agent):
+        await agent.run(timeout=60)
+
+    asyncio.run(run(agent))
+    agent.close()
+
+    def sample(name, kind):
+        return collector.registry.get_sample_value(
+            name, {"agent": "shared", "kind": kind}
+        )
+
+    assert agent.shared_state["copy"] == bytes(4096)
+    assert sample("workflow_shared_memory_values", "exported") == 1
+    assert sample("workflow_shared_memory_values", "received") == 1
+    assert sample("workflow_shared_memory_bytes", "peak") >= 4096
+    assert sample("workflow_shared_memory_bytes", "held") == 0
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+from core.agent.context import Context
+from core.coordination.singleflight import SingleFlight
+from plugins.base import Plugin, PluginState
+
+MANIFEST = """
+name: lookup
+version: "1.0"
+description: test plugin
+author: tests
+"""
+
+
+class LookupState(PluginState):
+    singleflight = True
+    singleflight_inputs = ("secret_token",)
+    runs = []
+
+    async def execute(self, context):
+        token = context.get_secret("token")
+        self.runs.append(token)
+        await asyncio.sleep(0.01)
+        context.set_variable("rows", [self.config["query"], token])
+        context.set_output("leaked", context.get_variable("private"))
+
+
+class LookupPlugin(Plugin):
+    def register_states(self):
+        return {"lookup": LookupState}
+
+
+def _context(token, private):
+    context = Context({})
+    context.set_secret("token", token)
+    context.set_variable("private", private)
+    return context
+
+
+def test_coalescing_is_keyed_by_declared_inputs(tmp_path):
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text(MANIFEST)
+    plugin = LookupPlugin(manifest)
+    plugin.singleflight = SingleFlight()
+    state = plugin.get_state_function("lookup", {"query": "q"})
+    LookupState.runs = []
+
+    contexts = [_context("a", "mine"), _context("a", "yours"), _context("b", "theirs")]
+
+    async def scenario():
+        await asyncio.gather(*(state(context) for context in contexts))
+
+    asyncio.run(scenario())
+
+    # One run per distinct token; neither sees a caller's other variables
+    assert sorted(LookupState.runs) == ["a", "b"]
+    first, second, third = contexts
+    assert first.get_variable("rows") == ["q", "a"]
+    assert third.get_variable("rows") == ["q", "b"]
+    assert first.get_variable("rows") is not second.get_variable("rows")
+    assert first.get_output("leaked") is None
+
+
+class ConfiguredState(PluginState):
+    runs = []
+
+    async def execute(self, context):
+        self.runs.append(self.config["query"])
+        await asyncio.sleep(0.01)
+        context.set_variable("answer", str(self.config["query"]))
+
+
+class Labelled:
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return "same label"
+
+
+class ConfiguredPlugin(Plugin):
+    def register_states(self):
+        return {"configured": ConfiguredState}
+
+
+def _plugin(tmp_path):
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text(MANIFEST)
+    plugin = ConfiguredPlugin(manifest)
+    plugin.singleflight = SingleFlight()
+    ConfiguredState.runs = []
+    return plugin
+
+
+def _run_concurrently(plugin, configs):
+    async def scenario():
+        await asyncio.gather(*(
+            plugin.get_state_function("configured", config)(Context({}))
+            for config in configs
+        ))
+
+    asyncio.run(scenario())
+
+
+def test_coalescing_is_opt_in_per_config(tmp_path):
+    plugin = _plugin(tmp_path)
+    _run_concurrently(plugin, [{"query": "q"}] * 3)
+    assert len(ConfiguredState.runs) == 3
+
+    ConfiguredState.runs = []
+    _run_concurrently(plugin, [{"query": "q", "singleflight": True}] * 3)
+    assert len(ConfiguredState.runs) == 1
+
+
+def test_keys_hash_content_not_str(tmp_path):
+    plugin = _plugin(tmp_path)
+    _run_concurrently(plugin, [
+        {"query": Labelled(1), "singleflight": True},
+        {"query": Labelled(2), "singleflight": True},
+    ])
+    assert len(ConfiguredState.runs) == 2
+
+
+def test_unhashable_configs_are_not_coalesced(tmp_path):
+    plugin = _plugin(tmp_path)
+    lock = threading.Lock()
+    _run_concurrently(plugin, [{"query": "q", "lock": lock, "singleflight": True}] * 2)
+    assert len(ConfiguredState.runs) == 2
+    assert plugin.singleflight.stats()["calls"] == 0
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.template import AgentTemplate
+from core.execution.engine import WorkflowEngine
+from core.scheduler.base import (
+    IntervalScheduler,
+    Schedule,
+    ScheduledTask,
+    ScheduleType,
+)
+from core.storage.backends.sqlite import SQLiteBackend
+
+
+def _work(context):
+    context.set_variable("done", True)
+
+
+def _template():
+    agent = Agent("scheduled")
+    agent.add_state("work", _work)
+    return AgentTemplate.compile(agent)
+
+
+def test_unknown_template_is_rejected():
+    scheduler = IntervalScheduler()
+    with pytest.raises(ValueError, match="Unknown agent template"):
+        scheduler._create_agent_from_config({"template": "missing"})
+
+
+def test_scheduled_template_run_closes_its_agent(tmp_path):
+    async def scenario():
+        engine = WorkflowEngine(
+            SQLiteBackend(f"sqlite+aiosqlite:///{tmp_path}/wf.db")
+        )
+        await engine.start()
+        scheduler = IntervalScheduler(workflow_engine=engine)
+        scheduler.register_template("nightly", _template())
+
+        created = []
+        create = scheduler._create_agent_from_config
+
+        def record(config):
+            created.append(create(config))
+            return created[-1]
+
+        scheduler._create_agent_from_config = record
+        scheduler._schedules["s"] = Schedule(
+            schedule_id="s", name="nightly", type=ScheduleType.INTERVAL, config={}
+        )
+        task = ScheduledTask(
+            task_id="t", schedule_id="s", scheduled_time=datetime.utcnow(),
+            workflow_id="wf", agent_config={"template": "nightly", "name": "run-1"}
+        )
+        await scheduler._execute_task(task)
+        await engine.stop()
+        return task, created
+
+    task, created = asyncio.run(scenario())
+    assert task.status == "completed"
+    (agent,) = created
+    assert agent.name == "run-1" and agent.shared_state["done"] is True
+    # The synchronous state started a thread pool, released after the run
+    assert agent._thread_executor is None
@@ -0,0 +1,96 @@
+import pickle
+
+import pytest
+
+from core.agent.base import Agent
+from core.agent.checkpoint import AgentCheckpoint
+from core.storage.backends.sqlite import SQLiteBackend
+from core.storage.codec import CheckpointCodec, CheckpointFormatError
+
+
+async def _noop(context):
+    return None
+
+
+def test_delta_with_untouched_queued_states():
+    agent = Agent("codec")
+    agent.add_state("a", _noop)
+    agent.add_state("b", _noop)
+    assert len(agent.priority_queue) == 2
+
+    codec = CheckpointCodec()
+    base = codec.decode(codec.encode(agent.create_checkpoint()))
+
+    agent.shared_state["x"] = 1
+    delta = agent.create_checkpoint()
+    assert delta.is_delta and not delta.state_metadata
+
+    decoded = codec.decode(codec.encode(delta))
+    # The queue did not change, so the delta leaves it out
+    assert decoded.priority_queue is None
+
+    restored = AgentCheckpoint.from_chain(base, [decoded])
+    assert restored.shared_state["x"] == 1
+    assert sorted(entry.state_name for entry in restored.priority_queue) == ["a", "b"]
+
+
+class _Opaque:
+    def __init__(self, value):
+        self.value = value
+
+
+def _round_trip(codec, value):
+    agent = Agent("codec")
+    agent.shared_state["value"] = value
+    decoded = codec.decode(codec.encode(agent.create_checkpoint(full=True)))
+    return decoded.shared_state["value"]
+
+
+@pytest.mark.parametrize("value", [
+    {"id": 1, "values": [1.5, None, True], "nested": {"a": ["b"]}},
+    (1, "a", (2.0, None)),
+    {1: "int key", (2, 3): frozenset({4}), "s": {5, 6}},
+    [2 ** 100, -(2 ** 70), -1, complex(1, -2), b"raw", bytearray(b"buf")],
+    [float("inf"), float("nan")],
+    "\udc80 lone surrogate",
+])
+def test_builtin_values_round_trip_exactly(value):
+    result = _round_trip(CheckpointCodec(), value)
+    assert repr(result) == repr(value)
+
+
+def test_values_are_not_marshalled():
+    codec = CheckpointCodec()
+    data = codec.encode(Agent("codec").create_checkpoint(full=True))
+    assert "marshal" not in [serializer.name for serializer in codec.serializers]
+    assert codec.decode(data).shared_state == {}
+
+
+def test_pickle_is_opt_in_for_encoding():
+    with pytest.raises(TypeError, match="allow_pickle"):
+        _round_trip(CheckpointCodec(), _Opaque(1))
+
+    assert _round_trip(CheckpointCodec(allow_pickle=True), _Opaque(1)).value == 1
+
+
+def test_pickled_entries_are_refused_without_allow_pickle():
+    agent = Agent("codec")
+    agent.shared_state["value"] = _Opaque(1)
+    data = CheckpointCodec(allow_pickle=True).encode(
+        agent.create_checkpoint(full=True)
+    )
+
+    with pytest.raises(CheckpointFormatError, match="allow_pickle"):
+        CheckpointCodec().decode(data)
+    decoded = CheckpointCodec(allow_pickle=True).decode(data)
+    assert decoded.shared_state["value"].value == 1
+
+
+def test_legacy_pickled_checkpoints_need_allow_pickle():
+    checkpoint = Agent("codec").create_checkpoint(full=True)
+    legacy = pickle.dumps(checkpoint)
+
+    with pytest.raises(CheckpointFormatError, match="allow_pickle"):
+        SQLiteBackend("unused.db")._decode_checkpoint(legacy)
+    backend = SQLiteBackend("unused.db", codec=CheckpointCodec(allow_pickle=True))
+    assert backend._decode_checkpoint(legacy).agent_name == "codec"